@@ -0,0 +1,167 @@
+"""
+Module description:
+Binary on-disk cache of split DataSet objects.
+
+data_config:
+    cache_folder: ../data/{0}/cache/
+
+Each entry is identified by a hash of the input files and of the prefiltering/splitting configuration. CSR matrices
+and id maps are stored as plain .npy files, which are memory-mapped (copy-on-write) when loaded, so that repeated
+experiments and concurrent processes share the same pages.
+"""
+
+__version__ = '0.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import typing as t
+from types import SimpleNamespace
+
+import numpy as np
+import scipy.sparse as sp
+
+from elliot.utils import logging
+
+_CACHE_FORMAT = 1
+_MANIFEST = "manifest.json"
+
+
+def _to_plain(obj):
+    if isinstance(obj, SimpleNamespace):
+        return {k: _to_plain(v) for k, v in vars(obj).items()}
+    if isinstance(obj, dict):
+        return {str(k): _to_plain(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_to_plain(v) for v in obj]
+    return obj
+
+
+def _file_digest(path, digest, chunk_size=1 << 20):
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+
+
+class DataSetCache:
+    """
+    Store and load the nested list of DataSet objects produced by a loader
+    """
+
+    def __init__(self, folder: str):
+        self.logger = logging.get_logger(self.__class__.__name__)
+        self.folder = folder
+
+    @staticmethod
+    def input_paths(config) -> t.List[str]:
+        data_config = config.data_config
+        if data_config.strategy == "fixed":
+            return [p for p in [data_config.train_path, getattr(data_config, "validation_path", None),
+                                data_config.test_path] if p]
+        elif data_config.strategy == "dataset":
+            return [data_config.dataset_path]
+        return []
+
+    def key(self, config) -> t.Optional[str]:
+        """
+        Hash of the input files plus the prefiltering and splitting configuration.
+        Returns None when the data strategy cannot be cached
+        """
+        paths = self.input_paths(config)
+        if not paths:
+            return None
+        digest = hashlib.sha1()
+        for path in paths:
+            _file_digest(path, digest)
+        setup = {"format": _CACHE_FORMAT,
+                 "strategy": config.data_config.strategy,
+                 "prefiltering": _to_plain(getattr(config, "prefiltering", None)),
+                 "splitting": _to_plain(getattr(config, "splitting", None))}
+        digest.update(json.dumps(setup, sort_keys=True, default=str).encode("utf-8"))
+        return digest.hexdigest()
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.folder, key)
+
+    def contains(self, key: str) -> bool:
+        return os.path.exists(os.path.join(self.entry_path(key), _MANIFEST))
+
+    def save(self, key: str, data_list: t.List[t.List[object]]):
+        os.makedirs(self.folder, exist_ok=True)
+        # written in a temporary folder and renamed, so that concurrent readers never see partial entries
+        tmp_folder = tempfile.mkdtemp(prefix=f".{key}-", dir=self.folder)
+        try:
+            for i, val_list in enumerate(data_list):
+                for j, dataset in enumerate(val_list):
+                    self._save_dataset(os.path.join(tmp_folder, str(i), str(j)), dataset)
+            with open(os.path.join(tmp_folder, _MANIFEST), "w") as file:
+                json.dump({"format": _CACHE_FORMAT, "structure": [len(val_list) for val_list in data_list]}, file)
+            os.rename(tmp_folder, self.entry_path(key))
+            self.logger.info(f"Dataset cached in {self.entry_path(key)}")
+        except OSError:
+            # another process stored the same entry in the meantime
+            shutil.rmtree(tmp_folder, ignore_errors=True)
+            if not self.contains(key):
+                raise
+
+    def load(self, key: str, dataset_class, config, *args, **kwargs) -> t.List[t.List[object]]:
+        entry = self.entry_path(key)
+        with open(os.path.join(entry, _MANIFEST)) as file:
+            structure = json.load(file)["structure"]
+        data_list = [[self._load_dataset(os.path.join(entry, str(i), str(j)), dataset_class, config, *args, **kwargs)
+                      for j in range(n_val)] for i, n_val in enumerate(structure)]
+        self.logger.info(f"Dataset loaded from cache {entry}")
+        return data_list
+
+    def _save_dataset(self, folder, dataset):
+        os.makedirs(folder)
+        self._save_array(folder, "user_ids", dataset.private_users.ids)
+        self._save_array(folder, "item_ids", dataset.private_items.ids)
+        self._save_csr(folder, "train", dataset.sp_i_train_ratings)
+        for name, split in [("test", dataset._test_data), ("val", dataset._val_data)]:
+            if split is not None:
+                matrix, item_ids = split
+                self._save_csr(folder, name, matrix)
+                self._save_array(folder, f"{name}_item_ids", item_ids)
+
+    def _load_dataset(self, folder, dataset_class, config, *args, **kwargs):
+        splits = {name: (self._load_csr(folder, name), self._load_array(folder, f"{name}_item_ids"))
+                  if os.path.exists(os.path.join(folder, f"{name}_item_ids.npy")) else None
+                  for name in ["test", "val"]}
+        return dataset_class.from_columnar(config,
+                                           self._load_csr(folder, "train"),
+                                           self._load_array(folder, "user_ids"),
+                                           self._load_array(folder, "item_ids"),
+                                           splits["test"],
+                                           splits["val"],
+                                           *args, **kwargs)
+
+    @staticmethod
+    def _save_array(folder, name, array):
+        array = np.asarray(array)
+        np.save(os.path.join(folder, f"{name}.npy"), array, allow_pickle=array.dtype.hasobject)
+
+    @staticmethod
+    def _load_array(folder, name):
+        path = os.path.join(folder, f"{name}.npy")
+        try:
+            return np.load(path, mmap_mode="c")
+        except ValueError:
+            # object arrays (e.g., string ids) cannot be memory-mapped
+            return np.load(path, allow_pickle=True)
+
+    def _save_csr(self, folder, name, matrix):
+        self._save_array(folder, f"{name}_data", matrix.data)
+        self._save_array(folder, f"{name}_indices", matrix.indices)
+        self._save_array(folder, f"{name}_indptr", matrix.indptr)
+        self._save_array(folder, f"{name}_shape", np.asarray(matrix.shape, dtype=np.int64))
+
+    def _load_csr(self, folder, name):
+        shape = tuple(int(d) for d in self._load_array(folder, f"{name}_shape"))
+        return sp.csr_matrix((self._load_array(folder, f"{name}_data"),
+                              self._load_array(folder, f"{name}_indices"),
+                              self._load_array(folder, f"{name}_indptr")), shape=shape, copy=False)
@@ -0,0 +1,135 @@
+"""
+Module description:
+Columnar helpers to build DataSet objects from factorized user/item codes.
+
+"""
+
+__version__ = '0.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
+import operator
+import typing as t
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+
+class PrivateIdMap(Mapping):
+    """
+    Read-only mapping private (contiguous) id -> public id, backed by an array of public ids
+    """
+
+    def __init__(self, ids: np.ndarray):
+        self._ids = np.asarray(ids)
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids
+
+    def __getitem__(self, key):
+        try:
+            index = operator.index(key)
+        except TypeError:
+            raise KeyError(key)
+        if not 0 <= index < len(self._ids):
+            raise KeyError(key)
+        return self._ids[index]
+
+    def __iter__(self):
+        return iter(range(len(self._ids)))
+
+    def __len__(self):
+        return len(self._ids)
+
+    def take(self, codes) -> np.ndarray:
+        """
+        Vectorized conversion of private ids to public ids
+        """
+        return self._ids[np.asarray(codes, dtype=np.int64)]
+
+
+class PublicIdMap(Mapping):
+    """
+    Read-only mapping public id -> private id, backed by the sorted array of public ids
+    """
+
+    def __init__(self, sorted_ids: np.ndarray):
+        self._ids = np.asarray(sorted_ids)
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids
+
+    def __getitem__(self, key):
+        try:
+            index = int(np.searchsorted(self._ids, key))
+            if index < len(self._ids) and self._ids[index] == key:
+                return index
+        except TypeError:
+            pass
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def lookup(self, keys) -> np.ndarray:
+        """
+        Vectorized conversion of public ids to private ids. Unknown ids are mapped to -1
+        """
+        keys = np.asarray(keys)
+        if not len(self._ids):
+            return np.full(len(keys), -1, dtype=np.int64)
+        positions = np.searchsorted(self._ids, keys)
+        clipped = np.minimum(positions, len(self._ids) - 1)
+        return np.where(self._ids[clipped] == keys, clipped, -1).astype(np.int64)
+
+
+def deduplicate(dataframe: pd.DataFrame) -> pd.DataFrame:
+    """
+    Keep the last rating of every (user, item) pair, as the dictionary-based construction did
+    """
+    return dataframe.drop_duplicates(subset=['userId', 'itemId'], keep='last')
+
+
+def factorize(values) -> t.Tuple[np.ndarray, np.ndarray]:
+    """
+    Factorize a column once: returns the private codes and the sorted array of public ids
+    """
+    codes, uniques = pd.factorize(values, sort=True)
+    return codes.astype(np.int64), np.asarray(uniques)
+
+
+def build_csr(rows: np.ndarray, cols: np.ndarray, values: np.ndarray, shape: t.Tuple[int, int],
+              dtype='float32') -> sp.csr_matrix:
+    """
+    Build a canonical CSR matrix from coordinate codes
+    """
+    matrix = sp.csr_matrix((np.asarray(values, dtype=dtype), (rows, cols)), dtype=dtype, shape=shape)
+    matrix.sort_indices()
+    return matrix
+
+
+def binarize(matrix: sp.csr_matrix) -> sp.csr_matrix:
+    """
+    Binary copy of a CSR matrix sharing its sparsity pattern (explicit zeros included)
+    """
+    return sp.csr_matrix((np.ones_like(matrix.data, dtype='float32'), matrix.indices.copy(), matrix.indptr.copy()),
+                         shape=matrix.shape, dtype='float32')
+
+
+def csr_to_dict(matrix: sp.csr_matrix, row_ids: np.ndarray, col_ids: np.ndarray) -> t.Dict:
+    """
+    Conversion of a CSR matrix to the nested {row_id: {col_id: value}} dictionary used by models and metrics
+    """
+    indptr = matrix.indptr.tolist()
+    rows = np.asarray(row_ids).tolist()
+    cols = np.asarray(col_ids)[matrix.indices].tolist()
+    data = matrix.data.tolist()
+    return {row: dict(zip(cols[indptr[r]:indptr[r + 1]], data[indptr[r]:indptr[r + 1]]))
+            for r, row in enumerate(rows)}
@@ -10,10 +10,11 @@ __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 import os
 import numpy as np
 import pandas as pd
-import scipy.sparse as sp
 import typing as t
 import logging as pylog
 
+from elliot.dataset import columnar
+from elliot.dataset.cache import DataSetCache
 from elliot.dataset.abstract_dataset import AbstractDataset
 from elliot.splitter.base_splitter import Splitter
 from elliot.prefiltering.standard_prefilters import PreFilter
@@ -37,8 +38,19 @@ class DataSetLoader:
         self.kwargs = kwargs
         self.config = config
         self.column_names = ['userId', 'itemId', 'rating', 'timestamp']
+        self.cache = None
+        self.cache_key = None
         if config.config_test:
             return
+
+        cache_folder = getattr(config.data_config, "cache_folder", None)
+        if cache_folder:
+            self.cache = DataSetCache(cache_folder)
+            self.cache_key = self.cache.key(config)
+            if self.cache_key is not None and self.cache.contains(self.cache_key):
+                self.logger.info("Cached dataset found: loading and splitting are skipped")
+                return
+
         if config.data_config.strategy == "fixed":
             path_train_data = config.data_config.train_path
             path_val_data = getattr(config.data_config, "validation_path", None)
@@ -106,6 +118,9 @@ class DataSetLoader:
         return tuple_list
 
     def generate_dataobjects(self) -> t.List[object]:
+        if self.cache_key is not None and self.cache.contains(self.cache_key):
+            return self.cache.load(self.cache_key, DataSet, self.config, self.args, self.kwargs)
+
         data_list = []
         for train_val, test in self.tuple_list:
             # testset level
@@ -120,6 +135,9 @@ class DataSetLoader:
                 single_dataobject = DataSet(self.config, (train_val, test), self.args,
                                                               self.kwargs)
                 data_list.append([single_dataobject])
+
+        if self.cache_key is not None:
+            self.cache.save(self.cache_key, data_list)
         return data_list
 
     def generate_dataobjects_mock(self) -> t.List[object]:
@@ -149,73 +167,118 @@ class DataSet(AbstractDataset):
         self.config = config
         self.args = args
         self.kwargs = kwargs
-        self.train_dict = self.dataframe_to_dict(data_tuple[0])
 
-        self.users = list(self.train_dict.keys())
-        self.items = list({k for a in self.train_dict.values() for k in a.keys()})
+        train = columnar.deduplicate(data_tuple[0])
+        user_codes, user_ids = columnar.factorize(train['userId'])
+        item_codes, item_ids = columnar.factorize(train['itemId'])
+        sp_i_train_ratings = columnar.build_csr(user_codes, item_codes, train['rating'].to_numpy(),
+                                                (len(user_ids), len(item_ids)))
+        self.setup(sp_i_train_ratings, user_ids, item_ids)
+
+        if len(data_tuple) == 2:
+            self._test_data = self.build_sparse_test(data_tuple[1])
+        else:
+            self._val_data = self.build_sparse_test(data_tuple[1])
+            self._test_data = self.build_sparse_test(data_tuple[2])
+
+    @classmethod
+    def from_columnar(cls, config, sp_i_train_ratings, user_ids, item_ids, test_data, val_data=None, *args, **kwargs):
+        """
+        Alternative constructor from already factorized data (e.g., a DataSetCache entry)
+        :param sp_i_train_ratings: (users x items) CSR matrix of training ratings
+        :param user_ids: sorted public user ids
+        :param item_ids: sorted public item ids
+        :param test_data: tuple (CSR matrix, public item ids) of the test set
+        :param val_data: tuple (CSR matrix, public item ids) of the validation set, if any
+        """
+        dataset = cls.__new__(cls)
+        dataset.logger = logging.get_logger(cls.__name__, pylog.CRITICAL if config.config_test else pylog.DEBUG)
+        dataset.config = config
+        dataset.args = args
+        dataset.kwargs = kwargs
+        dataset.setup(sp_i_train_ratings, user_ids, item_ids)
+        dataset._test_data = test_data
+        dataset._val_data = val_data
+        cls.check_required_attributes(dataset)
+        return dataset
+
+    def setup(self, sp_i_train_ratings, user_ids, item_ids):
+        self.users = np.asarray(user_ids).tolist()
+        self.items = np.asarray(item_ids).tolist()
         self.num_users = len(self.users)
         self.num_items = len(self.items)
-        self.transactions = sum(len(v) for v in self.train_dict.values())
-
-        self.private_users = {p: u for p, u in enumerate(self.users)}
-        self.public_users = {v: k for k, v in self.private_users.items()}
-        self.private_items = {p: i for p, i in enumerate(self.items)}
-        self.public_items = {v: k for k, v in self.private_items.items()}
 
-        self.i_train_dict = {self.public_users[user]: {self.public_items[i]: v for i, v in items.items()}
-                                for user, items in self.train_dict.items()}
+        self.private_users = columnar.PrivateIdMap(user_ids)
+        self.public_users = columnar.PublicIdMap(user_ids)
+        self.private_items = columnar.PrivateIdMap(item_ids)
+        self.public_items = columnar.PublicIdMap(item_ids)
 
+        self.sp_i_train_ratings = sp_i_train_ratings
         self.sp_i_train = self.build_sparse()
-        self.sp_i_train_ratings = self.build_sparse_ratings()
+        self.transactions = self.sp_i_train.nnz
+        self.log_statistics()
+
+        self._train_dict = None
+        self._i_train_dict = None
+        self._test_dict = None
+        self._val_dict = None
+        self._test_data = None
+        self._val_data = None
+
+    @property
+    def train_dict(self):
+        if self._train_dict is None:
+            self._train_dict = columnar.csr_to_dict(self.sp_i_train_ratings, self.private_users.ids,
+                                                    self.private_items.ids)
+        return self._train_dict
+
+    @property
+    def i_train_dict(self):
+        if self._i_train_dict is None:
+            self._i_train_dict = columnar.csr_to_dict(self.sp_i_train_ratings, np.arange(self.num_users),
+                                                      np.arange(self.num_items))
+        return self._i_train_dict
+
+    @property
+    def test_dict(self):
+        if self._test_dict is None:
+            self._test_dict = self.build_dict(*self._test_data)
+        return self._test_dict
+
+    @property
+    def val_dict(self):
+        if self._val_data is None:
+            raise AttributeError("val_dict")
+        if self._val_dict is None:
+            self._val_dict = self.build_dict(*self._val_data)
+        return self._val_dict
+
+    def log_statistics(self):
+        sparsity = 1 - (self.transactions / (self.num_users * self.num_items))
+        self.logger.info(f"Statistics\tUsers:\t{self.num_users}\tItems:\t{self.num_items}\t"
+                         f"Transactions:\t{self.transactions}\tSparsity:\t{sparsity}")
+
+    def build_sparse_test(self, dataframe):
+        """
+        Columnar representation of a test/validation set: a (train users x test items) CSR matrix and the public
+        ids of its columns. Users not in the training set are discarded
+        """
+        dataframe = columnar.deduplicate(dataframe)
+        user_codes = self.public_users.lookup(dataframe['userId'].to_numpy())
+        known = user_codes >= 0
+        item_codes, item_ids = columnar.factorize(dataframe['itemId'].to_numpy()[known])
+        matrix = columnar.build_csr(user_codes[known], item_codes, dataframe['rating'].to_numpy()[known],
+                                    (self.num_users, len(item_ids)), dtype='float64')
+        return matrix, item_ids
 
-        if len(data_tuple) == 2:
-            self.test_dict = self.build_dict(data_tuple[1], self.users)
-        else:
-            self.val_dict = self.build_dict(data_tuple[1], self.users)
-            self.test_dict = self.build_dict(data_tuple[2], self.users)
-
-    def dataframe_to_dict(self, data):
-        users = list(data['userId'].unique())
-
-        "Conversion to Dictionary"
-        ratings = {}
-        for u in users:
-            sel_ = data[data['userId'] == u]
-            ratings[u] = dict(zip(sel_['itemId'], sel_['rating']))
-        n_users = len(ratings.keys())
-        n_items = len({k for a in ratings.values() for k in a.keys()})
-        transactions = sum([len(a) for a in ratings.values()])
-        sparsity = 1 - (transactions / (n_users * n_items))
-        self.logger.info(f"Statistics\tUsers:\t{n_users}\tItems:\t{n_items}\tTransactions:\t{transactions}\t"
-                         f"Sparsity:\t{sparsity}")
-        return ratings
-
-    def build_dict(self, dataframe, users):
-        ratings = {}
-        for u in users:
-            sel_ = dataframe[dataframe['userId'] == u]
-            ratings[u] = dict(zip(sel_['itemId'], sel_['rating']))
-        return ratings
+    def build_dict(self, matrix, item_ids):
+        return columnar.csr_to_dict(matrix, self.private_users.ids, item_ids)
 
     def build_sparse(self):
-
-        rows_cols = [(u, i) for u, items in self.i_train_dict.items() for i in items.keys()]
-        rows = [u for u, _ in rows_cols]
-        cols = [i for _, i in rows_cols]
-        data = sp.csr_matrix((np.ones_like(rows), (rows, cols)), dtype='float32',
-                             shape=(len(self.users), len(self.items)))
-        return data
+        return columnar.binarize(self.sp_i_train_ratings)
 
     def build_sparse_ratings(self):
-        rows_cols_ratings = [(u, i, r) for u, items in self.i_train_dict.items() for i, r in items.items()]
-        rows = [u for u, _, _ in rows_cols_ratings]
-        cols = [i for _, i, _ in rows_cols_ratings]
-        ratings = [r for _, _, r in rows_cols_ratings]
-
-        data = sp.csr_matrix((ratings, (rows, cols)), dtype='float32',
-                             shape=(len(self.users), len(self.items)))
-
-        return data
+        return self.sp_i_train_ratings
 
     def get_test(self):
         return self.test_dict
@@ -0,0 +1,106 @@
+"""
+Module description:
+Vectorized BPR triple sampler built on the CSR training matrix.
+
+"""
+
+__version__ = '0.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
+import queue
+import threading
+
+import numpy as np
+
+
+class Sampler:
+    """
+    Draw (user, positive item, negative item) triples as whole arrays.
+
+    Users are uniform among the users with at least one non-interacted item, positives are uniform in the user
+    profile, and negatives are uniform among the non-interacted items: every negative that collides with the user
+    profile is detected with a vectorized searchsorted on the sorted CSR rows and only those are resampled.
+    Batches have the same format as custom_sampler.Sampler, i.e., three (batch_size, 1) int arrays.
+    """
+
+    def __init__(self, sp_i_train, seed=42, prefetch=0):
+        """
+        :param sp_i_train: (users x items) CSR training matrix
+        :param seed: seed of the random generator
+        :param prefetch: number of batches prepared in advance by a background thread (0 disables prefetching)
+        """
+        train = sp_i_train.tocsr()
+        if not train.has_sorted_indices:
+            train = train.sorted_indices()
+        self._nusers, self._nitems = train.shape
+        self._indptr = train.indptr.astype(np.int64)
+        self._indices = train.indices.astype(np.int64)
+        self._lengths = np.diff(self._indptr)
+        # CSR rows are sorted, hence the linearized (user, item) keys are globally sorted
+        self._keys = np.repeat(np.arange(self._nusers, dtype=np.int64), self._lengths) * self._nitems + self._indices
+        self._users = np.flatnonzero((self._lengths > 0) & (self._lengths < self._nitems))
+        self._prefetch = prefetch
+        self._random = np.random.default_rng(seed)
+
+    def _is_positive(self, users, items):
+        keys = users * self._nitems + items
+        positions = np.minimum(np.searchsorted(self._keys, keys), len(self._keys) - 1)
+        return self._keys[positions] == keys
+
+    def sample(self, size: int):
+        r = self._random
+        u = self._users[r.integers(len(self._users), size=size)]
+        i = self._indices[self._indptr[u] + (r.random(size) * self._lengths[u]).astype(np.int64)]
+        j = r.integers(self._nitems, size=size)
+        collisions = np.flatnonzero(self._is_positive(u, j))
+        while len(collisions):
+            j[collisions] = r.integers(self._nitems, size=len(collisions))
+            collisions = collisions[self._is_positive(u[collisions], j[collisions])]
+        return u, i, j
+
+    def _batches(self, events: int, batch_size: int):
+        for batch_start in range(0, events, batch_size):
+            bui, bii, bij = self.sample(min(batch_start + batch_size, events) - batch_start)
+            yield bui[:, None], bii[:, None], bij[:, None]
+
+    def step(self, events: int, batch_size: int):
+        if not self._prefetch:
+            yield from self._batches(events, batch_size)
+            return
+
+        buffer = queue.Queue(maxsize=self._prefetch)
+        stop = threading.Event()
+        end = object()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    buffer.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                for batch in self._batches(events, batch_size):
+                    if not put(batch):
+                        return
+                put(end)
+            except Exception as ex:
+                put(ex)
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        try:
+            while True:
+                batch = buffer.get()
+                if batch is end:
+                    break
+                if isinstance(batch, Exception):
+                    raise batch
+                yield batch
+        finally:
+            stop.set()
+            producer.join()
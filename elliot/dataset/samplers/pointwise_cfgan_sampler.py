@@ -1,66 +1,90 @@
 """
 Module description:
+Vectorized CFGAN batch sampler.
 
+The training rows of a whole batch of users are sliced from the CSR matrix at once, and the zero-reconstruction (ZR)
+and partial-masking (PM) negatives are drawn as (batch_size x draws) arrays: the draws that collide with the user
+profile are detected with a searchsorted on the sorted linearized (user, item) keys, and only those are drawn again.
+The dense float32 batch buffers are allocated once per training loop, and only their nonzero entries are reset
+between two batches.
 """
 
 __version__ = '0.1'
 __author__ = 'Felice Antonio Merra, Vito Walter Anelli, Claudio Pomo'
 __email__ = 'felice.merra@poliba.it, vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 
-import random
-
 import numpy as np
 
 np.random.seed(42)
 
 
 class Sampler:
-    def __init__(self, indexed_ratings, sp_i_train, s_zr, s_pm):
+    def __init__(self, indexed_ratings, sp_i_train, s_zr, s_pm, seed=42):
+        """
+        :param indexed_ratings: training ratings in the form {user: {item: rating}} (public indices)
+        :param sp_i_train: (users x items) CSR training matrix
+        :param s_zr: share of the items drawn as zero-reconstruction negatives of every user
+        :param s_pm: share of the items drawn as partial-masking negatives of every user
+        :param seed: seed of the random generator
+        """
         self._indexed_ratings = indexed_ratings
-        self._users = list(self._indexed_ratings.keys())
-        self._nusers = len(self._users)
-        self._items = list({k for a in self._indexed_ratings.values() for k in a.keys()})
-        self._nitems = len(self._items)
-        self._ui_dict = {u: list(set(indexed_ratings[u])) for u in indexed_ratings}
-        self._lui_dict = {u: len(v) for u, v in self._ui_dict.items()}
-        self._s_zr = s_zr
-        self._s_pm = s_pm
-        self._sp_i_train = sp_i_train
-
-    def step(self, events: int, batch_size: int):
-        r_int = np.random.randint
-        n_users = self._nusers
-        n_items = self._nitems
-        ui_dict = self._ui_dict
-        s_zr = self._s_zr
-        s_pm = self._s_pm
-        sp_i_train = self._sp_i_train
+        train = sp_i_train.tocsr()
+        if not train.has_sorted_indices:
+            train = train.sorted_indices()
+        self._train = train
+        self._nusers, self._nitems = train.shape
+        lengths = np.diff(train.indptr)
+        self._keys = np.repeat(np.arange(self._nusers, dtype=np.int64), lengths) * self._nitems + train.indices
+        # users without any unseen item cannot get negatives
+        self._users = np.flatnonzero(lengths < self._nitems)
+        self._n_zr = int(s_zr * self._nitems)
+        self._n_pm = int(s_pm * self._nitems)
+        self._random = np.random.default_rng(seed)
 
-        def sample(C_u, N_zr, mask, n):
-            u = r_int(n_users)
-            ui = ui_dict[u]
+    def _is_positive(self, users, items):
+        if not len(self._keys):
+            return np.zeros(len(users), dtype=bool)
+        keys = users * self._nitems + items
+        positions = np.minimum(np.searchsorted(self._keys, keys), len(self._keys) - 1)
+        return self._keys[positions] == keys
 
-            for i in ui:
-                mask[n][i] = 1
+    def _negatives(self, users, n):
+        """
+        (rows, items) of n items drawn uniformly (with replacement) among the unseen items of every user
+        """
+        rows = np.repeat(np.arange(len(users)), n)
+        users = users[rows]
+        items = self._random.integers(self._nitems, size=len(rows))
+        collisions = np.flatnonzero(self._is_positive(users, items))
+        while len(collisions):
+            items[collisions] = self._random.integers(self._nitems, size=len(collisions))
+            collisions = collisions[self._is_positive(users[collisions], items[collisions])]
+        return rows, items
 
-            for i in range(int(s_zr * n_items)):
-                ng = r_int(n_items)
-                while ui_dict[u].has_key(ng):
-                    ng = r_int(n_items)
-                N_zr[n][ng] = 1
+    def step(self, events: int, batch_size: int):
+        """
+        Batches of (C_u, mask, N_zr) float32 arrays of shape (users in the batch x items). The arrays are reused by
+        the next batch, hence they must be consumed before requesting it
+        """
+        buffers = [np.zeros((min(batch_size, events), self._nitems), dtype=np.float32) for _ in range(3)]
+        for batch_start in range(0, events, batch_size):
+            size = min(batch_start + batch_size, events) - batch_start
+            C_u, mask, N_zr = (b[:size] for b in buffers)
+            users = self._users[self._random.integers(len(self._users), size=size)]
 
-            for i in range(int(s_pm * n_items)):
-                ng = r_int(n_items)
-                while ui_dict[u].has_key(ng):
-                    ng = r_int(n_items)
-                mask[n][ng] = 1
+            batch = self._train[users]
+            rows, cols = np.repeat(np.arange(size), np.diff(batch.indptr)), batch.indices
+            pm_rows, pm_items = self._negatives(users, self._n_pm)
+            zr_rows, zr_items = self._negatives(users, self._n_zr)
 
-            C_u[n] = sp_i_train.getrow(u).toarray()
+            C_u[rows, cols] = batch.data
+            mask[rows, cols] = 1
+            mask[pm_rows, pm_items] = 1
+            N_zr[zr_rows, zr_items] = 1
 
-        for batch_start in range(0, events, batch_size):
-            C_u, mask, N_zr = np.zeros((batch_size, n_items)), np.zeros((batch_size, n_items)), np.zeros(
-                (batch_size, n_items))
-            for n, _ in enumerate(range(batch_start, min(batch_start + batch_size, events))):
-                sample(C_u, N_zr, mask, n)
-            # zip(*[sample(C_u, N_zr, mask, n) for n, _ in enumerate(range(batch_start, min(batch_start + batch_size, events)))])
             yield C_u, mask, N_zr
+
+            C_u[rows, cols] = 0
+            mask[rows, cols] = 0
+            mask[pm_rows, pm_items] = 0
+            N_zr[zr_rows, zr_items] = 0
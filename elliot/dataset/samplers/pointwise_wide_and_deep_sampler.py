@@ -1,6 +1,11 @@
 """
 Module description:
+Pointwise sampler of Wide&Deep.
 
+Each sample is a (user, item, wide input, label) tuple, where the wide input marks the user, the item, and the item
+features. By default it is a dense list of length users + items + features. In sparse mode the (user, item, label)
+arrays of a whole batch are drawn at once (see custom_csr_sampler), and the wide input is a (batch_size x wide size)
+CSR matrix gathered from the precomputed wide rows of the items.
 """
 
 __version__ = '0.1'
@@ -11,24 +16,57 @@ import random
 
 import numpy as np
 import itertools
+import scipy.sparse as sp
+
+from elliot.dataset.samplers import custom_csr_sampler as cs
 
 np.random.seed(42)
 
 
+def wide_item_rows(num_users, num_items, sp_i_features):
+    """
+    (items x wide size) CSR matrix of the wide columns of every item: its one-hot column, after the user columns, and
+    its features, one block of columns per feature type. User columns are left empty
+    """
+    blocks = [sp.csr_matrix((num_items, num_users), dtype=np.float32),
+              sp.identity(num_items, dtype=np.float32, format="csr")]
+    blocks += [sp.csr_matrix(sp_i_feature, dtype=np.float32) for sp_i_feature in sp_i_features]
+    rows = sp.hstack(blocks, format="csr")
+    rows.sort_indices()
+    return rows
+
+
 class Sampler:
-    def __init__(self, data):
+    def __init__(self, data, sparse=False, seed=42):
+        """
+        :param sparse: emit the wide input of a batch as a CSR matrix instead of dense lists
+        :param seed: seed of the random generator of the sparse mode
+        """
         self._data = data
-        self._indexed_ratings = self._data.i_train_dict
-        self._users = list(self._indexed_ratings.keys())
-        self._nusers = len(self._users)
-        self._items = list({k for a in self._indexed_ratings.values() for k in a.keys()})
-        self._nitems = len(self._items)
-        self._ui_dict = {u: list(set(self._indexed_ratings[u])) for u in self._indexed_ratings}
-        self._lui_dict = {u: len(v) for u, v in self._ui_dict.items()}
-
-        self._nfeatures = len(data.features)
+        self._sparse = sparse
+
+        if sparse:
+            # the sparse mode only reads the CSR training matrix and the wide rows
+            self._csr_sampler = cs.Sampler(data.sp_i_train, seed)
+            self._random = np.random.default_rng(seed)
+            self._wide_rows = getattr(data, "sp_i_wide", None)
+            if self._wide_rows is None:
+                self._wide_rows = wide_item_rows(data.num_users, data.num_items, data.sp_i_features)
+        else:
+            self._indexed_ratings = self._data.i_train_dict
+            self._users = list(self._indexed_ratings.keys())
+            self._nusers = len(self._users)
+            self._items = list({k for a in self._indexed_ratings.values() for k in a.keys()})
+            self._nitems = len(self._items)
+            self._ui_dict = {u: list(set(self._indexed_ratings[u])) for u in self._indexed_ratings}
+            self._lui_dict = {u: len(v) for u, v in self._ui_dict.items()}
+
+            self._nfeatures = len(data.features)
 
     def step(self, events: int, batch_size: int):
+        if self._sparse:
+            yield from self._sparse_step(events, batch_size)
+            return
         r_int = np.random.randint
         n_users = self._nusers
         n_items = self._nitems
@@ -70,3 +108,17 @@ class Sampler:
             u, i, s, b = map(np.array,
                              zip(*[sample() for _ in range(batch_start, min(batch_start + batch_size, events))]))
             yield u, i, s, b
+
+    def _sparse_step(self, events: int, batch_size: int):
+        """
+        Batches of (user, item, wide CSR input, label) with labels drawn uniformly: positives are uniform in the user
+        profile, negatives uniform among the non-interacted items
+        """
+        for batch_start in range(0, events, batch_size):
+            size = min(batch_start + batch_size, events) - batch_start
+            u, i, j = self._csr_sampler.sample(size)
+            b = self._random.integers(2, size=size)
+            i = np.where(b == 1, i, j)
+            users = sp.csr_matrix((np.ones(size, dtype=np.float32), u, np.arange(size + 1)),
+                                  shape=(size, self._wide_rows.shape[1]))
+            yield u, i, users + self._wide_rows[i], b
@@ -0,0 +1,174 @@
+"""
+Module description:
+Matrix-based evaluation engine computing the top-k accuracy and coverage metrics for all the cutoffs at once.
+
+evaluation:
+  engine: batched
+
+Recommendations are turned into a (users x max_cutoff) int32 item-index matrix, and the test relevance into a CSR
+matrix (see SparseRelevance). The hit positions are located once for the longest cutoff, and every metric keeps the
+prefix sums of its per-position contributions, so that the per-user values at any cutoff are read from a single column.
+Their values match the per-user implementations in elliot.evaluation.metrics.
+"""
+
+__version__ = '0.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
+import typing as t
+
+import numpy as np
+import pandas as pd
+
+from elliot.evaluation.relevance.relevance import SparseRelevance, ragged_positions
+
+
+class BatchedEvaluation:
+    """
+    Vectorized computation of nDCG, Precision, Recall, HR, MRR, MAP, MAR, F1, LAUC, NumRetrieved, ItemCoverage,
+    UserCoverage, and UserCoverageAtN
+    """
+
+    user_metrics = ["nDCG", "Precision", "Recall", "HR", "MRR", "MAP", "MAR", "F1", "LAUC", "NumRetrieved"]
+    global_metrics = ["ItemCoverage", "UserCoverage", "UserCoverageAtN"]
+    supported_metrics = set(user_metrics + global_metrics)
+
+    def __init__(self, recommendations: t.Dict[t.Any, t.List[t.Tuple[t.Any, float]]], relevance: SparseRelevance,
+                 max_cutoff: int, train_sizes: t.Optional[t.Dict[t.Any, int]] = None, num_items: int = None):
+        """
+        Constructor
+        :param recommendations: recommendations in the form {user: [(item1,value1),...]}
+        :param relevance: sparse relevance of the test set
+        :param max_cutoff: longest cutoff to evaluate
+        :param train_sizes: number of training items of every user, needed by LAUC
+        :param num_items: number of items of the catalog, needed by LAUC
+        """
+        self._users = list(recommendations.keys())
+        rec_lists = [recommendations[u][:max_cutoff] for u in self._users]
+        self._lengths = np.fromiter(map(len, rec_lists), dtype=np.int64, count=len(rec_lists))
+        flat_items = np.asarray([i for u_r in rec_lists for i, _ in u_r])
+
+        item_codes, rec_items = pd.factorize(flat_items)
+        rows, cols, _ = ragged_positions(np.zeros(len(rec_lists), dtype=np.int64), self._lengths)
+        self._item_matrix = np.full((len(rec_lists), max_cutoff), -1, dtype=np.int32)
+        self._item_matrix[rows, cols] = item_codes
+
+        user_rows = relevance.user_rows(self._users)
+        rec_columns = np.append(relevance.item_columns(np.asarray(rec_items)), -1)
+        self._gains = relevance.gains(user_rows, rec_columns[self._item_matrix])
+        self._hits = (self._gains > 0).astype(np.float64)
+        self._cum_hits = np.cumsum(self._hits, axis=1)
+        self._n_relevant = relevance.n_relevant(user_rows)
+        self._evaluated = self._n_relevant > 0
+        self._ideal_gains = relevance.ideal_gains(user_rows, max_cutoff)
+        self._discount = np.log(2) / np.log(np.arange(max_cutoff) + 2)
+        self._positions = np.arange(1, max_cutoff + 1)
+        self._train_sizes = None if train_sizes is None else \
+            np.fromiter((train_sizes.get(u, 0) for u in self._users), dtype=np.int64, count=len(self._users))
+        self._num_items = num_items
+        self._cache = {}
+
+    def compute(self, cutoffs: t.List[int], metric_names: t.List[str]) -> t.Dict[int, t.Tuple[t.Dict, t.Dict]]:
+        """
+        Evaluation of the requested metrics at every cutoff
+        :return: {cutoff: (results, per-user results)} where per-user results are in the form {metric: {user: value}}
+        """
+        evaluated_users = [u for u, e in zip(self._users, self._evaluated) if e]
+        output = {}
+        for k in cutoffs:
+            results, user_results = {}, {}
+            for name in metric_names:
+                if name in self.global_metrics:
+                    results[name] = getattr(self, f"_{name.lower()}")(k)
+                else:
+                    values = getattr(self, f"_{name.lower()}")(k)[self._evaluated]
+                    results[name] = np.average(values) if len(values) else np.nan
+                    user_results[name] = dict(zip(evaluated_users, values.tolist()))
+            output[k] = (results, user_results)
+        return output
+
+    def _prefix(self, name: str) -> np.ndarray:
+        """
+        (users x max_cutoff) prefix sums of the per-position contributions of a metric, built once for all the cutoffs
+        """
+        if name not in self._cache:
+            self._cache[name] = np.cumsum(getattr(self, f"_{name}_contributions")(), axis=1)
+        return self._cache[name]
+
+    def _dcg_contributions(self):
+        return self._gains * self._discount
+
+    def _idcg_contributions(self):
+        return self._ideal_gains * self._discount
+
+    def _precision_contributions(self):
+        return self._cum_hits / self._positions
+
+    def _cum_hits_contributions(self):
+        return self._cum_hits
+
+    def _lauc_contributions(self):
+        if self._train_sizes is None or self._num_items is None:
+            raise Exception("LAUC requires the training sizes and the number of items")
+        neg_num = (self._num_items - self._train_sizes - self._n_relevant + 1)[:, None].astype(np.float64)
+        # the p-th hit, found at position r, contributes (neg_num - r + p) / neg_num
+        return self._hits * (neg_num - (self._positions - 1) + (self._cum_hits - 1)) / neg_num
+
+    def _hits_at(self, k):
+        return self._cum_hits[:, k - 1]
+
+    def _safe_n_relevant(self):
+        return np.maximum(self._n_relevant, 1)
+
+    def _ndcg(self, k):
+        dcg = self._prefix("dcg")[:, k - 1]
+        idcg = self._prefix("idcg")[:, k - 1]
+        return np.divide(dcg, idcg, out=np.zeros_like(dcg), where=dcg > 0)
+
+    def _precision(self, k):
+        return self._hits_at(k) / k
+
+    def _recall(self, k):
+        return self._hits_at(k) / self._safe_n_relevant()
+
+    def _hr(self, k):
+        return (self._hits_at(k) > 0).astype(np.float64)
+
+    def _mrr(self, k):
+        if "first_hit" not in self._cache:
+            self._cache["first_hit"] = np.where(self._hits.any(axis=1), np.argmax(self._hits, axis=1),
+                                                      self._hits.shape[1])
+        first = self._cache["first_hit"]
+        return np.where(first < k, 1 / (first + 1), 0.0)
+
+    def _map(self, k):
+        return self._prefix("precision")[:, k - 1] / k
+
+    def _mar(self, k):
+        return self._prefix("cum_hits")[:, k - 1] / k / self._safe_n_relevant()
+
+    def _lauc(self, k):
+        return self._prefix("lauc")[:, k - 1] / np.maximum(np.minimum(k, self._n_relevant), 1)
+
+    def _f1(self, k):
+        p, r = self._precision(k), self._recall(k)
+        den = p + r
+        return np.divide(2 * p * r, den, out=np.zeros_like(den), where=den != 0)
+
+    def _numretrieved(self, k):
+        return np.minimum(self._lengths, k).astype(np.float64)
+
+    def _itemcoverage(self, k):
+        if "first_position" not in self._cache:
+            # earliest position at which every recommended item appears, counted once per position
+            rows, cols = np.nonzero(self._item_matrix >= 0)
+            first = np.full(self._item_matrix.max(initial=-1) + 1, self._item_matrix.shape[1], dtype=np.int64)
+            np.minimum.at(first, self._item_matrix[rows, cols], cols)
+            self._cache["first_position"] = np.cumsum(np.bincount(first, minlength=self._item_matrix.shape[1] + 1))
+        return int(self._cache["first_position"][k - 1])
+
+    def _usercoverage(self, k):
+        return int(np.sum(self._lengths > 0))
+
+    def _usercoverageatn(self, k):
+        return int(np.sum(self._lengths >= k))
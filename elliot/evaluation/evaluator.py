@@ -26,12 +26,15 @@ from time import time
 from types import SimpleNamespace
 import logging as pylog
 import numpy as np
+import scipy.sparse as sp
 
 import elliot.dataset.dataset as ds
 from elliot.utils import logging
 from . import metrics
 from . import popularity_utils
 from . import relevance
+from .batched_evaluation import BatchedEvaluation
+from .metrics.base_metric import BaseMetric
 
 
 class Evaluator(object):
@@ -52,6 +55,9 @@ class Evaluator(object):
         self._rel_threshold = data.config.evaluation.relevance_threshold
         self._paired_ttest = self._data.config.evaluation.paired_ttest
         self._metrics = metrics.parse_metrics(data.config.evaluation.simple_metrics)
+        self._engine = getattr(data.config.evaluation, "engine", "standard")
+        if self._engine not in ["standard", "batched"]:
+            raise Exception(f"Evaluation engine {self._engine} not recognized")
         #TODO
         _validation_metric = getattr(self._params.meta, "validation_metric", "nDCG@10").split("@")[0]
         if _validation_metric.lower() not in [m.lower() for m in data.config.evaluation.simple_metrics]:
@@ -73,6 +79,8 @@ class Evaluator(object):
                                                            num_items=self._data.num_items,
                                                            data = self._data,
                                                            additional_metrics=self._complex_metrics)
+        self._full_ranking = any([m.needs_full_ranking() for m in self._metrics])
+        self._ranked_items = None
         self._needed_recommendations = self._compute_needed_recommendations()
 
     def eval(self, recommendations):
@@ -81,8 +89,13 @@ class Evaluator(object):
         :return:
         """
         result_dict = {}
+        self._set_ranks(recommendations)
+        # the lists of the evaluated users are read once and shared by all the cutoffs
+        split_recommendations = self._split_recommendations(recommendations)
+        batched_results = self._batched_eval(split_recommendations) if self._engine == "batched" else [None, None]
         for k in self._k:
-            val_results, val_statistical_results, test_results, test_statistical_results = self.eval_at_k(recommendations, k)
+            val_results, val_statistical_results, test_results, test_statistical_results = \
+                self.eval_at_k(recommendations, k, batched_results, split_recommendations)
             local_result_dict ={"val_results": val_results,
                                 "val_statistical_results": val_statistical_results,
                                 "test_results": test_results,
@@ -90,12 +103,16 @@ class Evaluator(object):
             result_dict[k] = local_result_dict
         return result_dict
 
-    def eval_at_k(self, recommendations, k):
+    def eval_at_k(self, recommendations, k, batched_results=(None, None), split_recommendations=None):
         result_list = []
-        for test_data, eval_objs in self._get_test_data():
+        if split_recommendations is None:
+            split_recommendations = self._split_recommendations(recommendations)
+        for (test_data, eval_objs), user_recommendations, batched in zip(self._get_test_data(), split_recommendations,
+                                                                          batched_results):
             if eval_objs is not None:
                 eval_objs.cutoff = k
-            results, statistical_results = self._process_test_data(recommendations, test_data, eval_objs)
+            results, statistical_results = self._process_test_data(user_recommendations, test_data, eval_objs,
+                                                                   batched[k] if batched else None)
             result_list.append((results, statistical_results))
 
         if (not result_list[0][0]):
@@ -112,19 +129,60 @@ class Evaluator(object):
                  self._evaluation_objects if hasattr(self, '_evaluation_objects') else None)
                 ]
 
-    def _process_test_data(self, recommendations, test_data, eval_objs):
+    def _split_recommendations(self, recommendations):
+        """
+        Recommendations of the users of every split, None where the split is missing
+        """
+        split_recommendations = []
+        for test_data, eval_objs in self._get_test_data():
+            if (not test_data) or (not eval_objs):
+                split_recommendations.append(None)
+            else:
+                split_recommendations.append({u: recs for u, recs in recommendations.items() if test_data.get(u, [])})
+        return split_recommendations
+
+    def _batched_eval(self, split_recommendations):
+        """
+        Matrix-based evaluation of the supported metrics for all the cutoffs, for validation and test
+        :return: list of {cutoff: (results, per-user results)}, None where the split is missing
+        """
+        names = [m.name() for m in self._metrics if m.name() in BatchedEvaluation.supported_metrics]
+        train_sizes = dict(zip(self._data.private_users.values(), np.diff(self._data.sp_i_train.indptr).tolist())) \
+            if "LAUC" in names else None
+        batched_results = []
+        for user_recommendations, (_, eval_objs) in zip(split_recommendations, self._get_test_data()):
+            if user_recommendations is None:
+                batched_results.append(None)
+                continue
+            engine = BatchedEvaluation(user_recommendations, eval_objs.relevance.sparse_relevance, max(self._k),
+                                       train_sizes, self._data.num_items)
+            batched_results.append(engine.compute(self._k, names))
+        return batched_results
+
+    def _process_test_data(self, recommendations, test_data, eval_objs, batched=None):
         if (not test_data) or (not eval_objs):
             return None, None
         else:
-            recommendations = {u: recs for u, recs in recommendations.items() if test_data.get(u, [])}
             rounding_factor = 5
             eval_start_time = time()
 
-            metric_objects = [m(recommendations, self._data.config, self._params, eval_objs) for m in self._metrics]
+            simple_metrics = [m for m in self._metrics if batched is None or m.name() not in batched[0]]
+            metric_objects = [m(recommendations, self._data.config, self._params, eval_objs) for m in simple_metrics]
             for metric in self._complex_metrics:
                 metric_objects.extend(metrics.parse_metric(metric["metric"])(recommendations, self._data.config,
                                                                              self._params, eval_objs, metric).get())
-            results = {m.name(): m.eval() for m in metric_objects}
+            statistical_results = {}
+            results = {}
+            for position, m in enumerate(metric_objects):
+                if self._paired_ttest and position < len(simple_metrics) and isinstance(m, metrics.StatisticalMetric):
+                    # per-user values are computed once, and averaged by the metrics that do not override eval
+                    statistical_results[m.name()] = m.eval_user_metric()
+                    results[m.name()] = np.average(list(statistical_results[m.name()].values())) \
+                        if type(m).eval is BaseMetric.eval else m.eval()
+                else:
+                    results[m.name()] = m.eval()
+            if batched is not None:
+                results = {**{m.name(): batched[0].get(m.name()) for m in self._metrics}, **results}
 
             str_results = {k: str(round(v, rounding_factor)) for k, v in results.items()}
             # res_print = "\t".join([":".join(e) for e in str_results.items()])
@@ -133,13 +191,8 @@ class Evaluator(object):
             self.logger.info(f"Results")
             [self.logger.info("\t".join(e)) for e in str_results.items()]
 
-            statistical_results = {}
-            if self._paired_ttest:
-                statistical_results = {metric_object.name(): metric_object.eval_user_metric()
-                                       for metric_object in
-                                       [m(recommendations, self._data.config, self._params, eval_objs) for m
-                                        in self._metrics]
-                                       if isinstance(metric_object, metrics.StatisticalMetric)}
+            if self._paired_ttest and batched is not None:
+                statistical_results.update(batched[1])
             return results, statistical_results
 
     def _compute_needed_recommendations(self):
@@ -149,10 +202,47 @@ class Evaluator(object):
             self.logger.warn("At least one basic metric requires full length recommendations")
         if full_recommendations_additional_metrics:
             self.logger.warn("At least one additional metric requires full length recommendations", None, 1, None)
-        if full_recommendations_metrics or full_recommendations_metrics:
+        self._needed_ranked_recommendations = self._data.num_items if (full_recommendations_metrics or
+                                                                       full_recommendations_additional_metrics) \
+            else self._data.config.top_k
+        if self._full_ranking:
+            # models that do not provide full-catalog ranks fall back to full length lists
             return self._data.num_items
-        else:
-            return self._data.config.top_k
+        return self._needed_ranked_recommendations
 
     def get_needed_recommendations(self):
         return self._needed_recommendations
+
+    def get_needed_ranked_recommendations(self):
+        """
+        Length of the recommendation lists needed when the full-catalog ranks of the test positives are provided
+        """
+        return self._needed_ranked_recommendations
+
+    def get_ranked_items(self):
+        """
+        (users x items) CSR matrix marking the validation and test positives whose full-catalog rank is needed by the
+        rank-based metrics (e.g., AUC), None if no such metric is requested
+        """
+        if not self._full_ranking:
+            return None
+        if self._ranked_items is None:
+            public_users, public_items = self._data.public_users, self._data.public_items
+            pairs = {(public_users[u], public_items[i])
+                     for test_data, eval_objs in self._get_test_data() if test_data and eval_objs
+                     for u in test_data.keys() if u in public_users
+                     for i in eval_objs.relevance.binary_relevance.get_user_rel(u) if i in public_items}
+            rows, cols = (np.fromiter(c, dtype=np.int64, count=len(pairs)) for c in zip(*pairs)) if pairs \
+                else (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+            self._ranked_items = sp.csr_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)),
+                                               shape=(self._data.num_users, self._data.num_items))
+            self._ranked_items.sort_indices()
+        return self._ranked_items
+
+    def _set_ranks(self, recommendations):
+        ranks = recommendations if getattr(recommendations, "ranks", None) is not None else None
+        if self._full_ranking and ranks is None:
+            self.logger.warn("Full-catalog ranks not provided: rank-based metrics use the recommendation lists")
+        for _, eval_objs in self._get_test_data():
+            if eval_objs is not None:
+                eval_objs.ranks = ranks
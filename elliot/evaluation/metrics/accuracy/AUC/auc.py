@@ -10,7 +10,6 @@ __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 import numpy as np
 
 from elliot.evaluation.metrics.base_metric import BaseMetric
-from elliot.utils import logging
 
 
 class AUC(BaseMetric):
@@ -56,6 +55,7 @@ class AUC(BaseMetric):
         self._cutoff = self._evaluation_objects.cutoff
         self._relevance = self._evaluation_objects.relevance.binary_relevance
         self._num_items = self._evaluation_objects.num_items
+        self._ranks = getattr(self._evaluation_objects, "ranks", None)
 
     @staticmethod
     def name():
@@ -69,14 +69,16 @@ class AUC(BaseMetric):
     def __user_auc(user_recommendations, user_relevant_items, num_items, train_size):
         """
         Per User Computation of AUC values
-        :param user_recommendations: list of user recommendation in the form [(item1,value1),...]
+        :param user_recommendations: list of user recommendation in the form [(item1,value1),...], or the sorted
+            array of the full-catalog ranks of the user relevant items
         :param user_relevant_items: list of user relevant items in the form [item1,...]
         :param num_items: overall number of items considered in the training set
         :param train_size: length of the user profile
         :return: the list of the AUC values per each test item
         """
         neg_num = num_items - train_size - len(user_relevant_items) + 1
-        pos_ranks = [r for r, (i, _) in enumerate(user_recommendations) if i in user_relevant_items]
+        pos_ranks = user_recommendations if isinstance(user_recommendations, np.ndarray) else \
+            [r for r, (i, _) in enumerate(user_recommendations) if i in user_relevant_items]
         return [(neg_num - r_r + p_r) / (neg_num) for p_r, r_r in enumerate(pos_ranks)]
 
     def eval(self):
@@ -84,12 +86,18 @@ class AUC(BaseMetric):
         Evaluation function
         :return: the overall value of AUC
         """
-        list_of_lists = [AUC.__user_auc(u_r, self._relevance.get_user_rel(u), self._num_items, len(self._evaluation_objects.data.train_dict[u]))
+        list_of_lists = [AUC.__user_auc(self._user_ranks(u, u_r), self._relevance.get_user_rel(u), self._num_items, len(self._evaluation_objects.data.train_dict[u]))
              for u, u_r in self._recommendations.items() if len(self._relevance.get_user_rel(u))]
         return np.average([item for sublist in list_of_lists for item in sublist])
 
+    def _user_ranks(self, user, user_recommendations):
+        """
+        Sorted full-catalog ranks of the user positives when the model provides them, the recommendation list otherwise
+        """
+        if self._ranks is None:
+            return user_recommendations
+        return np.sort(self._ranks.get_ranks(user, self._relevance.get_user_rel(user)))
+
     @staticmethod
-    def needs_full_recommendations():
-        _logger = logging.get_logger("Evaluator")
-        _logger.warn("AUC metric requires full length recommendations")
+    def needs_full_ranking():
         return True
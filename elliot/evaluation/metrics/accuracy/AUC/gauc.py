@@ -10,7 +10,6 @@ __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 import numpy as np
 
 from elliot.evaluation.metrics.base_metric import BaseMetric
-from elliot.utils import logging
 
 
 class GAUC(BaseMetric):
@@ -60,6 +59,7 @@ class GAUC(BaseMetric):
         self._cutoff = self._evaluation_objects.cutoff
         self._relevance = self._evaluation_objects.relevance.binary_relevance
         self._num_items = self._evaluation_objects.num_items
+        self._ranks = getattr(self._evaluation_objects, "ranks", None)
 
     @staticmethod
     def name():
@@ -73,13 +73,15 @@ class GAUC(BaseMetric):
     def __user_gauc(user_recommendations, user_relevant_items, num_items, train_size):
         """
         Per User AUC
-        :param user_recommendations: list of user recommendation in the form [(item1,value1),...]
+        :param user_recommendations: list of user recommendation in the form [(item1,value1),...], or the sorted
+            array of the full-catalog ranks of the user relevant items
         :param cutoff: numerical threshold to limit the recommendation list
         :param user_relevant_items: list of user relevant items in the form [item1,...]
         :return: the value of the Precision metric for the specific user
         """
         neg_num = num_items - train_size - len(user_relevant_items) + 1
-        pos_ranks = [r for r, (i, _) in enumerate(user_recommendations) if i in user_relevant_items]
+        pos_ranks = user_recommendations if isinstance(user_recommendations, np.ndarray) else \
+            [r for r, (i, _) in enumerate(user_recommendations) if i in user_relevant_items]
         return sum([(neg_num - r_r + p_r)/(neg_num) for p_r, r_r in enumerate(pos_ranks)])/len(user_relevant_items)
 
     def eval(self):
@@ -89,7 +91,7 @@ class GAUC(BaseMetric):
         """
 
         return np.average(
-            [GAUC.__user_gauc(u_r, self._relevance.get_user_rel(u), self._num_items, len(self._evaluation_objects.data.train_dict[u]))
+            [GAUC.__user_gauc(self._user_ranks(u, u_r), self._relevance.get_user_rel(u), self._num_items, len(self._evaluation_objects.data.train_dict[u]))
              for u, u_r in self._recommendations.items() if len(self._relevance.get_user_rel(u))]
         )
 
@@ -98,13 +100,17 @@ class GAUC(BaseMetric):
         Evaluation function
         :return: the overall averaged value of AUC per user
         """
-        return {u: GAUC.__user_gauc(u_r, self._relevance.get_user_rel(u), self._num_items, len(self._evaluation_objects.data.train_dict[u]))
+        return {u: GAUC.__user_gauc(self._user_ranks(u, u_r), self._relevance.get_user_rel(u), self._num_items, len(self._evaluation_objects.data.train_dict[u]))
              for u, u_r in self._recommendations.items() if len(self._relevance.get_user_rel(u))}
 
+    def _user_ranks(self, user, user_recommendations):
+        """
+        Sorted full-catalog ranks of the user positives when the model provides them, the recommendation list otherwise
+        """
+        if self._ranks is None:
+            return user_recommendations
+        return np.sort(self._ranks.get_ranks(user, self._relevance.get_user_rel(user)))
 
     @staticmethod
-    def needs_full_recommendations():
-        _logger = logging.get_logger("Evaluator")
-        _logger.warn("\n*** WARNING: Group AUC metric requires full length recommendations")
+    def needs_full_ranking():
         return True
-
@@ -42,6 +42,13 @@ class BaseMetric(ABC):
     def needs_full_recommendations():
         return False
 
+    @staticmethod
+    def needs_full_ranking():
+        """
+        True for the metrics that need the full-catalog rank of the test positives (see TopKRecommendations.get_ranks)
+        """
+        return False
+
     def get(self):
         return [self]
 
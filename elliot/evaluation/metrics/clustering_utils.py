@@ -0,0 +1,129 @@
+"""
+Module description:
+Cached user/item clusterings for the clustering-based (fairness) metrics.
+
+Complex metrics are built again for every cutoff, split, and validation epoch, hence each (id \t cluster) file is
+parsed only once per process and shared by all the metric instances. Clusterings are also exposed as NumPy arrays
+indexed by the public ids of the dataset, so that the per-group sums can be computed with np.bincount.
+"""
+
+__version__ = '0.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
+import os
+import typing as t
+
+import numpy as np
+import pandas as pd
+
+_clusterings = {}
+
+
+def public_indices(public_ids, keys) -> np.ndarray:
+    """
+    Public indices of the given ids, -1 for the unknown ones
+    """
+    if hasattr(public_ids, "lookup"):
+        return np.asarray(public_ids.lookup(np.asarray(keys)), dtype=np.int64)
+    return np.fromiter((public_ids.get(k, -1) for k in keys), dtype=np.int64, count=len(keys))
+
+
+class Clustering(object):
+    """
+    Clustering read from a (id \t cluster) file
+    """
+
+    def __init__(self, path: str):
+        clustering = pd.read_csv(path, sep="\t", header=None)
+        self.n_clusters = clustering[1].nunique()
+        self.mapping = dict(zip(clustering[0], clustering[1]))
+        self.ids = np.array(list(self.mapping.keys()))
+        self.clusters = np.array(list(self.mapping.values()), dtype=np.int64)
+        self.sizes = np.bincount(self.clusters, minlength=self.n_clusters)
+        self._indexed = {}
+
+    def __len__(self):
+        return len(self.mapping)
+
+    def indexed(self, public_ids, size: int) -> np.ndarray:
+        """
+        Cluster of every public index of a dataset, -1 for the ids not in the clustering
+        """
+        key = id(public_ids)
+        if key not in self._indexed or self._indexed[key][0] is not public_ids:
+            codes = np.full(size, -1, dtype=np.int64)
+            positions = public_indices(public_ids, self.ids)
+            known = positions >= 0
+            codes[positions[known]] = self.clusters[known]
+            self._indexed[key] = (public_ids, codes)
+        return self._indexed[key][1]
+
+    def codes(self, keys: t.Sequence, public_ids, size: int) -> np.ndarray:
+        """
+        Clusters of the given ids, -1 for the ids not in the clustering
+        """
+        positions = public_indices(public_ids, keys)
+        codes = np.full(len(keys), -1, dtype=np.int64)
+        codes[positions >= 0] = self.indexed(public_ids, size)[positions[positions >= 0]]
+        # ids outside the dataset (e.g., items only in the test set) are looked up by id
+        for p in np.flatnonzero(positions < 0):
+            codes[p] = self.mapping.get(keys[p], -1)
+        return codes
+
+
+def load_clustering(path) -> t.Optional[Clustering]:
+    """
+    Clustering of the given file, parsed once per process (and again only if the file changes)
+    :param path: path of the (id \t cluster) file, None or False if not given
+    """
+    if not path:
+        return None
+    key = (os.path.abspath(path), os.path.getmtime(path))
+    if key not in _clusterings:
+        _clusterings[key] = Clustering(path)
+    return _clusterings[key]
+
+
+def indexed_clusters(clustering: t.Optional[Clustering], public_ids, size: int, default: int = -1) -> np.ndarray:
+    """
+    Cluster of every public index of a dataset, or default for every index if the clustering is not given
+    """
+    if clustering is None:
+        return np.full(size, default, dtype=np.int64)
+    return clustering.indexed(public_ids, size)
+
+
+def cluster_codes(clustering: t.Optional[Clustering], keys: t.Sequence, public_ids, size: int,
+                  default: int = -1) -> np.ndarray:
+    """
+    Clusters of the given ids, or default for every id if the clustering is not given
+    """
+    if clustering is None:
+        return np.full(len(keys), default, dtype=np.int64)
+    return clustering.codes(keys, public_ids, size)
+
+
+def group_sums(codes: np.ndarray, n_clusters: int, weights: np.ndarray = None) -> np.ndarray:
+    """
+    Per-cluster sums (or counts) of the given values, ignoring the -1 codes
+    """
+    known = codes >= 0
+    return np.bincount(codes[known], weights=None if weights is None else weights[known],
+                       minlength=n_clusters).astype(np.float64)
+
+
+def pair_counts(groups: np.ndarray, categories: np.ndarray, n_groups: int, n_categories: int) -> np.ndarray:
+    """
+    (n_groups x n_categories) counts of the (group, category) pairs, ignoring the -1 codes
+    """
+    known = (groups >= 0) & (categories >= 0)
+    return np.bincount(groups[known] * n_categories + categories[known],
+                       minlength=n_groups * n_categories).astype(np.float64).reshape(n_groups, n_categories)
+
+
+def pairwise_absolute_differences(values: np.ndarray) -> np.ndarray:
+    """
+    |values[i] - values[j]| for every i < j
+    """
+    return np.abs(values[:, None] - values[None, :])[np.triu_indices(len(values), 1)]
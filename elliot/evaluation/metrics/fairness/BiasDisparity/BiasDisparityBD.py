@@ -8,13 +8,11 @@ __author__ = 'Vito Walter Anelli, Claudio Pomo'
 __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 
 import numpy as np
-import pandas as pd
-
-from collections import Counter
 
 from . import BiasDisparityBR, BiasDisparityBS
 
 from elliot.evaluation.metrics.base_metric import BaseMetric
+from elliot.evaluation.metrics.clustering_utils import load_clustering
 from elliot.evaluation.metrics.metrics_utils import ProxyMetric
 
 
@@ -54,26 +52,22 @@ class BiasDisparityBD(BaseMetric):
 
         self._item_clustering_path = self._additional_data.get("item_clustering_file", False)
 
-        if self._item_clustering_path:
-            self._item_clustering = pd.read_csv(self._item_clustering_path, sep="\t", header=None)
-            self._item_n_clusters = self._item_clustering[1].nunique()
-            self._item_clustering = dict(zip(self._item_clustering[0], self._item_clustering[1]))
+        self._item_clustering = load_clustering(self._item_clustering_path)
+        if self._item_clustering:
+            self._item_n_clusters = self._item_clustering.n_clusters
             self._item_clustering_name = self._additional_data['item_clustering_name']
         else:
             self._item_n_clusters = 1
-            self._item_clustering = {}
             self._item_clustering_name = ""
 
         self._user_clustering_path = self._additional_data.get("user_clustering_file", False)
 
-        if self._user_clustering_path:
-            self._user_clustering = pd.read_csv(self._user_clustering_path, sep="\t", header=None)
-            self._user_n_clusters = self._user_clustering[1].nunique()
-            self._user_clustering = dict(zip(self._user_clustering[0], self._user_clustering[1]))
+        self._user_clustering = load_clustering(self._user_clustering_path)
+        if self._user_clustering:
+            self._user_n_clusters = self._user_clustering.n_clusters
             self._user_clustering_name = self._additional_data['user_clustering_name']
         else:
             self._user_n_clusters = 1
-            self._user_clustering = {}
             self._user_clustering_name = ""
 
         self._category_sum = np.zeros((self._user_n_clusters,self._item_n_clusters))
@@ -8,11 +8,9 @@ __author__ = 'Vito Walter Anelli, Claudio Pomo'
 __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 
 import numpy as np
-import pandas as pd
-
-from collections import Counter
 
 from elliot.evaluation.metrics.base_metric import BaseMetric
+from elliot.evaluation.metrics.clustering_utils import cluster_codes, load_clustering, pair_counts
 from elliot.evaluation.metrics.metrics_utils import ProxyMetric
 
 class BiasDisparityBR(BaseMetric):
@@ -51,26 +49,22 @@ class BiasDisparityBR(BaseMetric):
 
         self._item_clustering_path = self._additional_data.get("item_clustering_file", False)
 
-        if self._item_clustering_path:
-            self._item_clustering = pd.read_csv(self._item_clustering_path, sep="\t", header=None)
-            self._item_n_clusters = self._item_clustering[1].nunique()
-            self._item_clustering = dict(zip(self._item_clustering[0], self._item_clustering[1]))
+        self._item_clustering = load_clustering(self._item_clustering_path)
+        if self._item_clustering:
+            self._item_n_clusters = self._item_clustering.n_clusters
             self._item_clustering_name = self._additional_data['item_clustering_name']
         else:
             self._item_n_clusters = 1
-            self._item_clustering = {}
             self._item_clustering_name = ""
 
         self._user_clustering_path = self._additional_data.get("user_clustering_file", False)
 
-        if self._user_clustering_path:
-            self._user_clustering = pd.read_csv(self._user_clustering_path, sep="\t", header=None)
-            self._user_n_clusters = self._user_clustering[1].nunique()
-            self._user_clustering = dict(zip(self._user_clustering[0], self._user_clustering[1]))
+        self._user_clustering = load_clustering(self._user_clustering_path)
+        if self._user_clustering:
+            self._user_n_clusters = self._user_clustering.n_clusters
             self._user_clustering_name = self._additional_data['user_clustering_name']
         else:
             self._user_n_clusters = 1
-            self._user_clustering = {}
             self._user_clustering_name = ""
 
         self._category_sum = np.zeros((self._user_n_clusters,self._item_n_clusters))
@@ -85,21 +79,6 @@ class BiasDisparityBR(BaseMetric):
         """
         return f"BiasDisparityBR_users:{self._user_clustering_name}_items:{self._item_clustering_name}"
 
-    def __item_bias_disparity_br(self, user, user_recommendations, cutoff):
-        """
-        Per User Bias Disparity - Bias Recommendations
-        :param user_recommendations: list of user recommendation in the form [(item1,value1),...]
-        :param cutoff: numerical threshold to limit the recommendation list
-        :return: the value of the Bias Disparity - Bias Recommendations metric for the specific user
-        """
-        user_group = self._user_clustering.get(user, None if self._user_clustering else 0)
-        if user_group is not None:
-            for i, _ in user_recommendations[:cutoff]:
-                item_category = self._item_clustering.get(i, None if self._item_clustering else 0)
-                if item_category is not None:
-                    self._category_sum[user_group,item_category] += 1
-                    self._total_sum[user_group] += 1
-
     def eval(self):
         pass
 
@@ -109,11 +88,18 @@ class BiasDisparityBR(BaseMetric):
         :return: the overall value of Bias Disparity - Bias Recommendations
         """
 
-        for u, u_r in self._recommendations.items():
-            self.__item_bias_disparity_br(u, u_r, self._cutoff)
-
-        clustering_count = Counter(self._item_clustering.values())
-        PC = np.array([clustering_count.get(c, 0)/ len(self._item_clustering) if self._item_clustering else 1 for c in range(self._item_n_clusters)])
+        data = self._evaluation_objects.data
+        users = list(self._recommendations.keys())
+        items = [[i for i, _ in self._recommendations[u][:self._cutoff]] for u in users]
+        user_groups = cluster_codes(self._user_clustering, users, data.public_users, data.num_users, default=0)
+        item_categories = cluster_codes(self._item_clustering, [i for u_items in items for i in u_items],
+                                        data.public_items, data.num_items, default=0)
+        self._category_sum = pair_counts(np.repeat(user_groups, [len(u_items) for u_items in items]), item_categories,
+                                         self._user_n_clusters, self._item_n_clusters)
+        self._total_sum = self._category_sum.sum(axis=1)
+
+        PC = self._item_clustering.sizes[:self._item_n_clusters] / len(self._item_clustering) if self._item_clustering \
+            else np.ones(self._item_n_clusters)
         self._BR = ((self._category_sum.T/self._total_sum).T)/PC
 
         self._metric_objs_list = []
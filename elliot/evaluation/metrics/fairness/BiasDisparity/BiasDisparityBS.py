@@ -8,11 +8,9 @@ __author__ = 'Vito Walter Anelli, Claudio Pomo'
 __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 
 import numpy as np
-import pandas as pd
-
-from collections import Counter
 
 from elliot.evaluation.metrics.base_metric import BaseMetric
+from elliot.evaluation.metrics.clustering_utils import indexed_clusters, load_clustering, pair_counts
 from elliot.evaluation.metrics.metrics_utils import ProxyMetric
 
 class BiasDisparityBS(BaseMetric):
@@ -47,30 +45,25 @@ class BiasDisparityBS(BaseMetric):
         :param eval_objects: list of objects that may be useful for the computation of the different metrics
         """
         super().__init__(recommendations, config, params, eval_objects, additional_data)
-        self._train = self._evaluation_objects.data.train_dict
 
         self._item_clustering_path = self._additional_data.get("item_clustering_file", False)
 
-        if self._item_clustering_path:
-            self._item_clustering = pd.read_csv(self._item_clustering_path, sep="\t", header=None)
-            self._item_n_clusters = self._item_clustering[1].nunique()
-            self._item_clustering = dict(zip(self._item_clustering[0], self._item_clustering[1]))
+        self._item_clustering = load_clustering(self._item_clustering_path)
+        if self._item_clustering:
+            self._item_n_clusters = self._item_clustering.n_clusters
             self._item_clustering_name = self._additional_data['item_clustering_name']
         else:
             self._item_n_clusters = 1
-            self._item_clustering = {}
             self._item_clustering_name = ""
 
         self._user_clustering_path = self._additional_data.get("user_clustering_file", False)
 
-        if self._user_clustering_path:
-            self._user_clustering = pd.read_csv(self._user_clustering_path, sep="\t", header=None)
-            self._user_n_clusters = self._user_clustering[1].nunique()
-            self._user_clustering = dict(zip(self._user_clustering[0], self._user_clustering[1]))
+        self._user_clustering = load_clustering(self._user_clustering_path)
+        if self._user_clustering:
+            self._user_n_clusters = self._user_clustering.n_clusters
             self._user_clustering_name = self._additional_data['user_clustering_name']
         else:
             self._user_n_clusters = 1
-            self._user_clustering = {}
             self._user_clustering_name = ""
 
         self._category_sum = np.zeros((self._user_n_clusters,self._item_n_clusters))
@@ -85,22 +78,6 @@ class BiasDisparityBS(BaseMetric):
         """
         return f"BiasDisparityBS_users:{self._user_clustering_name}_items:{self._item_clustering_name}"
 
-    def __item_bias_disparity_bs(self, user, user_train):
-        """
-        Per User Bias Disparity - Bias Source
-        :param user_recommendations: list of user recommendation in the form [(item1,value1),...]
-        :param cutoff: numerical threshold to limit the recommendation list
-        :param user_relevant_items: list of user relevant items in the form [item1,...]
-        :return: the value of the Bias Disparity - Bias Source metric for the specific user
-        """
-        user_group = self._user_clustering.get(user, None if self._user_clustering else 0)
-        if user_group is not None:
-            for i, _ in user_train.items():
-                item_category = self._item_clustering.get(i, None if self._item_clustering else 0)
-                if item_category is not None:
-                    self._category_sum[user_group,item_category] += 1
-                    self._total_sum[user_group] += 1
-
     def eval(self):
         pass
 
@@ -110,11 +87,16 @@ class BiasDisparityBS(BaseMetric):
         :return: the overall value of Bias Disparity - Bias Source
         """
 
-        for u, u_train in self._train.items():
-            self.__item_bias_disparity_bs(u, u_train)
+        data = self._evaluation_objects.data
+        train = data.sp_i_train
+        user_groups = indexed_clusters(self._user_clustering, data.public_users, data.num_users, default=0)
+        item_categories = indexed_clusters(self._item_clustering, data.public_items, data.num_items, default=0)
+        self._category_sum = pair_counts(np.repeat(user_groups, np.diff(train.indptr)), item_categories[train.indices],
+                                         self._user_n_clusters, self._item_n_clusters)
+        self._total_sum = self._category_sum.sum(axis=1)
 
-        clustering_count = Counter(self._item_clustering.values())
-        PC = np.array([clustering_count.get(c, 0)/ len(self._item_clustering) if self._item_clustering else 1 for c in range(self._item_n_clusters)])
+        PC = self._item_clustering.sizes[:self._item_n_clusters] / len(self._item_clustering) if self._item_clustering \
+            else np.ones(self._item_n_clusters)
         self._BS = ((self._category_sum.T/self._total_sum).T)/PC
 
         self._metric_objs_list = []
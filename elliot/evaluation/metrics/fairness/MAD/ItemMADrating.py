@@ -8,8 +8,9 @@ __author__ = 'Vito Walter Anelli, Claudio Pomo'
 __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 
 import numpy as np
-import pandas as pd
 from elliot.evaluation.metrics.base_metric import BaseMetric
+from elliot.evaluation.metrics.clustering_utils import group_sums, indexed_clusters, load_clustering, \
+    pairwise_absolute_differences, public_indices
 
 
 class ItemMADrating(BaseMetric):
@@ -47,19 +48,14 @@ class ItemMADrating(BaseMetric):
 
         self._item_clustering_path = self._additional_data.get("clustering_file", False)
         self._item_clustering_name = self._additional_data.get("clustering_name", "")
-        if self._item_clustering_path:
-            self._item_clustering = pd.read_csv(self._additional_data["clustering_file"], sep="\t", header=None)
-            self._n_clusters = self._item_clustering[1].nunique()
-            self._item_clustering = dict(zip(self._item_clustering[0], self._item_clustering[1]))
-        else:
-            self._n_clusters = 1
-            self._item_clustering = {}
+        self._item_clustering = load_clustering(self._item_clustering_path)
+        self._n_clusters = self._item_clustering.n_clusters if self._item_clustering else 1
 
         self._sum = np.zeros(self._n_clusters)
         self._n_items = np.zeros(self._n_clusters)
 
-        self._item_count = {}
-        self._item_gain = {}
+        self._items = []
+        self._gains = []
 
     def name(self):
         """
@@ -77,8 +73,8 @@ class ItemMADrating(BaseMetric):
         :return: the value of the Precision metric for the specific user
         """
         for i, r in user_recommendations[:cutoff]:
-            self._item_count[i] = self._item_count.get(i, 0) + 1
-            self._item_gain[i] = self._item_gain.get(i, 0) + (r if i in user_relevant_items else 0)
+            self._items.append(i)
+            self._gains.append((r if i in user_relevant_items else 0))
 
     def eval(self):
         """
@@ -90,20 +86,18 @@ class ItemMADrating(BaseMetric):
             if len(self._relevance.get_user_rel(u)):
                 self.__item_mad(u_r, self._cutoff, self._relevance.get_user_rel(u))
 
-        for item, gain in self._item_gain.items():
-            v = gain/self._item_count[item]
-            cluster = self._item_clustering.get(item, None)
-
-            if cluster is not None:
-                self._sum[cluster] += v
-                self._n_items[cluster] += 1
-
-        avg = [self._sum[i]/self._n_items[i] for i in range(self._n_clusters)]
-        differences = []
-        for i in range(self._n_clusters):
-            for j in range(i+1, self._n_clusters):
-                differences.append(abs(avg[i] - avg[j]))
-        return np.average(differences)
+        data = self._evaluation_objects.data
+        items = public_indices(data.public_items, self._items)
+        item_count = np.bincount(items, minlength=data.num_items)
+        item_gain = np.bincount(items, weights=np.asarray(self._gains, dtype=np.float64), minlength=data.num_items)
+        recommended = np.flatnonzero(item_count)
+        values = item_gain[recommended] / item_count[recommended]
+        clusters = indexed_clusters(self._item_clustering, data.public_items, data.num_items)[recommended]
+        self._sum = group_sums(clusters, self._n_clusters, values)
+        self._n_items = group_sums(clusters, self._n_clusters)
+
+        avg = self._sum / self._n_items
+        return np.average(pairwise_absolute_differences(avg))
 
     def get(self):
         return [self]
@@ -7,12 +7,11 @@ __version__ = '0.1'
 __author__ = 'Vito Walter Anelli, Claudio Pomo'
 __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 
-import math
-
 import typing as t
 import numpy as np
-import pandas as pd
 from elliot.evaluation.metrics.base_metric import BaseMetric
+from elliot.evaluation.metrics.clustering_utils import cluster_codes, group_sums, load_clustering, \
+    pairwise_absolute_differences
 
 
 class UserMADranking(BaseMetric):
@@ -51,13 +50,8 @@ class UserMADranking(BaseMetric):
 
         self._user_clustering_path = self._additional_data.get("clustering_file", False)
         self._user_clustering_name = self._additional_data.get("clustering_name", "")
-        if self._user_clustering_path:
-            self._user_clustering = pd.read_csv(self._additional_data["clustering_file"], sep="\t", header=None)
-            self._n_clusters = self._user_clustering[1].nunique()
-            self._user_clustering = dict(zip(self._user_clustering[0], self._user_clustering[1]))
-        else:
-            self._n_clusters = 1
-            self._user_clustering = {}
+        self._user_clustering = load_clustering(self._user_clustering_path)
+        self._n_clusters = self._user_clustering.n_clusters if self._user_clustering else 1
 
         self._sum = np.zeros(self._n_clusters)
         self._n_users = np.zeros(self._n_clusters)
@@ -119,20 +113,15 @@ class UserMADranking(BaseMetric):
         Evaluation function
         :return: the overall averaged value of User MAD ranking
         """
-        for u, u_r in self._recommendations.items():
-            if len(self._relevance.get_user_rel(u)):
-                v = self.__user_mad(u_r, u, self._cutoff)
-                cluster = self._user_clustering.get(u, None)
-                if cluster is not None:
-                    self._sum[cluster] += v
-                    self._n_users[cluster] += 1
-
-        avg = [self._sum[i]/self._n_users[i] for i in range(self._n_clusters)]
-        differences = []
-        for i in range(self._n_clusters):
-            for j in range(i+1,self._n_clusters):
-                differences.append(abs(avg[i] - avg[j]))
-        return np.average(differences)
+        users = [u for u in self._recommendations.keys() if len(self._relevance.get_user_rel(u))]
+        values = np.array([self.__user_mad(self._recommendations[u], u, self._cutoff) for u in users])
+        data = self._evaluation_objects.data
+        clusters = cluster_codes(self._user_clustering, users, data.public_users, data.num_users)
+        self._sum = group_sums(clusters, self._n_clusters, values)
+        self._n_users = group_sums(clusters, self._n_clusters)
+
+        avg = self._sum / self._n_users
+        return np.average(pairwise_absolute_differences(avg))
 
     def get(self):
         return [self]
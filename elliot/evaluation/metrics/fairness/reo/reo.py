@@ -8,9 +8,9 @@ __author__ = 'Vito Walter Anelli, Claudio Pomo'
 __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 
 import numpy as np
-import pandas as pd
 
 from elliot.evaluation.metrics.base_metric import BaseMetric
+from elliot.evaluation.metrics.clustering_utils import cluster_codes, group_sums, load_clustering
 from elliot.evaluation.metrics.metrics_utils import ProxyMetric
 
 
@@ -64,14 +64,12 @@ class REO(BaseMetric):
 
         self._item_clustering_path = self._additional_data.get("clustering_file", False)
 
-        if self._item_clustering_path:
-            self._item_clustering = pd.read_csv(self._item_clustering_path, sep="\t", header=None, names=["id","cluster"])
-            self._item_n_clusters = self._item_clustering['cluster'].nunique()
-            self._item_clustering = self._item_clustering.groupby('cluster')['id'].apply(set).to_dict()
+        self._item_clustering = load_clustering(self._item_clustering_path)
+        if self._item_clustering:
+            self._item_n_clusters = self._item_clustering.n_clusters
             self._item_clustering_name = self._additional_data['clustering_name']
         else:
             self._item_n_clusters = 1
-            self._item_clustering = {}
             self._item_clustering_name = ""
 
         self._num = np.zeros(self._item_n_clusters)
@@ -94,11 +92,8 @@ class REO(BaseMetric):
         :param user_relevant_items: list of user relevant items in the form [item1,...]
         :return: the value of the Ranking-based Equal Opportunity (REO) metric for the specific user
         """
-        recommended_items = set([i for i, _ in user_recommendations[:cutoff] if i in user_relevant_items])
-
-        for i, i_set in self._item_clustering.items():
-            self._num[i] += len(recommended_items & i_set)
-            self._den[i] += len((i_set  & user_relevant_items) - user_train)
+        self._hits.extend(set([i for i, _ in user_recommendations[:cutoff] if i in user_relevant_items]))
+        self._relevant.extend(user_relevant_items - user_train)
 
     def eval(self):
         pass
@@ -109,10 +104,17 @@ class REO(BaseMetric):
         :return: the overall value of Ranking-based Equal Opportunity (REO)
         """
 
+        self._hits, self._relevant = [], []
         for u, u_r in self._recommendations.items():
             if len(self._relevance.get_user_rel(u)):
                 self.__user_pop_reo(u_r, set(self._train[u].keys()), self._cutoff, set(self._relevance.get_user_rel(u)))
 
+        data = self._evaluation_objects.data
+        self._num = group_sums(cluster_codes(self._item_clustering, self._hits, data.public_items, data.num_items),
+                               self._item_n_clusters)
+        self._den = group_sums(cluster_codes(self._item_clustering, self._relevant, data.public_items, data.num_items),
+                               self._item_n_clusters)
+
         PR = self._num / self._den
 
         self._metric_objs_list = []
@@ -8,11 +8,10 @@ __author__ = 'Vito Walter Anelli, Claudio Pomo'
 __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 
 import numpy as np
-import pandas as pd
-
-from collections import Counter
 
 from elliot.evaluation.metrics.base_metric import BaseMetric
+from elliot.evaluation.metrics.clustering_utils import cluster_codes, group_sums, indexed_clusters, \
+    load_clustering, public_indices
 from elliot.evaluation.metrics.metrics_utils import ProxyMetric
 
 class RSP(BaseMetric):
@@ -56,18 +55,15 @@ class RSP(BaseMetric):
         """
         super().__init__(recommendations, config, params, eval_objects, additional_data)
         self._cutoff = self._evaluation_objects.cutoff
-        self._train = self._evaluation_objects.data.train_dict
 
         self._item_clustering_path = self._additional_data.get("clustering_file", False)
 
-        if self._item_clustering_path:
-            self._item_clustering = pd.read_csv(self._item_clustering_path, sep="\t", header=None, names=["id","cluster"])
-            self._item_n_clusters = self._item_clustering['cluster'].nunique()
-            self._item_clustering = self._item_clustering.groupby('cluster')['id'].apply(set).to_dict()
+        self._item_clustering = load_clustering(self._item_clustering_path)
+        if self._item_clustering:
+            self._item_n_clusters = self._item_clustering.n_clusters
             self._item_clustering_name = self._additional_data['clustering_name']
         else:
             self._item_n_clusters = 1
-            self._item_clustering = {}
             self._item_clustering_name = ""
 
         self._num = np.zeros(self._item_n_clusters)
@@ -82,7 +78,7 @@ class RSP(BaseMetric):
         """
         return f"RSP_items:{self._item_clustering_name}"
 
-    def __user_pop_rsp(self, user_recommendations, user_train, cutoff):
+    def __user_pop_rsp(self, user_recommendations, cutoff):
         """
         Per User Ranking-based Statistical Parity (RSP)
         :param user_recommendations: list of user recommendation in the form [(item1,value1),...]
@@ -90,11 +86,7 @@ class RSP(BaseMetric):
         :param user_relevant_items: list of user relevant items in the form [item1,...]
         :return: the value of the Bias Disparity - Bias Recommendations metric for the specific user
         """
-        recommended_items = set([i for i, _ in user_recommendations[:cutoff]])
-
-        for i, i_set in self._item_clustering.items():
-            self._num[i] += len(recommended_items & i_set)
-            self._den[i] += len(i_set - user_train)
+        self._recommended.extend(set([i for i, _ in user_recommendations[:cutoff]]))
 
     def eval(self):
         pass
@@ -105,8 +97,19 @@ class RSP(BaseMetric):
         :return: the overall value of Ranking-based Statistical Parity (RSP)
         """
 
+        self._recommended = []
         for u, u_r in self._recommendations.items():
-            self.__user_pop_rsp(u_r, set(self._train[u].keys()), self._cutoff)
+            self.__user_pop_rsp(u_r, self._cutoff)
+
+        data = self._evaluation_objects.data
+        self._num = group_sums(cluster_codes(self._item_clustering, self._recommended, data.public_items, data.num_items),
+                               self._item_n_clusters)
+        if self._item_clustering:
+            # |cluster - user_train| summed over the users, from the training items of each cluster
+            train_items = data.sp_i_train[public_indices(data.public_users, list(self._recommendations.keys()))].indices
+            train_clusters = indexed_clusters(self._item_clustering, data.public_items, data.num_items)[train_items]
+            self._den = len(self._recommendations) * self._item_clustering.sizes.astype(np.float64) \
+                - group_sums(train_clusters, self._item_n_clusters)
 
         PR = self._num / self._den
 
@@ -11,6 +11,10 @@ import typing as t
 import math
 from abc import ABC, abstractmethod
 
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
 
 class Relevance(object):
     def __init__(self, test, rel_threshold):
@@ -18,6 +22,7 @@ class Relevance(object):
         self._rel_threshold = rel_threshold
         self._binary_relevance = None
         self._discounted_relevance = None
+        self._sparse_relevance = None
 
     def get_test(self):
         return self._test
@@ -38,6 +43,14 @@ class Relevance(object):
             self._binary_relevance = BinaryRelevance(self._test, self._rel_threshold)
         return self._binary_relevance
 
+    ############## Sparse relevance ##############
+
+    @property
+    def sparse_relevance(self):
+        if self._sparse_relevance is None:
+            self._sparse_relevance = SparseRelevance(self._test, self._rel_threshold)
+        return self._sparse_relevance
+
 
 class AbstractRelevanceSingleton(ABC):
 
@@ -95,3 +108,105 @@ class BinaryRelevance(AbstractRelevanceSingleton):
     def get_rel(self, user, item):
         return 1 if item in self._binary_relevance.get(user, []) else 0
 
+
+
+def ragged_positions(starts: np.ndarray, lengths: np.ndarray) -> t.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Flattened (row, column, source position) indices of ragged segments [starts[r], starts[r] + lengths[r])
+    :param starts: first source position of every row
+    :param lengths: number of elements of every row
+    :return: row indices, column indices (position within the row), and source positions
+    """
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    offsets = np.cumsum(lengths) - lengths
+    cols = np.arange(int(np.sum(lengths))) - np.repeat(offsets, lengths)
+    return rows, cols, np.repeat(starts, lengths) + cols
+
+
+class SparseRelevance(AbstractRelevanceSingleton):
+    """
+    Discounted relevance of the test set stored as a (users x items) CSR matrix.
+    Binary relevance corresponds to the non-zero entries (every gain of a relevant item is >= 1)
+    """
+
+    def __init__(self, test, rel_threshold):
+        rows = [u for u, test_items in test.items() for _ in test_items]
+        items = [i for test_items in test.values() for i in test_items.keys()]
+        scores = np.array([s for test_items in test.values() for s in test_items.values()], dtype=np.float64)
+        relevant = scores >= rel_threshold
+
+        row_codes, users = pd.factorize(np.asarray(rows)[relevant], sort=True)
+        item_codes, items = pd.factorize(np.asarray(items)[relevant], sort=True)
+        self._users, self._items = np.asarray(users), np.asarray(items)
+        gains = 2 ** (scores[relevant] - rel_threshold + 1) - 1
+        self._matrix = sp.csr_matrix((gains, (row_codes, item_codes)), shape=(len(self._users), len(self._items)))
+        self._matrix.sort_indices()
+        # CSR entries are sorted by (row, column), hence by the linearized key
+        self._keys = (np.repeat(np.arange(self._matrix.shape[0], dtype=np.int64), np.diff(self._matrix.indptr))
+                      * self._matrix.shape[1] + self._matrix.indices)
+        self._n_relevant = np.diff(self._matrix.indptr)
+        # gains of every row sorted in descending order (ideal ranking)
+        self._ideal_gains = self._matrix.data[np.lexsort((-self._matrix.data, np.repeat(
+            np.arange(self._matrix.shape[0]), self._n_relevant)))]
+
+    @property
+    def matrix(self) -> sp.csr_matrix:
+        return self._matrix
+
+    @staticmethod
+    def _lookup(sorted_ids, keys) -> np.ndarray:
+        keys = np.asarray(keys)
+        if not len(sorted_ids) or not len(keys):
+            return np.full(len(keys), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(sorted_ids, keys), len(sorted_ids) - 1)
+        return np.where(sorted_ids[positions] == keys, positions, -1).astype(np.int64)
+
+    def user_rows(self, users) -> np.ndarray:
+        """
+        Row index of every user, -1 for users without relevant items
+        """
+        return self._lookup(self._users, users)
+
+    def item_columns(self, items) -> np.ndarray:
+        """
+        Column index of every item, -1 for items that are never relevant
+        """
+        return self._lookup(self._items, items)
+
+    def n_relevant(self, user_rows: np.ndarray) -> np.ndarray:
+        return np.where(user_rows >= 0, self._n_relevant[np.maximum(user_rows, 0)], 0)
+
+    def gains(self, user_rows: np.ndarray, item_columns: np.ndarray) -> np.ndarray:
+        """
+        Vectorized gain lookup of the (user_rows[r], item_columns[r, c]) pairs. Negative indices yield no gain
+        """
+        item_columns = np.asarray(item_columns)
+        user_rows = np.broadcast_to(np.asarray(user_rows).reshape(-1, *([1] * (item_columns.ndim - 1))),
+                                    item_columns.shape)
+        valid = (user_rows >= 0) & (item_columns >= 0)
+        gains = np.zeros(item_columns.shape, dtype=np.float64)
+        if not len(self._keys):
+            return gains
+        keys = user_rows[valid].astype(np.int64) * self._matrix.shape[1] + item_columns[valid]
+        positions = np.minimum(np.searchsorted(self._keys, keys), len(self._keys) - 1)
+        gains[valid] = np.where(self._keys[positions] == keys, self._matrix.data[positions], 0)
+        return gains
+
+    def ideal_gains(self, user_rows: np.ndarray, length: int) -> np.ndarray:
+        """
+        (users x length) matrix of the ideal (descending) gains of every user, zero padded
+        """
+        ideal = np.zeros((len(user_rows), length), dtype=np.float64)
+        lengths = np.minimum(self.n_relevant(user_rows), length)
+        rows, cols, sources = ragged_positions(self._matrix.indptr[np.maximum(user_rows, 0)], lengths)
+        ideal[rows, cols] = self._ideal_gains[sources]
+        return ideal
+
+    def get_user_rel(self, user):
+        row = self.user_rows([user])[0]
+        if row < 0:
+            return []
+        return self._items[self._matrix.indices[self._matrix.indptr[row]:self._matrix.indptr[row + 1]]].tolist()
+
+    def get_rel(self, user, item):
+        return float(self.gains(self.user_rows([user]), self.item_columns([item]).reshape(1, 1))[0, 0])
@@ -8,6 +8,7 @@ __author__ = 'Vito Walter Anelli, Claudio Pomo'
 __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 
 from elliot.hyperoptimization.model_coordinator import ModelCoordinator
+from elliot.hyperoptimization.parallel_search import parallel_fmin
 from hyperopt import tpe, atpe, mix, rand, anneal
 import numpy as np
 
@@ -45,6 +46,7 @@ def suggest(new_ids, domain, trials, seed, nbMaxSucessiveFailures=1000):
             h = hash(frozenset([(key, value[0]) if len(value) > 0 else (
                 (key, None)) for key, value in vals.items()]))
             if h not in hashset:
+                hashset.add(h)
                 newSample = True
             else:
                 # Duplicated sample, ignore
@@ -52,7 +54,7 @@ def suggest(new_ids, domain, trials, seed, nbMaxSucessiveFailures=1000):
 
             if nbSucessiveFailures > nbMaxSucessiveFailures:
                 # No more samples to produce
-                return []
+                return rval
 
         rval.extend(trials.new_trial_docs([new_id],
                                           [None], [new_result], [new_misc]))
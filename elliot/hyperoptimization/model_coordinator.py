@@ -7,15 +7,26 @@ __version__ = '0.1'
 __author__ = 'Vito Walter Anelli, Claudio Pomo'
 __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 
+import concurrent.futures as c
+import multiprocessing as mp
 from types import SimpleNamespace
 import typing as t
 import numpy as np
 import logging as pylog
 
 from elliot.utils import logging
+from elliot.utils.threads import can_fork_workers, limit_threads, threads_per_worker
 
 from hyperopt import STATUS_OK
 
+# (coordinator, model parameters) inherited by the forked fold workers
+_fold_context = None
+
+
+def _train_fold(index):
+    coordinator, model_params = _fold_context
+    return coordinator.train_fold(coordinator.data_objs[index], model_params)
+
 
 class ModelCoordinator(object):
     """
@@ -36,6 +47,10 @@ class ModelCoordinator(object):
         self.params = params
         self.model_class = model_class
 
+        meta = params[0].meta if isinstance(params, tuple) else params.meta
+        self.fold_workers = getattr(meta, "fold_workers", 1)
+        self.fold_threads = getattr(meta, "fold_threads", threads_per_worker(self.fold_workers))
+
     def objective(self, args):
         """
         This function respect the signature, and the return format required for HyperOpt optimization
@@ -51,27 +66,7 @@ class ModelCoordinator(object):
             model_params.__setattr__(k, v)
             self.logger.info(f"{k} set to {model_params.__getattribute__(k)}")
 
-        losses = []
-        results = []
-        for data_obj in self.data_objs:
-            model = self.model_class(data=data_obj, config=self.base, params=model_params)
-            model.train()
-            losses.append(model.get_loss())
-            results.append(model.get_results())
-
-        loss = np.average(losses)
-        results = self._average_results(results)
-
-        return {
-            'loss': loss,
-            'status': STATUS_OK,
-            'params': model.get_params(),
-            'val_results': {k: result_dict["val_results"] for k, result_dict in results.items()},
-            'val_statistical_results': {k: result_dict["val_statistical_results"] for k, result_dict in model.get_results().items()},
-            'test_results': {k: result_dict["test_results"] for k, result_dict in results.items()},
-            'test_statistical_results': {k: result_dict["test_statistical_results"] for k, result_dict in model.get_results().items()},
-            'name': model.name
-        }
+        return self._train_folds(model_params)
 
     def single(self):
         """
@@ -81,26 +76,50 @@ class ModelCoordinator(object):
         and params, and results being required by the framework
         """
 
-        losses = []
-        results = []
-        for data_obj in self.data_objs:
-            model = self.model_class(data=data_obj, config=self.base, params=self.params)
-            model.train()
-            losses.append(model.get_loss())
-            results.append(model.get_results())
+        return self._train_folds(self.params)
 
-        loss = np.average(losses)
-        results = self._average_results(results)
+    def train_fold(self, data_obj, model_params):
+        """
+        Train and evaluate the model on a single fold
+        :return: a Dictionary with the loss, the results, the parameters, and the name of the model
+        """
+        model = self.model_class(data=data_obj, config=self.base, params=model_params)
+        model.train()
+        # the recommendation lists are complete before the fold is reported
+        model.recommendation_writer.close()
+        return {'loss': model.get_loss(), 'results': model.get_results(), 'params': model.get_params(),
+                'name': model.name}
+
+    def _train_folds(self, model_params):
+        """
+        Train the model on every fold, in parallel worker processes if fold_workers > 1, and average the results
+        """
+        global _fold_context
+        n_workers = min(self.fold_workers, len(self.data_objs))
+        # inside a worker (e.g., a parallel hyperparameter trial) the folds are trained sequentially
+        if n_workers > 1 and can_fork_workers():
+            self.logger.info(f"Training {len(self.data_objs)} folds on {n_workers} workers")
+            _fold_context = (self, model_params)
+            with c.ProcessPoolExecutor(max_workers=n_workers, mp_context=mp.get_context("fork"),
+                                       initializer=limit_threads, initargs=(self.fold_threads,)) as executor:
+                fold_results = list(executor.map(_train_fold, range(len(self.data_objs))))
+            _fold_context = None
+        else:
+            fold_results = [self.train_fold(data_obj, model_params) for data_obj in self.data_objs]
+
+        loss = np.average([fold["loss"] for fold in fold_results])
+        results = self._average_results([fold["results"] for fold in fold_results])
+        last_results = fold_results[-1]["results"]
 
         return {
             'loss': loss,
             'status': STATUS_OK,
-            'params': model.get_params(),
+            'params': fold_results[-1]["params"],
             'val_results': {k: result_dict["val_results"] for k, result_dict in results.items()},
-            'val_statistical_results': {k: result_dict["val_statistical_results"] for k, result_dict in model.get_results().items()},
+            'val_statistical_results': {k: result_dict["val_statistical_results"] for k, result_dict in last_results.items()},
             'test_results': {k: result_dict["test_results"] for k, result_dict in results.items()},
-            'test_statistical_results': {k: result_dict["test_statistical_results"] for k, result_dict in model.get_results().items()},
-            'name': model.name
+            'test_statistical_results': {k: result_dict["test_statistical_results"] for k, result_dict in last_results.items()},
+            'name': fold_results[-1]["name"]
         }
 
     def _average_results(self, results_list):
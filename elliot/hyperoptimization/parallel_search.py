@@ -0,0 +1,137 @@
+"""
+Module description:
+Parallel hyperparameter search: several HyperOpt trials are evaluated at once in a local process pool.
+
+models:
+  PMF:
+    meta:
+      hyper_max_evals: 20
+      hyper_opt_alg: tpe
+      hyper_workers: 8
+
+Workers are forked from the main process after the dataset has been loaded, hence they share it read-only
+(copy-on-write) and only the sampled hyperparameters and the results travel between processes. The thread pools of
+every worker are capped to an equal share of the cores. Forking a process whose TensorFlow runtime is already running
+(e.g., after an earlier TensorFlow model of the same configuration file) may deadlock the workers, hence in that case
+the trials are evaluated sequentially.
+"""
+
+__version__ = '0.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
+import concurrent.futures as c
+import multiprocessing as mp
+import typing as t
+
+from hyperopt import JOB_STATE_DONE, JOB_STATE_ERROR, Trials, anneal, fmin, space_eval
+from hyperopt.base import Domain, spec_from_misc
+from hyperopt.utils import coarse_utcnow
+
+from elliot.utils import logging
+from elliot.utils.threads import limit_threads, tensorflow_initialized, threads_per_worker
+
+# objective inherited by the forked workers
+_objective = None
+
+# algorithms that accept a single id per call
+_single_id_algorithms = {anneal.suggest}
+
+
+def _evaluate(args):
+    return _objective(args)
+
+
+def _suggest(algo, new_ids: t.List[int], domain: Domain, trials: Trials, rstate) -> t.List[int]:
+    """
+    Suggest a batch of new trials, one per id of new_ids, and insert them in trials as pending.
+
+    Algorithms that return a single point per call (e.g., TPE after its startup trials, or simulated annealing) are
+    called again for the missing ids, and every call conditions on the points suggested before it, which are pending with an unknown loss.
+    :return: the ids of the suggested trials, fewer than new_ids if the search space is exhausted
+    """
+    suggested = []
+    missing = list(new_ids)
+    while missing:
+        batch = missing[:1] if algo in _single_id_algorithms else missing
+        new_trials = algo(batch, domain, trials, rstate.randint(2 ** 31 - 1))
+        if not new_trials:
+            break
+        trials.insert_trial_docs(new_trials)
+        trials.refresh()
+        tids = {doc["tid"] for doc in new_trials}
+        suggested.extend(tid for tid in missing if tid in tids)
+        missing = [tid for tid in missing if tid not in tids]
+    return suggested
+
+
+def parallel_fmin(fn: t.Callable, space, algo, max_evals: int, trials: Trials, rstate, n_workers: int):
+    """
+    Drop-in replacement of hyperopt.fmin evaluating up to n_workers trials at the same time.
+
+    Whenever workers are free, a batch of points, one per free worker, is suggested, so that TPE and the other
+    adaptive algorithms always condition on every completed trial. Every suggestion sees the pending trials as well,
+    so grid search never dispatches the same configuration to two workers.
+    If the TensorFlow runtime of the current process has already been started, the trials are evaluated sequentially
+    with hyperopt.fmin.
+    :param fn: objective function (e.g., ModelCoordinator.objective)
+    :param space: HyperOpt search space
+    :param algo: suggestion algorithm (see parse_algorithms)
+    :param max_evals: number of trials to evaluate
+    :param trials: HyperOpt Trials object, filled in place
+    :param rstate: np.random.RandomState used to seed the suggestions
+    :param n_workers: number of worker processes
+    :return: the best hyperparameter assignment, as returned by hyperopt.fmin
+    """
+    global _objective
+    logger = logging.get_logger("ParallelSearch")
+
+    if "fork" not in mp.get_all_start_methods():
+        raise Exception("Parallel hyperparameter search requires the 'fork' start method")
+    if tensorflow_initialized():
+        logger.warning("TensorFlow runtime already started: forking it may deadlock, the trials run sequentially")
+        return fmin(fn, space=space, algo=algo, max_evals=max_evals, trials=trials, rstate=rstate, verbose=False)
+
+    _objective = fn
+    domain = Domain(fn, space)
+    trials.refresh()
+    running = {}
+    exhausted = False
+
+    # every trial gets an equal share of the cores for its BLAS/OpenMP and TensorFlow thread pools
+    with c.ProcessPoolExecutor(max_workers=n_workers, mp_context=mp.get_context("fork"),
+                               initializer=limit_threads, initargs=(threads_per_worker(n_workers),)) as executor:
+        while True:
+            n_new = min(n_workers - len(running), max_evals - len(trials.trials))
+            if not exhausted and n_new > 0:
+                new_ids = trials.new_trial_ids(n_new)
+                suggested = _suggest(algo, new_ids, domain, trials, rstate)
+                # search space exhausted (e.g., every grid point has been dispatched)
+                exhausted = len(suggested) < n_new
+                docs = {d["tid"]: d for d in trials._dynamic_trials}
+                for tid in suggested:
+                    doc = docs[tid]
+                    args = space_eval(space, spec_from_misc(doc["misc"]))
+                    running[executor.submit(_evaluate, args)] = doc
+                    logger.info(f"Trial {tid} dispatched ({len(running)} running)")
+
+            if not running:
+                break
+
+            done, _ = c.wait(running, return_when=c.FIRST_COMPLETED)
+            for future in done:
+                doc = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as ex:
+                    doc["state"] = JOB_STATE_ERROR
+                    doc["misc"]["error"] = (str(type(ex)), str(ex))
+                    trials.refresh()
+                    raise
+                doc["result"] = result
+                doc["state"] = JOB_STATE_DONE
+                doc["refresh_time"] = coarse_utcnow()
+            trials.refresh()
+
+    _objective = None
+    return trials.argmin
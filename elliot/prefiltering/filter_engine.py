@@ -0,0 +1,114 @@
+"""
+Module description:
+Vectorized engine of the prefiltering strategies.
+
+Users and items are factorized once into integer codes, and the filters only update a boolean mask of the accepted
+transactions: user and item degrees are counted with np.bincount over the accepted codes, hence every k-core round is
+a couple of array passes. The filtered DataFrame is materialized once, at the end of the chain.
+"""
+
+__version__ = '0.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
+import numpy as np
+import pandas as pd
+
+
+class FilterEngine(object):
+    """
+    Mask of the accepted transactions of a (userId, itemId, rating) DataFrame.
+    Transactions with a missing user (item) are rejected by the user (item) filters
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        self._data = data
+        self._users, user_ids = pd.factorize(data["userId"])
+        self._items, item_ids = pd.factorize(data["itemId"])
+        self._n_users, self._n_items = len(user_ids), len(item_ids)
+        self.mask = np.ones(len(data), dtype=bool)
+
+    @staticmethod
+    def _degrees(codes: np.ndarray, accepted: np.ndarray, size: int) -> np.ndarray:
+        """
+        Number of accepted transactions of the id of every transaction, 0 for missing ids
+        """
+        known = codes >= 0
+        counts = np.append(np.bincount(codes[accepted & known], minlength=size), 0)
+        return counts[np.where(known, codes, size)]
+
+    def user_degrees(self) -> np.ndarray:
+        return self._degrees(self._users, self.mask, self._n_users)
+
+    def item_degrees(self) -> np.ndarray:
+        return self._degrees(self._items, self.mask, self._n_items)
+
+    def n_transactions(self) -> int:
+        return int(np.count_nonzero(self.mask))
+
+    def n_users(self) -> int:
+        return int(np.count_nonzero(np.bincount(self._users[self.mask & (self._users >= 0)])))
+
+    def n_items(self) -> int:
+        return int(np.count_nonzero(np.bincount(self._items[self.mask & (self._items >= 0)])))
+
+    def ratings(self) -> np.ndarray:
+        return self._data["rating"].to_numpy()
+
+    def filter_ratings_by_threshold(self, threshold):
+        self.mask &= self.ratings() >= threshold
+
+    def filter_ratings_by_user_average(self):
+        """
+        Keep the ratings greater than or equal to the average rating of their user
+        """
+        known = self.mask & (self._users >= 0)
+        sums = np.bincount(self._users[known], weights=self.ratings()[known], minlength=self._n_users)
+        counts = np.bincount(self._users[known], minlength=self._n_users)
+        averages = np.append(np.divide(sums, counts, out=np.full(self._n_users, np.inf), where=counts > 0), np.inf)
+        self.mask &= self.ratings() >= averages[np.where(self._users >= 0, self._users, self._n_users)]
+
+    def filter_users_by_profile_size(self, threshold):
+        self.mask &= self.user_degrees() >= threshold
+
+    def filter_items_by_popularity(self, threshold):
+        self.mask &= self.item_degrees() >= threshold
+
+    def filter_retain_cold_users(self, threshold):
+        degrees = self.user_degrees()
+        self.mask &= (degrees > 0) & (degrees <= threshold)
+
+    def k_core_round(self, threshold, round_index: int = 0):
+        """
+        A user k-core filter followed by an item k-core filter
+        """
+        self.filter_users_by_profile_size(threshold)
+        self.filter_items_by_popularity(threshold)
+
+    def filter_iterative_k_core(self, threshold, k_core_round=None):
+        """
+        Alternate user and item k-core rounds until no transaction is removed
+        :param k_core_round: function (engine, threshold, round index) applying a round, FilterEngine.k_core_round by
+            default (e.g., PreFilter also reports the transactions of every round)
+        """
+        k_core_round = k_core_round or FilterEngine.k_core_round
+        previous, round_index = -1, 0
+        while previous != self.n_transactions():
+            previous = self.n_transactions()
+            k_core_round(self, threshold, round_index)
+            round_index += 1
+
+    def filter_rounds_k_core(self, threshold, n_rounds, k_core_round=None):
+        """
+        n_rounds user and item k-core rounds (see filter_iterative_k_core)
+        """
+        k_core_round = k_core_round or FilterEngine.k_core_round
+        for round_index in range(n_rounds):
+            k_core_round(self, threshold, round_index)
+
+    def data(self, reset_index: bool = False) -> pd.DataFrame:
+        """
+        Accepted transactions, in their original order
+        """
+        data = self._data[self.mask]
+        return data.reset_index(drop=True) if reset_index else data
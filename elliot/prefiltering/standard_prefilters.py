@@ -2,6 +2,8 @@
 import pandas as pd
 from types import SimpleNamespace
 
+from elliot.prefiltering.filter_engine import FilterEngine
+
 """
 prefiltering:
     strategy: global_threshold|user_average|user_k_core|item_k_core|iterative_k_core|n_rounds_k_core|cold_users
@@ -21,7 +23,8 @@ class PreFilter:
         ns = ns.prefiltering
 
         strategy = getattr(ns, "strategy", None)
-        data = d.copy()
+        # filters do not modify their input, and build their output from a mask of the accepted rows
+        data = d
         if strategy == "global_threshold":
             threshold = getattr(ns, "threshold", None)
             if threshold is not None:
@@ -95,103 +98,109 @@ class PreFilter:
 
     @staticmethod
     def filter_ratings_by_global_average(d: pd.DataFrame) -> pd.DataFrame:
-        data = d.copy()
-        threshold = data["rating"].mean()
+        engine = FilterEngine(d)
+        threshold = d["rating"].mean()
         print("\nPrefiltering with Global Average")
         print(f"The rating average is {round(threshold, 1)}")
-        print(f"The transactions above threshold are {data[data['rating'] >= threshold]['rating'].count()}")
-        print(f"The transactions below threshold are {data[data['rating'] < threshold]['rating'].count()}")
-        return data[data["rating"] >= threshold]
+        PreFilter._threshold(engine, threshold)
+        return engine.data()
 
     @staticmethod
     def filter_ratings_by_threshold(d: pd.DataFrame, threshold) -> pd.DataFrame:
-        data = d.copy()
+        engine = FilterEngine(d)
         print("\nPrefiltering with fixed threshold")
         print(f"The rating threshold is {round(threshold, 1)}")
-        print(f"The transactions above threshold are {data[data['rating'] >= threshold]['rating'].count()}")
-        print(f"The transactions below threshold are {data[data['rating'] < threshold]['rating'].count()}\n")
-        return data[data["rating"] >= threshold]
+        PreFilter._threshold(engine, threshold)
+        print()
+        return engine.data()
 
     @staticmethod
     def filter_ratings_by_user_average(d: pd.DataFrame) -> pd.DataFrame:
-        data = d.copy()
-        user_groups = data.groupby(['userId'])
-        for name, group in user_groups:
-            threshold = group["rating"].mean()
-            data.loc[group.index, 'accept_flag'] = data.loc[group.index, 'rating'] >= threshold
-
+        engine = FilterEngine(d)
+        before = engine.n_transactions()
+        engine.filter_ratings_by_user_average()
         print("\nPrefiltering with user average")
-        print(f"The transactions above threshold are {data[data['accept_flag']]['rating'].count()}")
-        print(f"The transactions below threshold are {data[data['accept_flag'] == False]['rating'].count()}\n")
-        return data[data["accept_flag"] == True].drop(columns=["accept_flag"]).reset_index(drop=True)
+        print(f"The transactions above threshold are {engine.n_transactions()}")
+        print(f"The transactions below threshold are {before - engine.n_transactions()}\n")
+        return engine.data(reset_index=True)
 
     @staticmethod
     def filter_users_by_profile_size(d: pd.DataFrame, threshold) -> pd.DataFrame:
-        data = d.copy()
-        print(f"\nPrefiltering with user {threshold}-core")
-        print(f"The transactions before filtering are {len(data)}")
-        print(f"The users before filtering are {data['userId'].nunique()}")
-        user_groups = data.groupby(['userId'])
-        data = user_groups.filter(lambda x: len(x) >= threshold)
-        print(f"The transactions after filtering are {len(data)}")
-        print(f"The users after filtering are {data['userId'].nunique()}")
-        return data
+        engine = FilterEngine(d)
+        PreFilter._user_k_core(engine, threshold)
+        return engine.data()
 
     @staticmethod
     def filter_items_by_popularity(d: pd.DataFrame, threshold) -> pd.DataFrame:
-        data = d.copy()
-        print(f"\nPrefiltering with item {threshold}-core")
-        print(f"The transactions before filtering are {len(data)}")
-        print(f"The items before filtering are {data['itemId'].nunique()}")
-        item_groups = data.groupby(['itemId'])
-        data = item_groups.filter(lambda x: len(x) >= threshold)
-        print(f"The transactions after filtering are {len(data)}")
-        print(f"The items after filtering are {data['itemId'].nunique()}")
-        return data
+        engine = FilterEngine(d)
+        PreFilter._item_k_core(engine, threshold)
+        return engine.data()
 
     @staticmethod
     def filter_iterative_k_core(d: pd.DataFrame, threshold) -> pd.DataFrame:
-        data = d.copy()
-        check_var = True
-        original_length = len(data)
+        engine = FilterEngine(d)
         print("\n**************************************")
         print(f"Iterative {threshold}-core")
-        while check_var:
-            data = PreFilter.filter_users_by_profile_size(data, threshold)
-            data = PreFilter.filter_items_by_popularity(data, threshold)
-            new_length = len(data)
-            if original_length == new_length:
-                check_var = False
-            else:
-                original_length = new_length
+        engine.filter_iterative_k_core(threshold, PreFilter._k_core_round)
         print("**************************************\n")
 
-        return data
+        return engine.data()
 
     @staticmethod
     def filter_rounds_k_core(d: pd.DataFrame, threshold, n_rounds) -> pd.DataFrame:
-        data = d.copy()
+        engine = FilterEngine(d)
         print("\n**************************************")
         print(f"{n_rounds} rounds of user/item {threshold}-core")
-        for i in range(n_rounds):
-            print(f"Iteration:\t{i}")
-            data = PreFilter.filter_users_by_profile_size(data, threshold)
-            data = PreFilter.filter_items_by_popularity(data, threshold)
+        engine.filter_rounds_k_core(threshold, n_rounds, PreFilter._numbered_k_core_round)
         print("**************************************\n")
 
-        return data
+        return engine.data()
 
     @staticmethod
     def filter_retain_cold_users(d: pd.DataFrame, threshold) -> pd.DataFrame:
-        data = d.copy()
+        engine = FilterEngine(d)
         print(f"\nPrefiltering retaining cold users with {threshold} or less ratings")
-        print(f"The transactions before filtering are {len(data)}")
-        print(f"The users before filtering are {data['userId'].nunique()}")
-        user_groups = data.groupby(['userId'])
-        data = user_groups.filter(lambda x: len(x) <= threshold)
-        print(f"The transactions after filtering are {len(data)}")
-        print(f"The users after filtering are {data['userId'].nunique()}")
-        return data
+        print(f"The transactions before filtering are {engine.n_transactions()}")
+        print(f"The users before filtering are {engine.n_users()}")
+        engine.filter_retain_cold_users(threshold)
+        print(f"The transactions after filtering are {engine.n_transactions()}")
+        print(f"The users after filtering are {engine.n_users()}")
+        return engine.data()
+
+    @staticmethod
+    def _threshold(engine: FilterEngine, threshold):
+        before = engine.n_transactions()
+        engine.filter_ratings_by_threshold(threshold)
+        print(f"The transactions above threshold are {engine.n_transactions()}")
+        print(f"The transactions below threshold are {before - engine.n_transactions()}")
+
+    @staticmethod
+    def _k_core_round(engine: FilterEngine, threshold, round_index):
+        PreFilter._user_k_core(engine, threshold)
+        PreFilter._item_k_core(engine, threshold)
+
+    @staticmethod
+    def _numbered_k_core_round(engine: FilterEngine, threshold, round_index):
+        print(f"Iteration:\t{round_index}")
+        PreFilter._k_core_round(engine, threshold, round_index)
+
+    @staticmethod
+    def _user_k_core(engine: FilterEngine, threshold):
+        print(f"\nPrefiltering with user {threshold}-core")
+        print(f"The transactions before filtering are {engine.n_transactions()}")
+        print(f"The users before filtering are {engine.n_users()}")
+        engine.filter_users_by_profile_size(threshold)
+        print(f"The transactions after filtering are {engine.n_transactions()}")
+        print(f"The users after filtering are {engine.n_users()}")
+
+    @staticmethod
+    def _item_k_core(engine: FilterEngine, threshold):
+        print(f"\nPrefiltering with item {threshold}-core")
+        print(f"The transactions before filtering are {engine.n_transactions()}")
+        print(f"The items before filtering are {engine.n_items()}")
+        engine.filter_items_by_popularity(threshold)
+        print(f"The transactions after filtering are {engine.n_transactions()}")
+        print(f"The items after filtering are {engine.n_items()}")
 
 
 # import unittest
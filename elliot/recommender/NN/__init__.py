@@ -1,4 +1,11 @@
-from .item_knn import ItemKNN
-from .user_knn import UserKNN
-from .attribute_item_knn import AttributeItemKNN
-from .attribute_user_knn import AttributeUserKNN
+from elliot.utils.lazy_import import lazy_attributes
+
+# models are imported on first access
+_models = {
+    "ItemKNN": ".item_knn",
+    "UserKNN": ".user_knn",
+    "AttributeItemKNN": ".attribute_item_knn",
+    "AttributeUserKNN": ".attribute_user_knn"
+}
+
+__getattr__, __dir__ = lazy_attributes(__name__, _models)
@@ -12,7 +12,6 @@ import pickle
 import time
 
 from elliot.recommender.recommender_utils_mixin import RecMixin
-from elliot.utils.write import store_recommendation
 import scipy.sparse as sp
 
 from elliot.recommender.base_recommender_model import BaseRecommenderModel
@@ -63,7 +62,7 @@ class AttributeItemKNN(RecMixin, BaseRecommenderModel):
         self._model = Similarity(self._data, self._sp_i_features, self._num_neighbors, self._similarity)
 
     def get_recommendations(self, k: int = 100):
-        return {u: self._model.get_user_recs(u, k) for u in self._ratings.keys()}
+        return self.get_top_k_recommendations(self._model.predict_block, k)
 
     def build_feature_sparse(self):
 
@@ -102,7 +101,7 @@ class AttributeItemKNN(RecMixin, BaseRecommenderModel):
                 with open(self._saving_filepath, "wb") as f:
                     pickle.dump(self._model.get_model_state(), f)
             if self._save_recs:
-                store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
+                self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
 
     def restore_weights(self):
         try:
@@ -116,7 +115,7 @@ class AttributeItemKNN(RecMixin, BaseRecommenderModel):
 
             print("******************************************")
             if self._save_recs:
-                store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
+                self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
             return True
 
         except Exception as ex:
@@ -14,7 +14,6 @@ import typing as t
 import scipy.sparse as sp
 
 from elliot.recommender.recommender_utils_mixin import RecMixin
-from elliot.utils.write import store_recommendation
 
 from elliot.recommender.base_recommender_model import BaseRecommenderModel
 from elliot.recommender.NN.attribute_user_knn.attribute_user_knn_similarity import Similarity
@@ -76,7 +75,7 @@ class AttributeUserKNN(RecMixin, BaseRecommenderModel):
 
 
     def get_recommendations(self, k: int = 100):
-        return {u: self._model.get_user_recs(u, k) for u in self._ratings.keys()}
+        return self.get_top_k_recommendations(self._model.predict_block, k)
 
     @property
     def name(self):
@@ -106,7 +105,7 @@ class AttributeUserKNN(RecMixin, BaseRecommenderModel):
                 with open(self._saving_filepath, "wb") as f:
                     pickle.dump(self._model.get_model_state(), f)
             if self._save_recs:
-                store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
+                self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
 
     def restore_weights(self):
         try:
@@ -120,7 +119,7 @@ class AttributeUserKNN(RecMixin, BaseRecommenderModel):
 
             print("******************************************")
             if self._save_recs:
-                store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
+                self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
             return True
 
         except Exception as ex:
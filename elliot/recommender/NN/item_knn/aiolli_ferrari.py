@@ -103,19 +103,10 @@ class AiolliSimilarity(object):
         w_sparse = similarity.compute_similarity()
         w_sparse = w_sparse.tocsc()
 
-        self.pred_mat = train.dot(w_sparse).tolil()
-
-    def get_user_recs(self, user, k=100):
-        user_items = self._data.train_dict[user].keys()
-        predictions = {i: self.predict(user, i) for i in self._data.items if i not in user_items}
-        indices, values = zip(*predictions.items())
-        indices = np.array(indices)
-        values = np.array(values)
-        partially_ordered_preds_indices = np.argpartition(values, -k)[-k:]
-        real_values = values[partially_ordered_preds_indices]
-        real_indices = indices[partially_ordered_preds_indices]
-        local_top_k = real_values.argsort()[::-1]
-        return [(real_indices[item], real_values[item]) for item in local_top_k]
+        self.pred_mat = train.dot(w_sparse).tocsr()
+
+    def predict_block_sparse(self, start, stop):
+        return self.pred_mat[start:stop]
 
     def predict(self, u, i):
         indexed_user = self._public_users[u]
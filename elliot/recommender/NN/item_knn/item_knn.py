@@ -12,7 +12,6 @@ import pickle
 import time
 
 from elliot.recommender.recommender_utils_mixin import RecMixin
-from elliot.utils.write import store_recommendation
 
 from elliot.recommender.base_recommender_model import BaseRecommenderModel
 from elliot.recommender.NN.item_knn.item_knn_similarity import Similarity
@@ -63,7 +62,9 @@ class ItemKNN(RecMixin, BaseRecommenderModel):
             self._model = Similarity(self._data, self._num_neighbors, self._similarity)
 
     def get_recommendations(self, k: int = 100):
-        return {u: self._model.get_user_recs(u, k) for u in self._ratings.keys()}
+        if self._implementation == "aiolli":
+            return self.get_sparse_top_k_recommendations(self._model.predict_block_sparse, k)
+        return self.get_top_k_recommendations(self._model.predict_block, k)
 
     @property
     def name(self):
@@ -93,7 +94,7 @@ class ItemKNN(RecMixin, BaseRecommenderModel):
                 with open(self._saving_filepath, "wb") as f:
                     pickle.dump(self._model.get_model_state(), f)
             if self._save_recs:
-                store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
+                self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
 
     def restore_weights(self):
         try:
@@ -107,7 +108,7 @@ class ItemKNN(RecMixin, BaseRecommenderModel):
 
             print("******************************************")
             if self._save_recs:
-                store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
+                self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
             return True
 
         except Exception as ex:
@@ -0,0 +1,98 @@
+"""
+Module description:
+Blocked builder of sparse kNN similarity matrices, shared by the item-based, user-based, and attribute kNN models.
+
+The pairwise similarities of the rows of a feature matrix are computed one block of rows at a time, and only the
+top-neighbors entries of every row are kept in a CSR matrix. The dense (rows x rows) matrix is never materialized.
+"""
+
+__version__ = '0.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.metrics import pairwise_distances
+from sklearn.metrics.pairwise import chi2_kernel, euclidean_distances, haversine_distances, manhattan_distances
+from sklearn.preprocessing import normalize
+
+supported_similarities = ["cosine", "dot", ]
+supported_dissimilarities = ["euclidean", "manhattan", "haversine", "chi2", 'cityblock', 'l1', 'l2', 'braycurtis',
+                             'canberra', 'chebyshev', 'correlation', 'dice', 'hamming', 'jaccard', 'kulsinski',
+                             'mahalanobis', 'minkowski', 'rogerstanimoto', 'russellrao', 'seuclidean',
+                             'sokalmichener', 'sokalsneath', 'sqeuclidean', 'yule']
+_dense_metrics = ['braycurtis', 'canberra', 'chebyshev', 'correlation', 'dice', 'hamming', 'jaccard', 'kulsinski',
+                  'mahalanobis', 'minkowski', 'rogerstanimoto', 'russellrao', 'seuclidean', 'sokalmichener',
+                  'sokalsneath', 'sqeuclidean', 'yule']
+
+# number of similarity values computed at a time
+_BLOCK_ELEMENTS = 2 ** 24
+
+
+def _similarity_block(features, block, similarity):
+    if similarity in ["cosine", "dot"]:
+        product = block @ features.T
+        return product.toarray() if sp.issparse(product) else np.asarray(product)
+    elif similarity == "euclidean":
+        distances = euclidean_distances(block, features)
+    elif similarity == "manhattan":
+        distances = manhattan_distances(block, features)
+    elif similarity == "haversine":
+        distances = haversine_distances(block, features)
+    elif similarity == "chi2":
+        distances = chi2_kernel(block, features)
+    elif similarity in ['cityblock', 'l1', 'l2'] + _dense_metrics:
+        distances = pairwise_distances(block, features, metric=similarity)
+    else:
+        raise Exception("Not implemented similarity")
+    return 1 / (1 + distances)
+
+
+def top_k_similarity(features, num_neighbors: int, similarity: str = "cosine", block_size: int = None):
+    """
+    Sparse kNN similarity of the rows of a feature matrix
+    :param features: (rows x features) matrix, e.g., the transposed URM for the item-based models
+    :param num_neighbors: number of neighbors kept for every row (the row itself is never a neighbor)
+    :param similarity: similarity or dissimilarity name (see supported_similarities and supported_dissimilarities)
+    :param block_size: number of rows processed at a time (by default, the block holds about 2^24 similarities)
+    :return: (rows x rows) CSR matrix whose i-th row stores the non-zero similarities of the neighbors of i
+    """
+    if similarity not in supported_similarities + supported_dissimilarities:
+        raise Exception("Not implemented similarity")
+
+    features = sp.csr_matrix(features, dtype=np.float64)
+    if similarity == "cosine":
+        features = normalize(features, norm="l2", axis=1)
+    elif similarity in _dense_metrics:
+        features = features.toarray()
+
+    n_rows = features.shape[0]
+    k = min(num_neighbors, n_rows - 1)
+    if k < 1:
+        return sp.csr_matrix((n_rows, n_rows))
+    block_size = block_size or max(1, _BLOCK_ELEMENTS // n_rows)
+
+    rows, cols, values = [], [], []
+    for start in range(0, n_rows, block_size):
+        stop = min(start + block_size, n_rows)
+        block = _similarity_block(features, features[start:stop], similarity)
+        block_rows = np.arange(stop - start)
+        block[block_rows, block_rows + start] = -np.inf
+        neighbors = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        neighbor_values = np.take_along_axis(block, neighbors, axis=1)
+        kept = neighbor_values != 0
+        rows.append(np.repeat(block_rows + start, kept.sum(axis=1)))
+        cols.append(neighbors[kept])
+        values.append(neighbor_values[kept])
+
+    return sp.csr_matrix((np.concatenate(values), (np.concatenate(rows), np.concatenate(cols))),
+                         shape=(n_rows, n_rows))
+
+
+def normalize_neighbors(similarity_matrix):
+    """
+    Divide every row by the sum of its similarities, i.e., the denominator of the kNN prediction
+    """
+    den = np.asarray(similarity_matrix.sum(axis=1)).ravel()
+    inverse = np.divide(1, den, out=np.zeros_like(den), where=den != 0)
+    return sp.diags(inverse) @ similarity_matrix
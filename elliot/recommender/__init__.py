@@ -9,17 +9,62 @@ __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 
 from .base_recommender_model import BaseRecommenderModel
 
-from .latent_factor_models import BPRMF, BPRMF_batch, WRMF, PureSVD, MF, FunkSVD, PMF, LMF, NonNegMF, FM, LogisticMF, \
-    FFM, BPRSlim, Slim, CML, FISM, SVDpp
-from .unpersonalized import Random, MostPop
-from .autoencoders import MultiDAE, MultiVAE
-from .knowledge_aware import KaHFM, KaHFMBatch, KaHFMEmbeddings
-from .graph_based import NGCF, LightGCN
-from .visual_recommenders import VBPR, DeepStyle, ACF, DVBPR, VNPR
-from .NN import ItemKNN, UserKNN, AttributeItemKNN, AttributeUserKNN
-from .neural import DeepFM, DMF, NeuMF, NFM, GMF, NAIS, UserAutoRec, ItemAutoRec, ConvNeuMF, WideAndDeep, ConvMF, NPR
-from .content_based import VSM
-from .algebric import SlopeOne
-from .adversarial import AMF, AMR
-from .gan import IRGAN, CFGAN
+from elliot.utils.lazy_import import lazy_attributes
 
+# model name -> module of the model, imported on first access (e.g., by run_experiment)
+_models = {
+    "BPRMF_batch": ".latent_factor_models",
+    "BPRMF": ".latent_factor_models",
+    "WRMF": ".latent_factor_models",
+    "PureSVD": ".latent_factor_models",
+    "MF": ".latent_factor_models",
+    "FunkSVD": ".latent_factor_models",
+    "PMF": ".latent_factor_models",
+    "LMF": ".latent_factor_models",
+    "NonNegMF": ".latent_factor_models",
+    "FM": ".latent_factor_models",
+    "FFM": ".latent_factor_models",
+    "BPRSlim": ".latent_factor_models",
+    "Slim": ".latent_factor_models",
+    "CML": ".latent_factor_models",
+    "FISM": ".latent_factor_models",
+    "SVDpp": ".latent_factor_models",
+    "Random": ".unpersonalized",
+    "MostPop": ".unpersonalized",
+    "MultiDAE": ".autoencoders",
+    "MultiVAE": ".autoencoders",
+    "KaHFM": ".knowledge_aware",
+    "KaHFMBatch": ".knowledge_aware",
+    "KaHFMEmbeddings": ".knowledge_aware",
+    "NGCF": ".graph_based",
+    "LightGCN": ".graph_based",
+    "VBPR": ".visual_recommenders",
+    "DeepStyle": ".visual_recommenders",
+    "ACF": ".visual_recommenders",
+    "DVBPR": ".visual_recommenders",
+    "VNPR": ".visual_recommenders",
+    "ItemKNN": ".NN",
+    "UserKNN": ".NN",
+    "AttributeItemKNN": ".NN",
+    "AttributeUserKNN": ".NN",
+    "NeuMF": ".neural",
+    "NFM": ".neural",
+    "DeepFM": ".neural",
+    "DMF": ".neural",
+    "GMF": ".neural",
+    "NAIS": ".neural",
+    "UserAutoRec": ".neural",
+    "ItemAutoRec": ".neural",
+    "ConvNeuMF": ".neural",
+    "WideAndDeep": ".neural",
+    "ConvMF": ".neural",
+    "NPR": ".neural",
+    "VSM": ".content_based",
+    "SlopeOne": ".algebric",
+    "AMF": ".adversarial",
+    "AMR": ".adversarial",
+    "IRGAN": ".gan",
+    "CFGAN": ".gan"
+}
+
+__getattr__, __dir__ = lazy_attributes(__name__, _models)
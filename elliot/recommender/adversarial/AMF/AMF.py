@@ -10,12 +10,11 @@ __email__ = 'felice.merra@poliba.it, vitowalter.anelli@poliba.it, claudio.pomo@p
 import numpy as np
 from tqdm import tqdm
 
-from elliot.dataset.samplers import custom_sampler as cs
+from elliot.dataset.samplers import custom_csr_sampler as cs
 from elliot.recommender import BaseRecommenderModel
 from elliot.recommender.adversarial.AMF.AMF_model import AMF_model
 from elliot.recommender.base_recommender_model import init_charger
 from elliot.recommender.recommender_utils_mixin import RecMixin
-from elliot.utils.write import store_recommendation
 
 np.random.seed(42)
 
@@ -89,7 +88,7 @@ class AMF(RecMixin, BaseRecommenderModel):
 
         self._ratings = self._data.train_dict
 
-        self._sampler = cs.Sampler(self._data.i_train_dict)
+        self._sampler = cs.Sampler(self._data.sp_i_train, prefetch=self._prefetch_batches)
 
         self._model = AMF_model(self._factors,
                                     self._learning_rate,
@@ -137,16 +136,7 @@ class AMF(RecMixin, BaseRecommenderModel):
                     if self._save_weights:
                         self._model.save_weights(self._saving_filepath)
                     if self._save_recs:
-                        store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
+                        self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
 
     def get_recommendations(self, k: int = 100):
-        predictions_top_k = {}
-        for index, offset in enumerate(range(0, self._num_users, self._params.batch_size)):
-            offset_stop = min(offset+self._params.batch_size, self._num_users)
-            predictions = self._model.predict(offset, offset_stop)
-            mask = self.get_train_mask(offset, offset_stop)
-            v, i = self._model.get_top_k(predictions, mask, k=k)
-            items_ratings_pair = [list(zip(map(self._data.private_items.get, u_list[0]), u_list[1]))
-                                  for u_list in list(zip(i.numpy(), v.numpy()))]
-            predictions_top_k.update(dict(zip(range(offset, offset_stop), items_ratings_pair)))
-        return predictions_top_k
\ No newline at end of file
+        return self.get_top_k_recommendations(self._model.predict, k, self._params.batch_size)
\ No newline at end of file
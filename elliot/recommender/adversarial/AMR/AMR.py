@@ -13,14 +13,13 @@ import numpy as np
 import tensorflow as tf
 from tqdm import tqdm
 
-from elliot.dataset.samplers import custom_sampler as cs
+from elliot.dataset.samplers import custom_csr_sampler as cs
 from elliot.recommender.base_recommender_model import init_charger
 from elliot.evaluation.evaluator import Evaluator
 from elliot.recommender import BaseRecommenderModel
 from elliot.recommender.adversarial.AMR.AMR_model import AMR_model
 from elliot.recommender.recommender_utils_mixin import RecMixin
 from elliot.utils.folder import build_model_folder
-from elliot.utils.write import store_recommendation
 
 np.random.seed(0)
 tf.random.set_seed(0)
@@ -105,7 +104,7 @@ class AMR(RecMixin, BaseRecommenderModel):
 
         self._ratings = self._data.train_dict
 
-        self._sampler = cs.Sampler(self._data.i_train_dict)
+        self._sampler = cs.Sampler(self._data.sp_i_train, prefetch=self._prefetch_batches)
 
         item_indices = [self._data.item_mapping[self._data.private_items[item]] for item in range(self._num_items)]
 
@@ -159,16 +158,7 @@ class AMR(RecMixin, BaseRecommenderModel):
                     if self._save_weights:
                         self._model.save_weights(self._saving_filepath)
                     if self._save_recs:
-                        store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
+                        self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
 
     def get_recommendations(self, k: int = 100):
-        predictions_top_k = {}
-        for index, offset in enumerate(range(0, self._num_users, self._params.batch_size)):
-            offset_stop = min(offset + self._params.batch_size, self._num_users)
-            predictions = self._model.predict(offset, offset_stop)
-            mask = self.get_train_mask(offset, offset_stop)
-            v, i = self._model.get_top_k(predictions, mask, k=k)
-            items_ratings_pair = [list(zip(map(self._data.private_items.get, u_list[0]), u_list[1]))
-                                  for u_list in list(zip(i.numpy(), v.numpy()))]
-            predictions_top_k.update(dict(zip(range(offset, offset_stop), items_ratings_pair)))
-        return predictions_top_k
+        return self.get_top_k_recommendations(self._model.predict, k, self._params.batch_size)
@@ -1,2 +1,9 @@
-from .AMF import AMF
-from .AMR import AMR
\ No newline at end of file
+from elliot.utils.lazy_import import lazy_attributes
+
+# models are imported on first access
+_models = {
+    "AMF": ".AMF",
+    "AMR": ".AMR"
+}
+
+__getattr__, __dir__ = lazy_attributes(__name__, _models)
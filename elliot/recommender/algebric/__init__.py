@@ -1 +1,8 @@
-from .slope_one import SlopeOne
\ No newline at end of file
+from elliot.utils.lazy_import import lazy_attributes
+
+# models are imported on first access
+_models = {
+    "SlopeOne": ".slope_one"
+}
+
+__getattr__, __dir__ = lazy_attributes(__name__, _models)
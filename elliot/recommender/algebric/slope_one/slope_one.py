@@ -16,7 +16,6 @@ import numpy as np
 from elliot.recommender.algebric.slope_one.slope_one_model import SlopeOneModel
 from elliot.recommender.base_recommender_model import BaseRecommenderModel, init_charger
 from elliot.recommender.recommender_utils_mixin import RecMixin
-from elliot.utils.write import store_recommendation
 
 np.random.seed(42)
 
@@ -27,6 +26,10 @@ class SlopeOne(RecMixin, BaseRecommenderModel):
 
     For further details, please refer to the `paper <https://arxiv.org/abs/cs/0702144>`_
 
+    Args:
+        sparse_output: Select the top-k items among sparse score blocks of the co-rated items, without dense score
+            blocks (for large catalogs)
+
     To include the recommendation model, add it to the config file adopting the following pattern:
 
     .. code:: yaml
@@ -35,6 +38,7 @@ class SlopeOne(RecMixin, BaseRecommenderModel):
         SlopeOne:
           meta:
             save_recs: True
+          sparse_output: False
     """
     @init_charger
     def __init__(self, data, config, params, *args, **kwargs):
@@ -44,13 +48,19 @@ class SlopeOne(RecMixin, BaseRecommenderModel):
         self._num_items = self._data.num_items
         self._num_users = self._data.num_users
 
-        self._ratings = self._data.train_dict
-        self._i_ratings = self._data.i_train_dict
+        self._params_list = [
+            ("_sparse_output", "sparse_output", "so", False, None, None)
+        ]
+        self.autoset_params()
 
         self._model = SlopeOneModel(self._data)
 
     def get_recommendations(self, k: int = 100):
-        return {u: self._model.get_user_recs(u, k) for u in self._ratings.keys()}
+        if not self._sparse_output:
+            return self.get_top_k_recommendations(self._model.predict_block, k)
+
+        return self.get_sparse_top_k_recommendations(lambda start, stop: self._model.candidate_block(start, stop, k),
+                                                     k, predict_block=self._model.predict_block)
 
     @property
     def name(self):
@@ -77,7 +87,7 @@ class SlopeOne(RecMixin, BaseRecommenderModel):
                 with open(self._saving_filepath, "wb") as f:
                     pickle.dump(self._model.get_model_state(), f)
             if self._save_recs:
-                store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
+                self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
 
     def restore_weights(self):
         try:
@@ -91,7 +101,7 @@ class SlopeOne(RecMixin, BaseRecommenderModel):
 
             print("******************************************")
             if self._save_recs:
-                store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
+                self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
             return True
 
         except Exception as ex:
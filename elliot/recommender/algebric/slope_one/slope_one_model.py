@@ -1,4 +1,3 @@
-
 """
 
 Lemire, Daniel, and Anna Maclachlan. "Slope one predictors for online rating-based collaborative filtering."
@@ -6,6 +5,7 @@ Proceedings of the 2005 SIAM International Conference on Data Mining. Society fo
 """
 
 import numpy as np
+import scipy.sparse as sp
 
 
 class SlopeOneModel:
@@ -13,52 +13,92 @@ class SlopeOneModel:
         self._data = data
         self._num_items = self._data.num_items
         self._num_users = self._data.num_users
-        self._i_train = self._data.i_train_dict
+        self._ratings = self._data.sp_i_train_ratings.tocsr()
+        self._binary = self._data.sp_i_train.tocsr()
 
     def initialize(self):
-        freq = np.empty((self._num_items, self._num_items))
-        dev = np.empty((self._num_items, self._num_items))
-
-        # Computation of freq and dev arrays.
-        for u, u_ratings in self._i_train.items():
-            for i, r_ui in u_ratings.items():
-                for j, r_uj in u_ratings.items():
-                    freq[i, j] += 1
-                    dev[i, j] += r_ui - r_uj
-
-        for i in range(self._num_items):
-            dev[i, i] = 0
-            for j in range(i + 1, self._num_items):
-                dev[i, j] = dev[i, j]/freq[i, j] if freq[i, j] != 0 else 0
-                dev[j, i] = -dev[i, j]
+        # freq[i, j]: number of users who rated both i and j
+        freq = (self._binary.T @ self._binary).tocsr()
+
+        # dev[i, j]: mean of r_ui - r_uj over the users who rated both i and j,
+        # where co_ratings[i, j] is the sum of r_ui over the same users
+        co_ratings = (self._ratings.T @ self._binary).tocsr()
+        dev = (co_ratings - co_ratings.T).multiply(freq.power(-1)).tocsr()
+        dev.eliminate_zeros()
 
         self.freq = freq
         self.dev = dev
+        self.compute_co_rated()
 
         # mean ratings of all users: mu_u
-        self.user_mean = [np.mean([r for (_, r) in self._i_train[u].items()]) for u in range(self._num_users)]
-
-    def predict(self, user, item):
-        Ri = [j for (j, _) in self._i_train[user].items() if self.freq[item, j] > 0]
-        pred = self.user_mean[user]
-        if Ri:
-            pred += sum(self.dev[item, j] for j in Ri) / len(Ri)
-        return pred
-
-    def get_user_recs(self, u, k):
-        uidx = self._data.public_users[u]
-        user_items = self._data.train_dict[u].keys()
-        indexed_user_items = [self._data.public_items[i] for i in user_items]
-        predictions = {self._data.private_items[i]: self.predict(uidx, i) for i in range(self._num_items) if i not in indexed_user_items}
-
-        indices, values = zip(*predictions.items())
-        indices = np.array(indices)
-        values = np.array(values)
-        partially_ordered_preds_indices = np.argpartition(values, -k)[-k:]
-        real_values = values[partially_ordered_preds_indices]
-        real_indices = indices[partially_ordered_preds_indices]
-        local_top_k = real_values.argsort()[::-1]
-        return [(real_indices[item], real_values[item]) for item in local_top_k]
+        counts = np.asarray(self._binary.sum(axis=1)).ravel()
+        sums = np.asarray(self._ratings.sum(axis=1)).ravel()
+        self.user_mean = np.divide(sums, counts, out=np.zeros_like(sums, dtype=np.float64), where=counts != 0)
+
+    def compute_co_rated(self):
+        self._co_rated = (self.freq > 0).astype(np.float64)
+
+    @staticmethod
+    def _keys(matrix):
+        return np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr)) * matrix.shape[1] + matrix.indices
+
+    def _adjustments(self, start, stop):
+        """
+        Sparse (stop - start x items) matrix of mean deviations. Every item co-rated with the user profile is
+        stored, even when its deviation is zero
+        """
+        profiles = self._binary[start:stop]
+        den = (profiles @ self._co_rated).tocsr()
+        den.sort_indices()
+        # dev is antisymmetric, hence sum_j dev[i, j] over the user items is -(profiles @ dev)[u, i]
+        num = (profiles @ self.dev).tocsr()
+        adjustments = den.copy()
+        adjustments.data = np.zeros(len(den.data))
+        adjustments.data[np.searchsorted(self._keys(den), self._keys(num))] = -num.data
+        adjustments.data /= den.data
+        return adjustments
+
+    def predict_block(self, start, stop):
+        return self._adjustments(start, stop).toarray() + self.user_mean[start:stop, None]
+
+    def predict_block_sparse(self, start, stop):
+        """
+        Sparse-output predictions: only the co-rated (user, item) pairs are stored,
+        every missing item of a row is implicitly predicted as the user mean
+        :return: (CSR predictions, user means)
+        """
+        predictions = self._adjustments(start, stop)
+        predictions.data += np.repeat(self.user_mean[start:stop], np.diff(predictions.indptr))
+        return predictions, self.user_mean[start:stop]
+
+    def candidate_block(self, start, stop, k):
+        """
+        Sparse score block holding the co-rated items of every user and, among the other items unseen in training,
+        the first k ones scored with the user mean: its top-k stored entries are a top-k of the full predictions
+        """
+        predictions, means = self.predict_block_sparse(start, stop)
+        n_rows, k = stop - start, min(k, self._num_items)
+        pattern = sp.csr_matrix((np.ones(len(predictions.indices)), predictions.indices, predictions.indptr),
+                                shape=predictions.shape)
+        excluded = (pattern + self._binary[start:stop]).tocsr()
+        excluded.sort_indices()
+        lengths = np.diff(excluded.indptr)
+        rows = np.repeat(np.arange(n_rows, dtype=np.int64), lengths)
+
+        # the j-th item out of a sorted excluded row is j plus the number of excluded items whose gap rank
+        # (i.e., the number of items out of the row before them) is at most j
+        gaps = excluded.indices - (np.arange(len(rows)) - np.repeat(excluded.indptr[:-1], lengths))
+        keys = rows * (self._num_items + 1) + gaps
+        queries = np.arange(n_rows, dtype=np.int64)[:, None] * (self._num_items + 1) + np.arange(k)
+        fillers = np.arange(k) + np.searchsorted(keys, queries, side="right") - excluded.indptr[:-1, None]
+        valid = fillers < self._num_items
+
+        filler_rows = np.broadcast_to(np.arange(n_rows)[:, None], fillers.shape)[valid]
+        prediction_rows = np.repeat(np.arange(n_rows), np.diff(predictions.indptr))
+        return sp.csr_matrix((np.concatenate([predictions.data, means[filler_rows]]),
+                              (np.concatenate([prediction_rows, filler_rows]),
+                               np.concatenate([predictions.indices, fillers[valid]]))),
+                             shape=(n_rows, self._num_items))
 
     def get_model_state(self):
         saving_dict = {}
@@ -71,3 +111,4 @@ class SlopeOneModel:
         self.freq = saving_dict['freq']
         self.dev = saving_dict['dev']
         self.user_mean = saving_dict['user_mean']
+        self.compute_co_rated()
@@ -7,5 +7,12 @@ __version__ = '0.1'
 __author__ = 'Vito Walter Anelli, Claudio Pomo'
 __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 
-from .dae.multi_dae import MultiDAE
-from .vae.multi_vae import MultiVAE
\ No newline at end of file
+from elliot.utils.lazy_import import lazy_attributes
+
+# models are imported on first access
+_models = {
+    "MultiDAE": ".dae.multi_dae",
+    "MultiVAE": ".vae.multi_vae"
+}
+
+__getattr__, __dir__ = lazy_attributes(__name__, _models)
@@ -16,7 +16,6 @@ from elliot.dataset.samplers import sparse_sampler as sp
 from elliot.recommender import BaseRecommenderModel
 from elliot.recommender.autoencoders.dae.multi_dae_model import DenoisingAutoEncoder
 from elliot.recommender.recommender_utils_mixin import RecMixin
-from elliot.utils.write import store_recommendation
 from elliot.recommender.base_recommender_model import init_charger
 
 np.random.seed(42)
@@ -121,4 +120,4 @@ class MultiDAE(RecMixin, BaseRecommenderModel):
                     if self._save_weights:
                         self._model.save_weights(self._saving_filepath)
                     if self._save_recs:
-                        store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
+                        self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
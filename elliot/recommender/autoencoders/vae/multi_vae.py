@@ -17,7 +17,6 @@ from elliot.recommender import BaseRecommenderModel
 from elliot.recommender.autoencoders.vae.multi_vae_model import VariationalAutoEncoder
 from elliot.recommender.base_recommender_model import init_charger
 from elliot.recommender.recommender_utils_mixin import RecMixin
-from elliot.utils.write import store_recommendation
 
 np.random.seed(42)
 random.seed(0)
@@ -133,4 +132,4 @@ class MultiVAE(RecMixin, BaseRecommenderModel):
                     if self._save_weights:
                         self._model.save_weights(self._saving_filepath)
                     if self._save_recs:
-                        store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
+                        self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
@@ -5,6 +5,7 @@ Module description:
 import logging as pylog
 from elliot.evaluation.evaluator import Evaluator
 from elliot.utils.folder import build_model_folder
+from elliot.utils.write import RecommendationWriter
 
 __version__ = '0.1'
 __author__ = 'Vito Walter Anelli, Claudio Pomo'
@@ -43,9 +44,13 @@ class BaseRecommenderModel(ABC):
         self._validation_metric = self._validation_metric[0]
         self._save_weights = getattr(self._params.meta, "save_weights", False)
         self._save_recs = getattr(self._params.meta, "save_recs", False)
+        self.recommendation_writer = RecommendationWriter(getattr(self._params.meta, "save_recs_format", "tsv"),
+                                                          getattr(self._params.meta, "save_recs_best_only", False),
+                                                          getattr(self._params.meta, "save_recs_background", True))
         self._verbose = getattr(self._params.meta, "verbose", None)
         self._validation_rate = getattr(self._params.meta, "validation_rate", 1)
         self._compute_auc = getattr(self._params.meta, "compute_auc", False)
+        self._prefetch_batches = getattr(self._params.meta, "prefetch_batches", 0)
         self._epochs = getattr(self._params, "epochs", 2)
         self._iteration = 0
         if self._epochs < self._validation_rate:
@@ -1,26 +1,105 @@
+"""
+Module description:
+TF-IDF of the item features, computed over a CSR (items x features) matrix.
+
+Document frequencies are column counts of the binary item-feature matrix, and user profiles are sparse products of the
+(users x items) rating pattern with the TF-IDF matrix, so no per-feature Python loop is involved. The dictionary views
+of the former implementation are built from the matrices on request.
+"""
+
+__version__ = '0.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
 import typing as t
-from collections import Counter
-import math
+
 import numpy as np
+import pandas as pd
+import scipy.sparse as sp
 
 
 class TFIDF:
     def __init__(self, map: t.Dict[int, t.List[int]]):
-        self.__map = map
-        self.__o = Counter(feature for feature_list in self.__map.values() for feature in feature_list )
-        self.__maxi = max(self.__o.values())
-        self.__total_documents = len(self.__map)
-        self.__idfo = {k: math.log(self.__total_documents/v) for k, v in self.__o.items()}
-        self.__tfidf = {}
-        for k, v in self.__map.items():
-            normalization = math.sqrt(sum([self.__idfo[i]**2 for i in v]))
-            self.__tfidf[k] ={i:self.__idfo[i]/normalization for i in v}
+        self._map = map
+        self.items = list(map.keys())
+        lengths = np.fromiter((len(v) for v in map.values()), dtype=np.int64, count=len(map))
+        self.features, codes = np.unique(np.array([f for v in map.values() for f in v]), return_inverse=True)
+
+        binary = sp.csr_matrix((np.ones(len(codes)), (np.repeat(np.arange(len(self.items)), lengths), codes.ravel())),
+                               shape=(len(self.items), len(self.features)))
+        binary.sum_duplicates()
+        binary.data[:] = 1
+        self._binary = binary
+
+        idf = np.log(len(self.items) / np.bincount(binary.indices, minlength=len(self.features)))
+        rows = np.repeat(np.arange(len(self.items)), np.diff(binary.indptr))
+        norms = np.sqrt(np.bincount(rows, weights=idf[binary.indices] ** 2, minlength=len(self.items)))
+        values = np.divide(idf[binary.indices], norms[rows], out=np.zeros(len(rows)), where=norms[rows] > 0)
+        self._matrix = sp.csr_matrix((values, binary.indices, binary.indptr), shape=binary.shape)
+        self._tfidf = None
 
     def tfidf(self):
-        return self.__tfidf
+        """
+        TF-IDF of every item, in the form {item: {feature: value}}
+        """
+        if self._tfidf is None:
+            self._tfidf = self._to_dict(self.items, self._matrix)
+        return self._tfidf
+
+    def tfidf_matrix(self, items: t.Sequence = None, features: t.Sequence = None) -> sp.csr_matrix:
+        """
+        (items x features) CSR TF-IDF matrix
+        :param items: ids of the rows (by default, the items of the map). Unknown items get empty rows
+        :param features: ids of the columns (by default, self.features). Other features are discarded
+        """
+        matrix = self._matrix
+        if items is not None:
+            positions = pd.Index(self.items).get_indexer(list(items))
+            known = sp.diags((positions >= 0).astype(np.float64))
+            matrix = (known @ matrix[np.maximum(positions, 0)]).tocsr()
+            matrix.eliminate_zeros()
+        return self._align_features(matrix, features)
+
+    def profile_matrix(self, ratings: t.Dict[int, t.Dict[int, float]], features: t.Sequence = None) -> sp.csr_matrix:
+        """
+        (users x features) CSR matrix of the user profiles, with the users in the order of ratings
+        """
+        rated = self._rating_matrix(ratings)
+        return self._align_features(self._profiles(rated @ self._matrix, rated, ratings), features)
 
     def get_profiles(self, ratings: t.Dict[int, t.Dict[int, float]]):
-        profiles = {}
-        profiles = {u: {f: profiles.get(u, {}).get(f, []) + [v] for i in items.keys() if i in self.__tfidf.keys() for f, v in self.__tfidf[i].items()} for u, items in ratings.items()}
-        profiles = {u: {f: np.average(v) for f, v in f_dict.items()} for u, f_dict in profiles.items()}
-        return profiles
+        return self._to_dict(list(ratings.keys()), self.profile_matrix(ratings))
+
+    def _profiles(self, sums: sp.csr_matrix, rated: sp.csr_matrix, ratings) -> sp.csr_matrix:
+        """
+        Average TF-IDF value of every feature over the rated items that have it
+        """
+        counts = rated @ self._binary
+        return sp.csr_matrix(sums.multiply(counts.power(-1)))
+
+    def _rating_matrix(self, ratings) -> sp.csr_matrix:
+        """
+        Binary (users x items of the map) matrix of the rated items
+        """
+        lengths = np.fromiter((len(v) for v in ratings.values()), dtype=np.int64, count=len(ratings))
+        positions = pd.Index(self.items).get_indexer([i for items in ratings.values() for i in items])
+        rows = np.repeat(np.arange(len(ratings)), lengths)
+        known = positions >= 0
+        return sp.csr_matrix((np.ones(np.count_nonzero(known)), (rows[known], positions[known])),
+                             shape=(len(ratings), len(self.items)))
+
+    def _align_features(self, matrix: sp.csr_matrix, features: t.Sequence = None) -> sp.csr_matrix:
+        if features is None:
+            return matrix
+        columns = pd.Index(list(features)).get_indexer(self.features)[matrix.indices]
+        rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+        kept = columns >= 0
+        aligned = sp.csr_matrix((matrix.data[kept], (rows[kept], columns[kept])),
+                                shape=(matrix.shape[0], len(features)))
+        aligned.sort_indices()
+        return aligned
+
+    def _to_dict(self, keys: t.List, matrix: sp.csr_matrix):
+        features = self.features.tolist()
+        return {k: {features[f]: v for f, v in zip(matrix.indices[s:e].tolist(), matrix.data[s:e].tolist())}
+                for k, s, e in zip(keys, matrix.indptr[:-1].tolist(), matrix.indptr[1:].tolist())}
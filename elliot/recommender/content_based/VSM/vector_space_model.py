@@ -15,7 +15,6 @@ import typing as t
 import scipy.sparse as sp
 
 from elliot.recommender.recommender_utils_mixin import RecMixin
-from elliot.utils.write import store_recommendation
 
 from elliot.recommender.base_recommender_model import BaseRecommenderModel
 from elliot.recommender.content_based.VSM.vector_space_model_similarity import Similarity
@@ -123,7 +122,7 @@ class VSM(RecMixin, BaseRecommenderModel):
                     print("Saving Model")
                     pickle.dump(self._model.get_model_state(), f)
             if self._save_recs:
-                store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
+                self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
 
     def compute_binary_profile(self, user_items_dict: t.Dict):
         user_features = {}
@@ -166,7 +165,7 @@ class VSM(RecMixin, BaseRecommenderModel):
 
             print("******************************************")
             if self._save_recs:
-                store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
+                self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
             return True
 
         except Exception as ex:
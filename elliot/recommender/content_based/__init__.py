@@ -1 +1,8 @@
-from .VSM import VSM
\ No newline at end of file
+from elliot.utils.lazy_import import lazy_attributes
+
+# models are imported on first access
+_models = {
+    "VSM": ".VSM"
+}
+
+__getattr__, __dir__ = lazy_attributes(__name__, _models)
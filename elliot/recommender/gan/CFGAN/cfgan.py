@@ -15,7 +15,6 @@ from elliot.recommender import BaseRecommenderModel
 from elliot.recommender.base_recommender_model import init_charger
 from elliot.recommender.gan.CFGAN.cfgan_model import CFGAN_model
 from elliot.recommender.recommender_utils_mixin import RecMixin
-from elliot.utils.write import store_recommendation
 
 np.random.seed(42)
 
@@ -152,16 +151,7 @@ class CFGAN(RecMixin, BaseRecommenderModel):
                     if self._save_weights:
                         self._model.save_weights(self._saving_filepath)
                     if self._save_recs:
-                        store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
+                        self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
 
     def get_recommendations(self, k: int = 100):
-        predictions_top_k = {}
-        for index, offset in enumerate(range(0, self._num_users, self._params.batch_size)):
-            offset_stop = min(offset+self._params.batch_size, self._num_users)
-            predictions = self._model.predict(offset, offset_stop)
-            mask = self.get_train_mask(offset, offset_stop)
-            v, i = self._model.get_top_k(predictions, mask, k=k)
-            items_ratings_pair = [list(zip(map(self._data.private_items.get, u_list[0]), u_list[1]))
-                                  for u_list in list(zip(i.numpy(), v.numpy()))]
-            predictions_top_k.update(dict(zip(range(offset, offset_stop), items_ratings_pair)))
-        return predictions_top_k
\ No newline at end of file
+        return self.get_top_k_recommendations(self._model.predict, k, self._params.batch_size)
\ No newline at end of file
@@ -15,7 +15,6 @@ from elliot.recommender import BaseRecommenderModel
 from elliot.recommender.base_recommender_model import init_charger
 from elliot.recommender.gan.IRGAN.irgan_model import IRGAN_model
 from elliot.recommender.recommender_utils_mixin import RecMixin
-from elliot.utils.write import store_recommendation
 
 np.random.seed(42)
 
@@ -38,6 +37,7 @@ class IRGAN(RecMixin, BaseRecommenderModel):
         g_pretrain_epochs: Number of epochs to pre-train the generator
         d_pretrain_epochs: Number of epochs to pre-train the discriminator
         sample_lambda: Temperature Parameters
+        g_block_size: Number of users of each generator update (by default, about 2^22 scores per block)
 
     To include the recommendation model, add it to the config file adopting the following pattern:
 
@@ -79,6 +79,7 @@ class IRGAN(RecMixin, BaseRecommenderModel):
             ("_sample_lambda", "sample_lambda", "sample_lambda", 0.2, None, None)
         ]
         self.autoset_params()
+        self._g_block_size = getattr(self._params, "g_block_size", None)
 
         if self._batch_size < 1:
             self._batch_size = self._data.transactions
@@ -104,7 +105,8 @@ class IRGAN(RecMixin, BaseRecommenderModel):
                                   self._d_pretrain_epochs,
                                   self._g_epochs,
                                   self._d_epochs,
-                                  self._sample_lambda)
+                                  self._sample_lambda,
+                                  self._g_block_size)
 
     @property
     def name(self):
@@ -141,16 +143,7 @@ class IRGAN(RecMixin, BaseRecommenderModel):
                     if self._save_weights:
                         self._model.save_weights(self._saving_filepath)
                     if self._save_recs:
-                        store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
+                        self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
 
     def get_recommendations(self, k: int = 100):
-        predictions_top_k = {}
-        for index, offset in enumerate(range(0, self._num_users, self._params.batch_size)):
-            offset_stop = min(offset + self._params.batch_size, self._num_users)
-            predictions = self._model.predict(offset, offset_stop)
-            mask = self.get_train_mask(offset, offset_stop)
-            v, i = self._model.get_top_k(predictions, mask, k=k)
-            items_ratings_pair = [list(zip(map(self._data.private_items.get, u_list[0]), u_list[1]))
-                                  for u_list in list(zip(i.numpy(), v.numpy()))]
-            predictions_top_k.update(dict(zip(range(offset, offset_stop), items_ratings_pair)))
-        return predictions_top_k
+        return self.get_top_k_recommendations(self._model.predict, k, self._params.batch_size)
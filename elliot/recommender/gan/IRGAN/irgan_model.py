@@ -107,6 +107,34 @@ class Generator(keras.Model):
 
         return gan_loss
 
+    # @tf.function
+    def train_step_with_block_reward(self, batch):
+        """
+        Single update for the samples of a block of users: the loss is the average over the users of
+        train_step_with_reward, where the softmax of every user runs over its own samples
+        :param batch: (user, item, reward, segment) arrays, where segment is the sorted 0-based index of the user
+        """
+        user, pos, reward, segment = batch
+        n_users = int(segment[-1]) + 1
+
+        with tf.GradientTape() as tape:
+            xui, beta_i, gamma_u, gamma_i = self(inputs=(user, pos), training=True)
+            shifted = xui - tf.gather(tf.math.segment_max(xui, segment), segment)
+            log_prob = shifted - tf.gather(tf.math.log(tf.math.segment_sum(tf.exp(shifted), segment)), segment)
+
+            gan_loss = -tf.reduce_mean(tf.math.segment_mean(log_prob * reward, segment))
+
+            reg_loss = self._l_w * tf.reduce_sum([tf.nn.l2_loss(gamma_u),
+                                                  tf.nn.l2_loss(gamma_i)]) \
+                       + self._l_b * tf.nn.l2_loss(beta_i)
+
+            gan_loss += reg_loss / n_users
+
+        grads = tape.gradient(gan_loss, self.trainable_weights)
+        self.optimizer.apply_gradients(zip(grads, self.trainable_weights))
+
+        return gan_loss
+
 
 class Discriminator(keras.Model):
 
@@ -190,6 +218,7 @@ class IRGAN_model(keras.Model):
                  g_epochs=5,
                  d_epochs=1,
                  sample_lambda=0.2,
+                 g_block_size=None,
                  name="IRGAN",
                  **kwargs):
         super().__init__(name=name, **kwargs)
@@ -210,6 +239,10 @@ class IRGAN_model(keras.Model):
         self._d_epochs = d_epochs
         self._batch_size = batch_size
         self._sample_lambda = sample_lambda
+        # users of a generator step, by default about 2^22 scores per block
+        self._g_block_size = g_block_size if g_block_size else max(1, 2 ** 22 // max(1, self._num_items))
+        self._train = self._data.sp_i_train.tocsr()
+        self._random = np.random.default_rng(42)
 
         self.initializer = tf.initializers.GlorotUniform()
 
@@ -258,30 +291,59 @@ class IRGAN_model(keras.Model):
         for g_epoch in range(self._g_epochs):
             # print(f'***** Train G - Epoch{g_epoch + 1}/{self._g_epochs}')
             gan_loss = 0
-            for user in range(self._num_users):
-                # print(f'***** Train G - Epoch{g_epoch+1}/{self._g_epochs} - User {user+1}/{self._num_users}')
-                u, pos = self._data.sp_i_train_ratings.getrow(user).nonzero()
-                pred_score, _, _, _ = self._generator(
-                    inputs=(np.repeat(user, self._num_items), np.zeros_like(self._num_items)))
-                exp_pred_score = np.exp(pred_score)
-                prob = exp_pred_score / np.sum(exp_pred_score)
-
-                # Here is the importance sampling.
-                pn = (1 - self._sample_lambda) * prob
-                pn[pos] += self._sample_lambda * 1.0 / len(pos)
-                sample = np.random.choice(np.arange(self._num_items), 3 * len(pos), p=pn)
-
-                # Get reward and adapt it with importance sampling
-                reward_logits, _, _, _ = self._discriminator(inputs=(np.repeat(user, len(sample)), sample))
-                reward = 2 * (tf.sigmoid(reward_logits) - 0.5)
-                reward = reward * prob[sample] / pn[sample]
-
-                # Update G
-                gan_loss += self._generator.train_step_with_reward(batch=(np.repeat(user, len(sample)), sample, reward))
+            for start in range(0, self._num_users, self._g_block_size):
+                gan_loss += self.train_generator_block(start, min(start + self._g_block_size, self._num_users))
             gan_loss /= self._num_users
 
         return dis_loss, gan_loss
 
+    def train_generator_block(self, start, stop):
+        """
+        Generator step on the users [start, stop): the sampling distributions of all the users are computed from a
+        single block of scores, 3 items per positive are drawn for every user by inverse CDF on the row cumulative
+        sums, and the discriminator reward and the generator update are computed once for the whole block
+        :return: sum of the generator losses of the users of the block
+        """
+        train = self._train[start:stop]
+        lengths = np.diff(train.indptr)
+        active = np.flatnonzero(lengths)
+        if not len(active):
+            return 0
+
+        scores = (self._generator.Bi + tf.matmul(self._generator.Gu[start:stop], self._generator.Gi,
+                                                 transpose_b=True)).numpy().astype(np.float64)[active]
+        train, lengths = train[active], lengths[active]
+        rows = np.repeat(np.arange(len(active)), lengths)
+
+        # softmax of the scores of every user
+        scores -= scores.max(axis=1, keepdims=True)
+        prob = np.exp(scores, out=scores)
+        prob /= prob.sum(axis=1, keepdims=True)
+
+        # importance sampling: the positives of every user get sample_lambda of the mass
+        pn = (1 - self._sample_lambda) * prob
+        pn[rows, train.indices] += self._sample_lambda / lengths[rows]
+
+        # rows are normalized cumulative sums shifted by the row index, hence the flattened array is sorted and
+        # every draw falls in the row of its user
+        cdf = np.cumsum(pn, axis=1)
+        cdf /= cdf[:, -1:]
+        cdf += np.arange(len(active))[:, None]
+        segment = np.repeat(np.arange(len(active)), 3 * lengths)
+        draws = segment + self._random.random(len(segment))
+        sample = np.minimum(np.searchsorted(cdf.ravel(), draws, side="right") - segment * self._num_items,
+                            self._num_items - 1)
+        users = active[segment] + start
+
+        # Get reward and adapt it with importance sampling
+        reward_logits, _, _, _ = self._discriminator(inputs=(users, sample))
+        reward = 2 * (tf.sigmoid(reward_logits) - 0.5)
+        reward = reward * (prob[segment, sample] / pn[segment, sample]).astype(np.float32)
+
+        # Update G
+        gan_loss = self._generator.train_step_with_block_reward(batch=(users, sample, reward, segment))
+        return gan_loss * len(active)
+
     # @tf.function
     def predict(self, start, stop, **kwargs):
         if self._predict_model == "generator":
@@ -1,2 +1,9 @@
-from .IRGAN import IRGAN
-from .CFGAN import CFGAN
\ No newline at end of file
+from elliot.utils.lazy_import import lazy_attributes
+
+# models are imported on first access
+_models = {
+    "IRGAN": ".IRGAN",
+    "CFGAN": ".CFGAN"
+}
+
+__getattr__, __dir__ = lazy_attributes(__name__, _models)
@@ -1,2 +1,9 @@
-from .ngcf import NGCF
-from .lightgcn import LightGCN
+from elliot.utils.lazy_import import lazy_attributes
+
+# models are imported on first access
+_models = {
+    "NGCF": ".ngcf",
+    "LightGCN": ".lightgcn"
+}
+
+__getattr__, __dir__ = lazy_attributes(__name__, _models)
@@ -1,3 +1,10 @@
-from .kaHFM import KaHFM
-from .kaHFM_batch import KaHFMBatch
-from .kahfm_embeddings import KaHFMEmbeddings
\ No newline at end of file
+from elliot.utils.lazy_import import lazy_attributes
+
+# models are imported on first access
+_models = {
+    "KaHFM": ".kaHFM",
+    "KaHFMBatch": ".kaHFM_batch",
+    "KaHFMEmbeddings": ".kahfm_embeddings"
+}
+
+__getattr__, __dir__ = lazy_attributes(__name__, _models)
@@ -2,12 +2,12 @@ import time
 import numpy as np
 import pickle
 import typing as t
+import scipy.sparse as sp
 
 
 from elliot.dataset.samplers import pairwise_sampler as ps
 from elliot.recommender.base_recommender_model import BaseRecommenderModel
 from elliot.recommender.recommender_utils_mixin import RecMixin
-from elliot.utils.write import store_recommendation
 from elliot.recommender.knowledge_aware.kaHFM.tfidf_utils import TFIDF
 from elliot.recommender.base_recommender_model import init_charger
 
@@ -34,16 +34,7 @@ class MF(object):
         :param scale:
         :return:
         """
-        self._users: t.List = list(self._ratings.keys())
-        self._items: t.List = list({k for a in self._ratings.values() for k in a.keys() if k in self._map.keys()})
-        self._features: t.List = list({f for i in self._items for f in self._map[i]})
-        self._factors = len(self._features)
-        self._private_users: t.Dict = {p:u for p,u in enumerate(self._users)}
-        self._public_users: t.Dict = {v: k for k, v in self._private_users.items()}
-        self._private_items: t.Dict = {p:i for p,i in enumerate(self._items)}
-        self._public_items: t.Dict = {v: k for k, v in self._private_items.items()}
-        self._private_features: t.Dict = {p:f for p,f in enumerate(self._features)}
-        self._public_features: t.Dict = {v: k for k, v in self._private_features.items()}
+        self._initialize_indices()
 
         self._global_bias: int = 0
 
@@ -66,6 +57,18 @@ class MF(object):
 
         self._transactions = sum(len(v) for v in self._ratings.values())
 
+    def _initialize_indices(self):
+        self._users: t.List = list(self._ratings.keys())
+        self._items: t.List = list({k for a in self._ratings.values() for k in a.keys() if k in self._map.keys()})
+        self._features: t.List = list({f for i in self._items for f in self._map[i]})
+        self._factors = len(self._features)
+        self._private_users: t.Dict = {p:u for p,u in enumerate(self._users)}
+        self._public_users: t.Dict = {v: k for k, v in self._private_users.items()}
+        self._private_items: t.Dict = {p:i for p,i in enumerate(self._items)}
+        self._public_items: t.Dict = {v: k for k, v in self._private_items.items()}
+        self._private_features: t.Dict = {p:f for p,f in enumerate(self._features)}
+        self._public_features: t.Dict = {v: k for k, v in self._private_features.items()}
+
     @property
     def name(self):
         return "KG_MF"
@@ -80,8 +83,11 @@ class MF(object):
         return self._global_bias + self._item_bias[self._public_items[item]] \
                + self._user_factors[self._public_users[user]] @ self._item_factors[self._public_items[item]]
 
+    def _scores(self, user: int):
+        return self._item_bias + self._item_factors @ self._user_factors[self._public_users[user]]
+
     def get_user_recs(self, user: int, k: int):
-        arr = self._item_bias + self._item_factors @ self._user_factors[self._public_users[user]]
+        arr = self._scores(user)
         top_k = arr.argsort()[-(len(self._ratings[user].keys()) + k):][::-1]
         top_k_2 = [(self._private_items[i], arr[i]) for p, i in enumerate(top_k)
                    if (self._private_items[i] not in self._ratings[user].keys())]
@@ -91,7 +97,7 @@ class MF(object):
     def get_user_recs_argpartition(self, user: int, k: int):
         user_items = self._ratings[user].keys()
         safety_k = len(user_items)+k
-        predictions = self._item_bias +  self._item_factors  @ self._user_factors[self._public_users[user]]
+        predictions = self._scores(user)
         partially_ordered_preds_indices = np.argpartition(predictions, -safety_k)[-safety_k:]
         partially_ordered_preds_values = predictions[partially_ordered_preds_indices]
         partially_ordered_preds_ids = [self._private_items[x] for x in partially_ordered_preds_indices]
@@ -149,6 +155,149 @@ class MF(object):
         self._item_factors[self._public_items[item]] = v
 
 
+class SparseMF(MF):
+    """
+    Matrix Factorization with sparse factors: the item factors start as the CSR TF-IDF matrix and the user factors as
+    the CSR user profiles. A BPR update touches the stored entries of the rows involved, and the entries it moves
+    outside their pattern are kept in per-row sparse delta stores, which are merged into the CSR matrices before
+    scoring. Hence the model is trained as the dense one, and scores are sparse-dense products
+    """
+
+    def __init__(self, ratings: t.Dict, map: t.Dict, tfidf: TFIDF, random: t.Any, *args):
+        self._tfidf_obj = tfidf
+        super(SparseMF, self).__init__(ratings, map, None, None, random, *args)
+
+    def initialize(self, loc: float = 0, scale: float = 0.1):
+        self._initialize_indices()
+        self._global_bias: int = 0
+        self._user_bias = np.zeros(len(self._users))
+        self._item_bias = np.zeros(len(self._items))
+        self._item_factors = self._tfidf_obj.tfidf_matrix(self._items, self._features)
+        self._user_factors = self._tfidf_obj.profile_matrix(self._ratings, self._features)
+        # {row: (sorted features, values)} of the entries learned outside the CSR pattern
+        self._user_deltas: t.Dict = {}
+        self._item_deltas: t.Dict = {}
+        self._transactions = sum(len(v) for v in self._ratings.values())
+
+    @staticmethod
+    def _row(factors, deltas: t.Dict, index: int):
+        """
+        (sorted features, values) of a row: its CSR entries and its learned deltas
+        """
+        start, stop = factors.indptr[index], factors.indptr[index + 1]
+        features, values = factors.indices[start:stop], factors.data[start:stop]
+        if index not in deltas:
+            return features, values
+        features = np.concatenate([features, deltas[index][0]])
+        order = np.argsort(features, kind="stable")
+        return features[order], np.concatenate([values, deltas[index][1]])[order]
+
+    @staticmethod
+    def _set_row(factors, deltas: t.Dict, index: int, features: np.ndarray, values: np.ndarray):
+        """
+        Store the values of a row on a sorted support that contains its CSR pattern
+        """
+        start, stop = factors.indptr[index], factors.indptr[index + 1]
+        stored = np.zeros(len(features), dtype=bool)
+        stored[np.searchsorted(features, factors.indices[start:stop])] = True
+        factors.data[start:stop] = values[stored]
+        if not stored.all():
+            deltas[index] = (features[~stored], values[~stored])
+
+    @staticmethod
+    def _gather(features: np.ndarray, values: np.ndarray, support: np.ndarray):
+        """
+        Values of the sparse row (features, values) on the sorted support, 0 for the missing features
+        """
+        gathered = np.zeros(len(support))
+        if len(features):
+            positions = np.minimum(np.searchsorted(features, support), len(features) - 1)
+            found = features[positions] == support
+            gathered[found] = values[positions[found]]
+        return gathered
+
+    @staticmethod
+    def _merge(factors, deltas: t.Dict):
+        """
+        CSR matrix of the factors with the deltas merged in, which empties the delta store
+        """
+        if not deltas:
+            return factors
+        rows = np.repeat(np.fromiter(deltas.keys(), dtype=np.int64, count=len(deltas)),
+                         [len(f) for f, _ in deltas.values()])
+        features = np.concatenate([f for f, _ in deltas.values()])
+        values = np.concatenate([v for _, v in deltas.values()])
+        deltas.clear()
+        merged = (factors + sp.csr_matrix((values, (rows, features)), shape=factors.shape)).tocsr()
+        merged.sort_indices()
+        return merged
+
+    def _merge_deltas(self):
+        self._user_factors = self._merge(self._user_factors, self._user_deltas)
+        self._item_factors = self._merge(self._item_factors, self._item_deltas)
+
+    def predict(self, user: int, item: int):
+        u_features, u_values = self._row(self._user_factors, self._user_deltas, self._public_users[user])
+        i_features, i_values = self._row(self._item_factors, self._item_deltas, self._public_items[item])
+        return self._global_bias + self._item_bias[self._public_items[item]] \
+               + u_values @ self._gather(i_features, i_values, u_features)
+
+    def _scores(self, user: int):
+        self._merge_deltas()
+        return self._item_bias + self._item_factors @ self._user_factors[self._public_users[user]].toarray().ravel()
+
+    def update_factors(self, user: int, item_i: int, item_j: int, learning_rate: float, bias_regularization: float,
+                       user_regularization: float, positive_item_regularization: float,
+                       negative_item_regularization: float):
+        """
+        BPR update of the triple (user, item_i, item_j) on the union of the supports of the three rows
+        """
+        u, i, j = self._public_users[user], self._public_items[item_i], self._public_items[item_j]
+        u_features, u_values = self._row(self._user_factors, self._user_deltas, u)
+        i_features, i_values = self._row(self._item_factors, self._item_deltas, i)
+        j_features, j_values = self._row(self._item_factors, self._item_deltas, j)
+
+        difference = self._gather(i_features, i_values, u_features) - self._gather(j_features, j_values, u_features)
+        z = 1 / (1 + np.exp(self._item_bias[i] - self._item_bias[j] + u_values @ difference))
+
+        d_bi = (z - bias_regularization * self._item_bias[i])
+        d_bj = (-z - bias_regularization * self._item_bias[j])
+
+        # the gradients are nonzero on the union of the supports only. As in the dense update, the item factors are
+        # updated with the updated user factors
+        support = np.union1d(u_features, np.union1d(i_features, j_features))
+        u_new = self._gather(u_features, u_values, support)
+        i_new = self._gather(i_features, i_values, support)
+        j_new = self._gather(j_features, j_values, support)
+        u_new += learning_rate * ((i_new - j_new) * z - user_regularization * u_new)
+        i_new += learning_rate * (u_new * z - positive_item_regularization * i_new)
+        j_new += learning_rate * (-u_new * z - negative_item_regularization * j_new)
+
+        self._item_bias[i] += learning_rate * d_bi
+        self._item_bias[j] += learning_rate * d_bj
+        self._set_row(self._user_factors, self._user_deltas, u, support, u_new)
+        self._set_row(self._item_factors, self._item_deltas, i, support, i_new)
+        self._set_row(self._item_factors, self._item_deltas, j, support, j_new)
+
+    def get_model_state(self):
+        self._merge_deltas()
+        return super(SparseMF, self).get_model_state()
+
+    def get_user_factors(self, user: int):
+        u = self._public_users[user]
+        features, values = self._row(self._user_factors, self._user_deltas, u)
+        factors = np.zeros(self._factors)
+        factors[features] = values
+        return factors
+
+    def get_item_factors(self, item: int):
+        i = self._public_items[item]
+        features, values = self._row(self._item_factors, self._item_deltas, i)
+        factors = np.zeros(self._factors)
+        factors[features] = values
+        return factors
+
+
 class KaHFM(RecMixin, BaseRecommenderModel):
     r"""
     Knowledge-aware Hybrid Factorization Machines
@@ -171,6 +320,8 @@ class KaHFM(RecMixin, BaseRecommenderModel):
         update_users: Boolean to update user factors (default: True)
         update_items: Boolean to update item factors (default: True)
         update_bias: Boolean to update bias value (default: True)
+        sparse_factors: Boolean to store the factors as sparse TF-IDF rows plus learned sparse deltas, for large
+            knowledge graphs (default: False)
 
     To include the recommendation model, add it to the config file adopting the following pattern:
 
@@ -197,6 +348,7 @@ class KaHFM(RecMixin, BaseRecommenderModel):
           update_users: True
           update_items: True
           update_bias: True
+          sparse_factors: False
 
     """
     @init_charger
@@ -218,16 +370,21 @@ class KaHFM(RecMixin, BaseRecommenderModel):
             ("_update_users", "update_users", "update_users", True, None, None),
             ("_update_items", "update_items", "update_items", True, None, None),
             ("_update_bias", "update_bias", "update_bias", True, None, None),
+            ("_sparse_factors", "sparse_factors", "sparse", False, None, None),
         ]
         self.autoset_params()
 
         self._ratings = self._data.train_dict
 
         self._tfidf_obj = TFIDF(self._data.side_information_data.feature_map)
-        self._tfidf = self._tfidf_obj.tfidf()
-        self._user_profiles = self._tfidf_obj.get_profiles(self._ratings)
-
-        self._model = MF(self._ratings, self._data.side_information_data.feature_map, self._tfidf, self._user_profiles, self._random)
+        if self._sparse_factors:
+            self._model = SparseMF(self._ratings, self._data.side_information_data.feature_map, self._tfidf_obj,
+                                   self._random)
+        else:
+            self._tfidf = self._tfidf_obj.tfidf()
+            self._user_profiles = self._tfidf_obj.get_profiles(self._ratings)
+
+            self._model = MF(self._ratings, self._data.side_information_data.feature_map, self._tfidf, self._user_profiles, self._random)
         self._embed_k = self._model.get_factors()
         self._sampler = ps.Sampler(self._ratings, self._data.users, self._data.items)
 
@@ -289,10 +446,15 @@ class KaHFM(RecMixin, BaseRecommenderModel):
                         with open(self._saving_filepath, "wb") as f:
                             pickle.dump(self._model.get_model_state(), f)
                     if self._save_recs:
-                        store_recommendation(recs,
-                                             self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
+                        self.recommendation_writer.store(recs,
+                                                         self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
 
     def update_factors(self, u: int, i: int, j: int):
+        if self._sparse_factors:
+            return self._model.update_factors(u, i, j, self._learning_rate, self._bias_regularization,
+                                              self._user_regularization, self._positive_item_regularization,
+                                              self._negative_item_regularization)
+
         user_factors = self._model.get_user_factors(u)
         item_factors_i = self._model.get_item_factors(i)
         item_factors_j = self._model.get_item_factors(j)
@@ -332,7 +494,7 @@ class KaHFM(RecMixin, BaseRecommenderModel):
 
             print("******************************************")
             if self._save_recs:
-                store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
+                self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
             return True
 
         except Exception as ex:
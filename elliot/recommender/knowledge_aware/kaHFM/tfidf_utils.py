@@ -1,28 +1,17 @@
-import typing as t
-from collections import Counter
-import math
+import scipy.sparse as sp
+import numpy as np
 
-class TFIDF:
-    def __init__(self, map: t.Dict[int, t.List[int]]):
-        self.__map = map
-        self.__o = Counter(feature for feature_list in self.__map.values() for feature in feature_list )
-        self.__maxi = max(self.__o.values())
-        self.__total_documents = len(self.__map)
-        self.__idfo = {k: math.log(self.__total_documents/v) for k, v in self.__o.items()}
-        self.__tfidf = {}
-        for k, v in self.__map.items():
-            normalization = math.sqrt(sum([self.__idfo[i]**2 for i in v]))
-            self.__tfidf[k] ={i:self.__idfo[i]/normalization for i in v}
+from elliot.recommender.content_based.VSM.tfidf_utils import TFIDF as VSMTFIDF
 
-    def tfidf(self):
-        return self.__tfidf
 
-    def get_profiles(self, ratings: t.Dict[int, t.Dict[int, float]]):
-        profiles = {}
-        profiles = {u: {f: profiles.get(u, {}).get(f, 0) + v for i in items.keys() if i in self.__tfidf.keys() for f, v in self.__tfidf[i].items()} for u, items in ratings.items()}
-        profiles = {u: {f: v/len(ratings[u]) for f, v in f_dict.items()} for u, f_dict in profiles.items()}
-        # print(profiles[0])
-        # for u, items in ratings.items():
-        #     profiles[u] = {}
-        #     profiles[u] = {f: profiles[u].get(f, 0) for i in items.keys() for f in self.__tfidf[i]}
-        return profiles
+class TFIDF(VSMTFIDF):
+    """
+    TF-IDF of the item features, with the kaHFM user profiles
+    """
+
+    def _profiles(self, sums: sp.csr_matrix, rated: sp.csr_matrix, ratings) -> sp.csr_matrix:
+        """
+        Sum of the TF-IDF vectors of the rated items, divided by the number of rated items
+        """
+        lengths = np.fromiter((len(v) for v in ratings.values()), dtype=np.float64, count=len(ratings))
+        return sp.csr_matrix(sp.diags(1 / np.maximum(lengths, 1)) @ sums)
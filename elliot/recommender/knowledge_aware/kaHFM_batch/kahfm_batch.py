@@ -10,13 +10,12 @@ __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it, daniele.malite
 import numpy as np
 from tqdm import tqdm
 
-from elliot.dataset.samplers import custom_sampler as cs
+from elliot.dataset.samplers import custom_csr_sampler as cs
 from elliot.recommender import BaseRecommenderModel
 from elliot.recommender.base_recommender_model import init_charger
 from elliot.recommender.knowledge_aware.kaHFM_batch.kahfm_batch_model import KaHFM_model
 from elliot.recommender.knowledge_aware.kaHFM_batch.tfidf_utils import TFIDF
 from elliot.recommender.recommender_utils_mixin import RecMixin
-from elliot.utils.write import store_recommendation
 
 np.random.seed(42)
 
@@ -74,7 +73,7 @@ class KaHFMBatch(RecMixin, BaseRecommenderModel):
         self._random = np.random
 
         self._ratings = self._data.train_dict
-        self._sampler = cs.Sampler(self._data.i_train_dict)
+        self._sampler = cs.Sampler(self._data.sp_i_train, prefetch=self._prefetch_batches)
 
         self._tfidf_obj = TFIDF(self._data.side_information_data.feature_map)
         self._tfidf = self._tfidf_obj.tfidf()
@@ -150,15 +149,7 @@ class KaHFMBatch(RecMixin, BaseRecommenderModel):
                     if self._save_weights:
                         self._model.save_weights(self._saving_filepath)
                     if self._save_recs:
-                        store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
+                        self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
 
     def get_recommendations(self, k: int = 100):
-        predictions_top_k = {}
-        for index, offset in enumerate(range(0, self._num_users, self._batch_size)):
-            offset_stop = min(offset+self._batch_size, self._num_users)
-            predictions = self._model.predict_batch(offset, offset_stop)
-            v, i = self._model.get_top_k(predictions, self.get_train_mask(offset, offset_stop), k=k)
-            items_ratings_pair = [list(zip(map(self._data.private_items.get, u_list[0]), u_list[1]))
-                                  for u_list in list(zip(i.numpy(), v.numpy()))]
-            predictions_top_k.update(dict(zip(range(offset, offset_stop), items_ratings_pair)))
-        return predictions_top_k
+        return self.get_top_k_recommendations(self._model.predict_batch, k, self._batch_size)
@@ -9,22 +9,30 @@ __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 
 import pickle
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
+from scipy.special import expit
 
-from elliot.dataset.samplers import pairwise_sampler as ps
+from elliot.dataset.samplers import custom_csr_sampler as cs
 from elliot.recommender.base_recommender_model import BaseRecommenderModel
 from elliot.recommender.base_recommender_model import init_charger
 from elliot.recommender.recommender_utils_mixin import RecMixin
-from elliot.utils.write import store_recommendation
 
 np.random.seed(42)
 
 
 class MF(object):
-    def __init__(self, F, ratings, random, *args):
+    """
+    Contiguous float32 factors indexed by the public ids of the dataset.
+
+    The BPR updates of a whole mini-batch of (u, i, j) triples are computed from the current factors and then
+    scatter-added, so that repeated users and items accumulate the updates of all their triples.
+    """
+
+    def __init__(self, F, data, random, *args):
         self._factors = F
-        self._ratings = ratings
+        self._data = data
         self._random = random
         self.initialize(*args)
 
@@ -35,23 +43,20 @@ class MF(object):
         :param scale:
         :return:
         """
-        self._users = list(self._ratings.keys())
-        self._items = list({k for a in self._ratings.values() for k in a.keys()})
-        self._private_users = {p: u for p, u in enumerate(self._users)}
-        self._public_users = {v: k for k, v in self._private_users.items()}
-        self._private_items = {p: i for p, i in enumerate(self._items)}
-        self._public_items = {v: k for k, v in self._private_items.items()}
+        self._public_users = self._data.public_users
+        self._public_items = self._data.public_items
+        self._num_users, self._num_items = self._data.num_users, self._data.num_items
 
         self._global_bias = 0
 
         "same parameters as np.randn"
-        self._user_bias = np.zeros(len(self._users))
-        self._item_bias = np.zeros(len(self._items))
-        self._user_factors = \
-            self._random.normal(loc=loc, scale=scale, size=(len(self._users), self._factors))
-        self._item_factors = \
-            self._random.normal(loc=loc, scale=scale, size=(len(self._items), self._factors))
-        self._transactions = sum(len(v) for v in self._ratings.values())
+        self._user_bias = np.zeros(self._num_users, dtype=np.float32)
+        self._item_bias = np.zeros(self._num_items, dtype=np.float32)
+        self._user_factors = np.ascontiguousarray(
+            self._random.normal(loc=loc, scale=scale, size=(self._num_users, self._factors)), dtype=np.float32)
+        self._item_factors = np.ascontiguousarray(
+            self._random.normal(loc=loc, scale=scale, size=(self._num_items, self._factors)), dtype=np.float32)
+        self._transactions = self._data.transactions
 
     @property
     def name(self):
@@ -64,27 +69,29 @@ class MF(object):
         return self._global_bias + self._item_bias[self._public_items[item]] \
                + self._user_factors[self._public_users[user]] @ self._item_factors[self._public_items[item]]
 
-    def get_user_recs(self, user, k):
-        arr = self._item_bias + self._item_factors @ self._user_factors[self._public_users[user]]
-        top_k = arr.argsort()[-(len(self._ratings[user].keys()) + k):][::-1]
-        top_k_2 = [(self._private_items[i], arr[i]) for p, i in enumerate(top_k)
-                   if (self._private_items[i] not in self._ratings[user].keys())]
-        top_k_2 = top_k_2[:k]
-        return top_k_2
-
-    def get_user_recs_argpartition(self, user: int, k: int):
-        user_items = self._ratings[user].keys()
-        safety_k = len(user_items)+k
-        predictions = self._item_bias +  self._item_factors  @ self._user_factors[self._public_users[user]]
-        partially_ordered_preds_indices = np.argpartition(predictions, -safety_k)[-safety_k:]
-        partially_ordered_preds_values = predictions[partially_ordered_preds_indices]
-        partially_ordered_preds_ids = [self._private_items[x] for x in partially_ordered_preds_indices]
-
-        top_k = partially_ordered_preds_values.argsort()[::-1]
-        top_k_2 = [(partially_ordered_preds_ids[i], partially_ordered_preds_values[i]) for p, i in enumerate(top_k)
-                   if (partially_ordered_preds_ids[i] not in user_items)]
-        top_k_2 = top_k_2[:k]
-        return top_k_2
+    def predict_block(self, start, stop):
+        return self._global_bias + self._item_bias + self._user_factors[start:stop] @ self._item_factors.T
+
+    def train_batch(self, u, i, j, lr, bias_reg, user_reg, pos_reg, neg_reg,
+                    update_users=True, update_items=True, update_negative_items=True, update_bias=True):
+        """
+        One BPR-SGD step on a mini-batch
+        :param u, i, j: arrays of public user, positive item, and negative item indices
+        """
+        p_u, q_i, q_j = self._user_factors[u], self._item_factors[i], self._item_factors[j]
+        b_i, b_j = self._item_bias[i], self._item_bias[j]
+
+        z = expit(-(b_i - b_j + np.einsum("bf,bf->b", p_u, q_i - q_j)))[:, None]
+
+        if update_bias:
+            np.add.at(self._item_bias, i, lr * (z[:, 0] - bias_reg * b_i))
+            np.add.at(self._item_bias, j, lr * (-z[:, 0] - bias_reg * b_j))
+        if update_users:
+            np.add.at(self._user_factors, u, lr * ((q_i - q_j) * z - user_reg * p_u))
+        if update_items:
+            np.add.at(self._item_factors, i, lr * (p_u * z - pos_reg * q_i))
+            if update_negative_items:
+                np.add.at(self._item_factors, j, lr * (-p_u * z - neg_reg * q_j))
 
     def get_model_state(self):
         saving_dict = {}
@@ -95,10 +102,10 @@ class MF(object):
         return saving_dict
 
     def set_model_state(self, saving_dict):
-        self._user_bias = saving_dict['_user_bias']
-        self._item_bias = saving_dict['_item_bias']
-        self._user_factors = saving_dict['_user_factors']
-        self._item_factors = saving_dict['_item_factors']
+        self._user_bias = np.ascontiguousarray(saving_dict['_user_bias'], dtype=np.float32)
+        self._item_bias = np.ascontiguousarray(saving_dict['_item_bias'], dtype=np.float32)
+        self._user_factors = np.ascontiguousarray(saving_dict['_user_factors'], dtype=np.float32)
+        self._item_factors = np.ascontiguousarray(saving_dict['_item_factors'], dtype=np.float32)
 
     def get_user_bias(self, user: int):
 
@@ -150,7 +157,9 @@ class BPRMF(RecMixin, BaseRecommenderModel):
         update_users:
         update_items:
         update_bias:
-
+        batch_size: Number of triples of every mini-batch update (512 if not set)
+        threads: Number of threads updating the shared factors without locks (Hogwild)
+        random_seed: Seed of the factor initialization and of the samplers
 
     To include the recommendation model, add it to the config file adopting the following pattern:
 
@@ -171,12 +180,13 @@ class BPRMF(RecMixin, BaseRecommenderModel):
           update_users: True
           update_items: True
           update_bias: True
+          batch_size: 512
+          threads: 1
+          random_seed: 42
     """
 
     @init_charger
     def __init__(self, data, config, params, *args, **kwargs):
-        self._random = np.random
-
         self._params_list = [
             ("_factors", "factors", "factors", 10, int, None),
             ("_learning_rate", "lr", "lr", 0.05, None, None),
@@ -192,15 +202,23 @@ class BPRMF(RecMixin, BaseRecommenderModel):
             ("_update_users", "update_users", "update_users", True, None, None),
             ("_update_items", "update_items", "update_items", True, None, None),
             ("_update_bias", "update_bias", "update_bias", True, None, None),
+            ("_seed", "random_seed", "seed", 42, int, None),
         ]
         self.autoset_params()
+        self._random = np.random.RandomState(self._seed)
+
+        if self._batch_size < 1:
+            self._batch_size = 512
+        self._threads = max(1, getattr(self._params, "threads", 1))
 
         self._ratings = self._data.train_dict
-        self._model = MF(self._factors, self._ratings, self._random)
-        self._sampler = ps.Sampler(self._ratings, self._data.users, self._data.items)
+        self._model = MF(self._factors, self._data, self._random)
+        # one sampler per thread, since the random generators are not shared
+        self._samplers = [cs.Sampler(self._data.sp_i_train, seed=seed)
+                          for seed in np.random.SeedSequence(self._seed).spawn(self._threads)]
 
     def get_recommendations(self, k: int = 100):
-        return {u: self._model.get_user_recs(u, k) for u in self._ratings.keys()}
+        return self.get_top_k_recommendations(self._model.predict_block, k)
 
     def predict(self, u: int, i: int):
         """
@@ -219,19 +237,31 @@ class BPRMF(RecMixin, BaseRecommenderModel):
                + f"_{self.get_params_shortcut()}"
 
     def train_step(self):
-        start_it = time.perf_counter()
         print()
-        print("Sampling...")
-        samples = self._sampler.step(self._data.transactions)
-        start = time.perf_counter()
-        print(f"Sampled in {round(start-start_it, 2)} seconds")
-        start = time.perf_counter()
         print("Computing..")
-        for u, i, j in samples:
-            self.update_factors(u, i, j)
+        start = time.perf_counter()
+        events = self._data.transactions
+        shares = [events // self._threads + (t < events % self._threads) for t in range(self._threads)]
+        if self._threads == 1:
+            self._train_events(self._samplers[0], events)
+        else:
+            # Hogwild: the threads update the shared factors without locks
+            with ThreadPoolExecutor(max_workers=self._threads) as executor:
+                list(executor.map(self._train_events, self._samplers, shares))
         t2 = time.perf_counter()
         print(f"Computed and updated in {round(t2-start, 2)} seconds")
 
+    def _train_events(self, sampler, events: int):
+        for batch_start in range(0, events, self._batch_size):
+            u, i, j = sampler.sample(min(self._batch_size, events - batch_start))
+            self._update_batch(u, i, j)
+
+    def _update_batch(self, u, i, j):
+        self._model.train_batch(u, i, j, self._learning_rate, self._bias_regularization, self._user_regularization,
+                                self._positive_item_regularization, self._negative_item_regularization,
+                                self._update_users, self._update_items, self._update_negative_item_factors,
+                                self._update_bias)
+
     def train(self):
         if self._restore:
             return self.restore_weights()
@@ -256,35 +286,7 @@ class BPRMF(RecMixin, BaseRecommenderModel):
                         with open(self._saving_filepath, "wb") as f:
                             pickle.dump(self._model.get_model_state(), f)
                     if self._save_recs:
-                        store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
-
-    def update_factors(self, u: int, i: int, j: int):
-        user_factors = self._model.get_user_factors(u)
-        item_factors_i = self._model.get_item_factors(i)
-        item_factors_j = self._model.get_item_factors(j)
-        item_bias_i = self._model.get_item_bias(i)
-        item_bias_j = self._model.get_item_bias(j)
-
-        z = 1/(1 + np.exp(self.predict(u, i)-self.predict(u, j)))
-        # update bias i
-        d_bi = (z - self._bias_regularization*item_bias_i)
-        self._model.set_item_bias(i, item_bias_i + (self._learning_rate * d_bi))
-
-        # update bias j
-        d_bj = (-z - self._bias_regularization*item_bias_j)
-        self._model.set_item_bias(j, item_bias_j + (self._learning_rate * d_bj))
-
-        # update user factors
-        d_u = ((item_factors_i - item_factors_j)*z - self._user_regularization*user_factors)
-        self._model.set_user_factors(u, user_factors + (self._learning_rate * d_u))
-
-        # update item i factors
-        d_i = (user_factors*z - self._positive_item_regularization*item_factors_i)
-        self._model.set_item_factors(i, item_factors_i + (self._learning_rate * d_i))
-
-        # update item j factors
-        d_j = (-user_factors*z - self._negative_item_regularization*item_factors_j)
-        self._model.set_item_factors(j, item_factors_j + (self._learning_rate * d_j))
+                        self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
 
     def restore_weights(self):
         try:
@@ -298,7 +300,7 @@ class BPRMF(RecMixin, BaseRecommenderModel):
 
             print("******************************************")
             if self._save_recs:
-                store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
+                self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
             return True
 
         except Exception as ex:
@@ -18,7 +18,6 @@ from elliot.dataset.samplers import pointwise_pos_neg_ratings_sampler as pws
 from elliot.recommender.base_recommender_model import BaseRecommenderModel
 from elliot.recommender.latent_factor_models.FM.factorization_machine_model import FactorizationMachineModel
 from elliot.recommender.recommender_utils_mixin import RecMixin
-from elliot.utils.write import store_recommendation
 from elliot.recommender.base_recommender_model import init_charger
 np.random.seed(42)
 
@@ -109,21 +108,15 @@ class FM(RecMixin, BaseRecommenderModel):
                     if self._save_weights:
                         self._model.save_weights(self._saving_filepath)
                     if self._save_recs:
-                        store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
+                        self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
 
     def get_recommendations(self, k: int = 100):
-        predictions_top_k = {}
-        for index, offset in enumerate(range(0, self._num_users, self._batch_size)):
-            offset_stop = min(offset + self._batch_size, self._num_users)
-            predictions = self._model.get_recs(
-                (np.repeat(np.array(list(range(offset, offset_stop)))[:, None], repeats=self._num_items, axis=1),
-                 np.array([self._i_items_set for _ in range(offset, offset_stop)])))
-            v, i = self._model.get_top_k(predictions, self.get_train_mask(offset, offset_stop), k=k)
-            items_ratings_pair = [list(zip(map(self._data.private_items.get, u_list[0]), u_list[1]))
-                                  for u_list in list(zip(i.numpy(), v.numpy()))]
-            predictions_top_k.update(dict(zip(map(self._data.private_users.get,
-                                                  range(offset, offset_stop)), items_ratings_pair)))
-        return predictions_top_k
+        return self.get_top_k_recommendations(self.predict_block, k)
+
+    def predict_block(self, start: int, stop: int):
+        return self._model.get_recs(
+            (np.repeat(np.array(list(range(start, stop)))[:, None], repeats=self._num_items, axis=1),
+             np.array([self._i_items_set for _ in range(start, stop)])))
 
     def restore_weights(self):
         try:
@@ -137,7 +130,7 @@ class FM(RecMixin, BaseRecommenderModel):
 
             print("******************************************")
             if self._save_recs:
-                store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
+                self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
             return True
 
         except Exception as ex:
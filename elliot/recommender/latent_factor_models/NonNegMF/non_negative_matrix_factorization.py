@@ -12,7 +12,6 @@ import pickle
 
 from elliot.recommender.latent_factor_models.NonNegMF.non_negative_matrix_factorization_model import NonNegMFModel
 from elliot.recommender.recommender_utils_mixin import RecMixin
-from elliot.utils.write import store_recommendation
 
 from elliot.recommender.base_recommender_model import BaseRecommenderModel
 from elliot.recommender.base_recommender_model import init_charger
@@ -75,7 +74,7 @@ class NonNegMF(RecMixin, BaseRecommenderModel):
                + f"_{self.get_params_shortcut()}"
 
     def get_recommendations(self, k: int = 100):
-        return {u: self._model.get_user_recs(u, k) for u in self._ratings.keys()}
+        return self.get_top_k_recommendations(self._model.predict_block, k)
 
     def predict(self, u: int, i: int):
         """
@@ -110,7 +109,7 @@ class NonNegMF(RecMixin, BaseRecommenderModel):
                         with open(self._saving_filepath, "wb") as f:
                             pickle.dump(self._model.get_model_state(), f)
                     if self._save_recs:
-                        store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
+                        self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
 
     def restore_weights(self):
         try:
@@ -124,7 +123,7 @@ class NonNegMF(RecMixin, BaseRecommenderModel):
 
             print("******************************************")
             if self._save_recs:
-                store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
+                self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
             return True
 
         except Exception as ex:
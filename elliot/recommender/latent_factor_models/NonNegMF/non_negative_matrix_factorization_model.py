@@ -85,17 +85,9 @@ class NonNegMFModel(object):
         return self._user_embeddings[self._data.public_users[user], :].dot(
             self._item_embeddings[self._data.public_items[item], :]) + self._item_bias[self._data.public_items[item]] + self._user_bias[self._data.public_users[user]] + self._global_mean
 
-    def get_user_recs(self, user, k=100):
-        user_items = self._data.train_dict[user].keys()
-        predictions = {i: self.predict(user, i) for i in self._data.items if i not in user_items}
-        indices, values = zip(*predictions.items())
-        indices = np.array(indices)
-        values = np.array(values)
-        partially_ordered_preds_indices = np.argpartition(values, -k)[-k:]
-        real_values = values[partially_ordered_preds_indices]
-        real_indices = indices[partially_ordered_preds_indices]
-        local_top_k = real_values.argsort()[::-1]
-        return [(real_indices[item], real_values[item]) for item in local_top_k]
+    def predict_block(self, start, stop):
+        return self._user_embeddings[start:stop] @ self._item_embeddings.T + self._item_bias \
+               + self._user_bias[start:stop, None] + self._global_mean
 
     def get_model_state(self):
         saving_dict = {}
@@ -11,7 +11,6 @@ import numpy as np
 import pickle
 
 from elliot.recommender.recommender_utils_mixin import RecMixin
-from elliot.utils.write import store_recommendation
 
 from elliot.recommender.latent_factor_models.PureSVD.pure_svd_model import PureSVDModel
 from elliot.recommender.base_recommender_model import BaseRecommenderModel
@@ -58,7 +57,7 @@ class PureSVD(RecMixin, BaseRecommenderModel):
         self._model = PureSVDModel(self._factors, self._data, self._seed)
 
     def get_recommendations(self, k: int = 100):
-        return {u: self._model.get_user_recs(u, k) for u in self._ratings.keys()}
+        return self.get_top_k_recommendations(self._model.predict_block, k)
 
     def predict(self, u: int, i: int):
         """
@@ -93,7 +92,7 @@ class PureSVD(RecMixin, BaseRecommenderModel):
             with open(self._saving_filepath, "wb") as f:
                 pickle.dump(self._model.get_model_state(), f)
         if self._save_recs:
-            store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
+            self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
 
     def restore_weights(self):
         try:
@@ -107,7 +106,7 @@ class PureSVD(RecMixin, BaseRecommenderModel):
 
             print("******************************************")
             if self._save_recs:
-                store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
+                self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
             return True
 
         except Exception as ex:
@@ -34,23 +34,13 @@ class PureSVDModel(object):
         s_Vt = sp.diags(sigma) * Vt
 
         self.user_vec = U
-        self.item_vec = s_Vt.T
+        self.item_vec = np.asarray(s_Vt).T
 
     def predict(self, user, item):
         return self.user_vec[self._data.public_users[user], :].dot(self.item_vec[self._data.public_items[item], :])
 
-    def get_user_recs(self, user, k=100):
-        user_items = self._data.train_dict[user].keys()
-        k = min(k, self._data.num_items - len(user_items))
-        predictions = {i: self.predict(user, i) for i in self._data.items if i not in user_items}
-        indices, values = zip(*predictions.items())
-        indices = np.array(indices)
-        values = np.array(values)
-        partially_ordered_preds_indices = np.argpartition(values, -k)[-k:]
-        real_values = values[partially_ordered_preds_indices]
-        real_indices = indices[partially_ordered_preds_indices]
-        local_top_k = real_values.argsort()[::-1]
-        return [(real_indices[item], real_values[item]) for item in local_top_k]
+    def predict_block(self, start, stop):
+        return self.user_vec[start:stop] @ self.item_vec.T
 
     def get_model_state(self):
         saving_dict = {}
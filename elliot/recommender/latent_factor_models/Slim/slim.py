@@ -16,7 +16,6 @@ from elliot.recommender.base_recommender_model import BaseRecommenderModel
 from elliot.recommender.base_recommender_model import init_charger
 from elliot.recommender.latent_factor_models.Slim.slim_model import SlimModel
 from elliot.recommender.recommender_utils_mixin import RecMixin
-from elliot.utils.write import store_recommendation
 
 np.random.seed(42)
 
@@ -30,6 +29,8 @@ class Slim(RecMixin, BaseRecommenderModel):
     Args:
         l1_ratio:
         alpha:
+        neighborhood: Number of coefficients kept for every item
+        workers: Number of processes fitting the items
 
     To include the recommendation model, add it to the config file adopting the following pattern:
 
@@ -42,6 +43,8 @@ class Slim(RecMixin, BaseRecommenderModel):
           epochs: 10
           l1_ratio: 0.001
           alpha: 0.001
+          neighborhood: 100
+          workers: 1
     """
 
     @init_charger
@@ -50,15 +53,16 @@ class Slim(RecMixin, BaseRecommenderModel):
         self._params_list = [
             ("_l1_ratio", "l1_ratio", "l1", 0.001, None, None),
             ("_alpha", "alpha", "alpha", 0.001, None, None),
+            ("_neighborhood", "neighborhood", "nn", 100, int, None),
         ]
 
         self.autoset_params()
+        self._workers = getattr(self._params, "workers", 1)
 
-        self._ratings = self._data.train_dict
         self._sp_i_train = self._data.sp_i_train
-        self._i_items_set = list(range(self._num_items))
 
-        self._model = SlimModel(self._data, self._num_users, self._num_items, self._l1_ratio, self._alpha, self._epochs)
+        self._model = SlimModel(self._data, self._num_users, self._num_items, self._l1_ratio, self._alpha, self._epochs,
+                                self._neighborhood, self._workers)
 
     @property
     def name(self):
@@ -67,7 +71,7 @@ class Slim(RecMixin, BaseRecommenderModel):
                + f"_{self.get_params_shortcut()}"
 
     def get_recommendations(self, k: int = 100):
-        return {u: self._model.get_user_recs(u, k) for u in self._ratings.keys()}
+        return self.get_top_k_recommendations(self._model.predict_block, k)
 
     def predict(self, u: int, i: int):
         """
@@ -93,7 +97,7 @@ class Slim(RecMixin, BaseRecommenderModel):
             with open(self._saving_filepath, "wb") as f:
                 pickle.dump(self._model.get_model_state(), f)
         if self._save_recs:
-            store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
+            self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
 
     def restore_weights(self):
         try:
@@ -107,7 +111,7 @@ class Slim(RecMixin, BaseRecommenderModel):
 
             print("******************************************")
             if self._save_recs:
-                store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
+                self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
             return True
 
         except Exception as ex:
@@ -1,22 +1,44 @@
 """
 Module description:
+SLIM ElasticNet trainer.
 
+Every item column is fitted by an independent ElasticNet, hence disjoint ranges of items are fitted in worker processes
+forked from the main one. Workers share the CSC training matrix read-only (copy-on-write) and only copy its data array,
+in which the column being fitted is zeroed. Each worker returns the top-neighborhood coefficients of its items as
+(row, column, value) triplets, which are merged in the sparse item-item matrix W. Scores are computed on demand as
+user_rows @ W, so no dense (users x items) matrix is ever stored.
 """
 
 __version__ = '0.1'
 __author__ = 'Felice Antonio Merra, Vito Walter Anelli, Claudio Pomo'
 __email__ = 'felice.merra@poliba.it, vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 
+import concurrent.futures as c
+import multiprocessing as mp
+import sys
 import time
+
 import numpy as np
-import sys
 import scipy.sparse as sp
 from sklearn.linear_model import ElasticNet
 
+from elliot.utils.threads import can_fork_workers, limit_threads
+
+# (model, CSC training matrix) inherited by the forked workers
+_fit_context = None
+
+# number of items fitted by a task
+_ITEMS_PER_TASK = 256
+
+
+def _fit_range(bounds):
+    model, train = _fit_context
+    return model._fit_items(train, *bounds)
+
 
 class SlimModel(object):
     def __init__(self,
-                 data, num_users, num_items, l1_ratio, alpha, epochs):
+                 data, num_users, num_items, l1_ratio, alpha, epochs, neighborhood=100, workers=1):
 
         self._data = data
         self._num_users = num_users
@@ -24,111 +46,107 @@ class SlimModel(object):
         self._l1_ratio = l1_ratio
         self._alpha = alpha
         self._epochs = epochs
+        self._neighborhood = neighborhood
+        self._workers = max(1, workers)
 
-        self.md = ElasticNet(alpha=self._alpha,
-                             l1_ratio=self._l1_ratio,
-                             positive=True,
-                             fit_intercept=False,
-                             copy_X=False,
-                             precompute=True,
-                             selection='random',
-                             max_iter=self._epochs,
-                             random_state=42,
-                             tol=1e-3)
-
+        self._train = self._data.sp_i_train_ratings.tocsr()
         self._w_sparse = None
         self._A_tilde = None
 
-    def train(self, verbose):
-        train = self._data.sp_i_train_ratings
-
-        dataBlock = 10000000
+    def _elastic_net(self):
+        return ElasticNet(alpha=self._alpha,
+                          l1_ratio=self._l1_ratio,
+                          positive=True,
+                          fit_intercept=False,
+                          copy_X=False,
+                          precompute=True,
+                          selection='random',
+                          max_iter=self._epochs,
+                          random_state=42,
+                          tol=1e-3)
+
+    def _fit_items(self, train, start, stop):
+        """
+        Fit the items [start, stop)
+        :param train: (users x items) CSC training matrix, never modified
+        :return: (rows, cols, values) of the top-neighborhood positive coefficients of every item
+        """
+        md = self._elastic_net()
+        # the column being fitted is zeroed in a private copy of the data, indices and indptr are shared
+        X = sp.csc_matrix((train.data.copy(), train.indices, train.indptr), shape=train.shape, copy=False)
+        rows, cols, values = [], [], []
+        for item in range(start, stop):
+            start_pos, end_pos = train.indptr[item], train.indptr[item + 1]
+            y = train[:, item].toarray().ravel()
+
+            X.data[start_pos:end_pos] = 0.0
+            md.fit(X, y)
+            X.data[start_pos:end_pos] = train.data[start_pos:end_pos]
+
+            coef_index, coef_value = md.sparse_coef_.indices, md.sparse_coef_.data
+            if len(coef_value) > self._neighborhood:
+                top = np.argpartition(-coef_value, self._neighborhood - 1)[:self._neighborhood]
+                coef_index, coef_value = coef_index[top], coef_value[top]
+            rows.append(coef_index)
+            cols.append(np.full(len(coef_index), item))
+            values.append(coef_value)
+        return np.concatenate(rows), np.concatenate(cols), np.concatenate(values)
 
-        rows = np.empty(dataBlock, dtype=np.int32)
-        cols = np.empty(dataBlock, dtype=np.int32)
-        values = np.empty(dataBlock, dtype=np.float32)
-
-        numCells = 0
+    def train(self, verbose):
+        global _fit_context
+        train = sp.csc_matrix(self._train, dtype=np.float64)
+        tasks = [(start, min(start + _ITEMS_PER_TASK, self._num_items))
+                 for start in range(0, self._num_items, _ITEMS_PER_TASK)]
 
         start_time = time.time()
-        start_time_printBatch = start_time
-
-        for currentItem in range(self._num_items):
-            y = train[:, currentItem].toarray()
-
-            # set the j-th column of X to zero
-            start_pos = train.indptr[currentItem]
-            end_pos = train.indptr[currentItem + 1]
-
-            current_item_data_backup = train.data[start_pos: end_pos].copy()
-            train.data[start_pos: end_pos] = 0.0
-
-            # fit one ElasticNet model per column
-            self.md.fit(train, y)
-
-            nonzero_model_coef_index = self.md.sparse_coef_.indices
-            nonzero_model_coef_value = self.md.sparse_coef_.data
-
-            local_topK = min(len(nonzero_model_coef_value) - 1, 100)
-
-            relevant_items_partition = (-nonzero_model_coef_value).argpartition(local_topK)[0:local_topK]
-            relevant_items_partition_sorting = np.argsort(-nonzero_model_coef_value[relevant_items_partition])
-            ranking = relevant_items_partition[relevant_items_partition_sorting]
-
-            for index in range(len(ranking)):
-                if numCells == len(rows):
-                    rows = np.concatenate((rows, np.zeros(dataBlock, dtype=np.int32)))
-                    cols = np.concatenate((cols, np.zeros(dataBlock, dtype=np.int32)))
-                    values = np.concatenate((values, np.zeros(dataBlock, dtype=np.float32)))
-
-                rows[numCells] = nonzero_model_coef_index[ranking[index]]
-                cols[numCells] = currentItem
-                values[numCells] = nonzero_model_coef_value[ranking[index]]
-
-                numCells += 1
-
-            train.data[start_pos:end_pos] = current_item_data_backup
-
-            if verbose and (time.time() - start_time_printBatch > 300 or (
-                    currentItem + 1) % 1000 == 0 or currentItem == self._num_items - 1):
-                print('{}: Processed {} ( {:.2f}% ) in {:.2f} minutes. Items per second: {:.0f}'.format(
-                    'SLIMElasticNetRecommender',
-                    currentItem + 1,
-                    100.0 * float(currentItem + 1) / self._num_items,
-                    (time.time() - start_time) / 60,
-                    float(currentItem) / (time.time() - start_time)))
-
-                sys.stdout.flush()
-                sys.stderr.flush()
-
-                start_time_printBatch = time.time()
+        n_workers = min(self._workers, len(tasks))
+        # inside a worker (e.g., a parallel hyperparameter trial) the items are fitted sequentially
+        if n_workers > 1 and can_fork_workers():
+            _fit_context = (self, train)
+            executor = c.ProcessPoolExecutor(max_workers=n_workers, mp_context=mp.get_context("fork"),
+                                             initializer=limit_threads, initargs=(1,))
+            results = executor.map(_fit_range, tasks)
+        else:
+            executor = None
+            results = (self._fit_items(train, *bounds) for bounds in tasks)
+
+        triplets = []
+        try:
+            for (_, stop), result in zip(tasks, results):
+                triplets.append(result)
+                if verbose:
+                    print('{}: Processed {} ( {:.2f}% ) in {:.2f} minutes. Items per second: {:.0f}'.format(
+                        'SLIMElasticNetRecommender',
+                        stop,
+                        100.0 * float(stop) / self._num_items,
+                        (time.time() - start_time) / 60,
+                        float(stop) / (time.time() - start_time)))
+                    sys.stdout.flush()
+        finally:
+            if executor is not None:
+                executor.shutdown()
+                _fit_context = None
 
         # generate the sparse weight matrix
-        self._w_sparse = sp.csr_matrix((values[:numCells], (rows[:numCells], cols[:numCells])),
-                                      shape=(self._num_items, self._num_items), dtype=np.float32)
+        rows, cols, values = (np.concatenate([t[p] for t in triplets]) for p in range(3))
+        self._w_sparse = sp.csr_matrix((values.astype(np.float32), (rows, cols)),
+                                       shape=(self._num_items, self._num_items))
 
-        train = train.tocsr()
-        self._A_tilde = train.dot(self._w_sparse).A
+    def predict_block(self, start, stop):
+        if self._w_sparse is None:
+            # state saved by the former dense implementation
+            return self._A_tilde[start:stop]
+        return (self._train[start:stop] @ self._w_sparse).toarray()
 
     def predict(self, u, i):
-        return self._A_tilde[u, i]
-
-    def get_user_recs(self, user, k=100):
-        user_items = self._data.train_dict[user].keys()
-        predictions = {i: self.predict(user, i) for i in self._data.items if i not in user_items}
-        indices, values = zip(*predictions.items())
-        indices = np.array(indices)
-        values = np.array(values)
-        partially_ordered_preds_indices = np.argpartition(values, -k)[-k:]
-        real_values = values[partially_ordered_preds_indices]
-        real_indices = indices[partially_ordered_preds_indices]
-        local_top_k = real_values.argsort()[::-1]
-        return [(real_indices[item], real_values[item]) for item in local_top_k]
+        u, i = self._data.public_users[u], self._data.public_items[i]
+        return self.predict_block(u, u + 1)[0, i]
 
     def get_model_state(self):
         saving_dict = {}
-        saving_dict['_A_tilde'] = self._A_tilde
+        saving_dict['_w_sparse'] = self._w_sparse
         return saving_dict
 
     def set_model_state(self, saving_dict):
-        self._A_tilde = saving_dict['_A_tilde']
+        self._w_sparse = saving_dict.get('_w_sparse')
+        self._A_tilde = saving_dict.get('_A_tilde')
@@ -11,7 +11,6 @@ import numpy as np
 import pickle
 
 from elliot.recommender.recommender_utils_mixin import RecMixin
-from elliot.utils.write import store_recommendation
 from elliot.recommender.latent_factor_models.WRMF.wrmf_model import WRMFModel
 from elliot.recommender.base_recommender_model import BaseRecommenderModel
 from elliot.recommender.base_recommender_model import init_charger
@@ -28,8 +27,10 @@ class WRMF(RecMixin, BaseRecommenderModel):
     Args:
         factors: Number of latent factors
         lr: Learning rate
-        alpha:
+        alpha: Confidence weight of the observed interactions
         reg: Regularization coefficient
+        cg_steps: Conjugate gradient steps per row (0 solves every row exactly)
+        threads: Number of threads updating the factors
 
     To include the recommendation model, add it to the config file adopting the following pattern:
 
@@ -43,6 +44,8 @@ class WRMF(RecMixin, BaseRecommenderModel):
           factors: 50
           alpha: 1
           reg: 0.1
+          cg_steps: 0
+          threads: 1
     """
 
     @init_charger
@@ -52,17 +55,19 @@ class WRMF(RecMixin, BaseRecommenderModel):
         self._params_list = [
             ("_factors", "factors", "factors", 10, None, None),
             ("_alpha", "alpha", "alpha", 1, None, None),
-            ("_reg", "reg", "reg", 0.1, None, None)
+            ("_reg", "reg", "reg", 0.1, None, None),
+            ("_cg_steps", "cg_steps", "cg", 0, None, None)
         ]
         self.autoset_params()
+        self._threads = getattr(self._params, "threads", 1)
 
-        self._ratings = self._data.train_dict
         self._sp_i_train = self._data.sp_i_train
 
-        self._model = WRMFModel(self._factors, self._data, self._random, self._alpha, self._reg)
+        self._model = WRMFModel(self._factors, self._data, self._random, self._alpha, self._reg,
+                                self._cg_steps, self._threads)
 
     def get_recommendations(self, k: int = 100):
-        return {u: self._model.get_user_recs(u, k) for u in self._ratings.keys()}
+        return self.get_top_k_recommendations(self._model.predict_block, k)
 
     def predict(self, u: int, i: int):
         """
@@ -103,7 +108,7 @@ class WRMF(RecMixin, BaseRecommenderModel):
                         with open(self._saving_filepath, "wb") as f:
                             pickle.dump(self._model.get_model_state(), f)
                     if self._save_recs:
-                        store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
+                        self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
 
     def restore_weights(self):
         try:
@@ -117,7 +122,7 @@ class WRMF(RecMixin, BaseRecommenderModel):
 
             print("******************************************")
             if self._save_recs:
-                store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
+                self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
             return True
 
         except Exception as ex:
@@ -7,81 +7,98 @@ __version__ = '0.1'
 __author__ = 'Vito Walter Anelli, Claudio Pomo'
 __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 from scipy import sparse as sp
-from scipy.sparse.linalg import spsolve
 
 
 class WRMFModel(object):
     """
-    Simple Matrix Factorization class
+    Implicit Alternating Least Squares with dense factors.
+
+    Each row solves (YᵀY + Yᵀ(Cu − I)Y + λI) x_u = YᵀCu p_u, where YᵀY is shared by all the rows and Yᵀ(Cu − I)Y
+    only involves the items of the row. The system is solved either exactly or with a few conjugate gradient steps
+    warm-started from the current factors, and the rows are split in chunks processed by a thread pool.
     """
 
-    def __init__(self, factors, data, random, alpha, reg):
+    def __init__(self, factors, data, random, alpha, reg, cg_steps=0, threads=1):
 
         self._data = data
         self.random = random
-        self.C = alpha * self._data.sp_i_train
-        self.train_dict = self._data.train_dict
+        self.C = (alpha * self._data.sp_i_train).tocsr()
+        self.C_t = self.C.T.tocsr()
         self.user_num, self.item_num = self._data.num_users, self._data.num_items
 
-        self.X = sp.csr_matrix(self.random.normal(scale=0.01,
-                                                  size=(self.user_num, factors)))
-        self.Y = sp.csr_matrix(self.random.normal(scale=0.01,
-                                                  size=(self.item_num, factors)))
-        self.X_eye = sp.eye(self.user_num)
-        self.Y_eye = sp.eye(self.item_num)
-        self.lambda_eye = reg * sp.eye(factors)
-
-        self.user_vec, self.item_vec, self.pred_mat = None, None, None
+        self.X = self.random.normal(scale=0.01, size=(self.user_num, factors))
+        self.Y = self.random.normal(scale=0.01, size=(self.item_num, factors))
+        self.lambda_eye = reg * np.eye(factors)
+        self.cg_steps = cg_steps
+        self.threads = max(1, threads)
 
     def train_step(self):
-        yTy = self.Y.T.dot(self.Y)
-        xTx = self.X.T.dot(self.X)
-        for u in range(self.user_num):
-            Cu = self.C[u, :].toarray()
-            Pu = Cu.copy()
-            Pu[Pu != 0] = 1
-            CuI = sp.diags(Cu, [0])
-            yTCuIY = self.Y.T.dot(CuI).dot(self.Y)
-            yTCuPu = self.Y.T.dot(CuI + self.Y_eye).dot(Pu.T)
-            self.X[u] = spsolve(yTy + yTCuIY + self.lambda_eye, yTCuPu)
-        for i in range(self.item_num):
-            Ci = self.C[:, i].T.toarray()
-            Pi = Ci.copy()
-            Pi[Pi != 0] = 1
-            CiI = sp.diags(Ci, [0])
-            xTCiIX = self.X.T.dot(CiI).dot(self.X)
-            xTCiPi = self.X.T.dot(CiI + self.X_eye).dot(Pi.T)
-            self.Y[i] = spsolve(xTx + xTCiIX + self.lambda_eye, xTCiPi)
-
-        self.pred_mat = self.X.dot(self.Y.T).A
+        self._update(self.X, self.Y, self.C)
+        self._update(self.Y, self.X, self.C_t)
+
+    def _update(self, target, source, confidence):
+        gram = source.T @ source + self.lambda_eye
+        n_rows = target.shape[0]
+        chunk = max(1, -(-n_rows // (self.threads * 8)))
+        chunks = [(start, min(start + chunk, n_rows)) for start in range(0, n_rows, chunk)]
+        if self.threads == 1:
+            for start, stop in chunks:
+                self._solve_rows(target, source, confidence, gram, start, stop)
+        else:
+            # numpy releases the GIL inside BLAS/LAPACK, hence the chunks run in parallel
+            with ThreadPoolExecutor(max_workers=self.threads) as executor:
+                list(executor.map(lambda b: self._solve_rows(target, source, confidence, gram, *b), chunks))
+
+    def _solve_rows(self, target, source, confidence, gram, start, stop):
+        indptr, indices, data = confidence.indptr, confidence.indices, confidence.data
+        for row in range(start, stop):
+            cols = indices[indptr[row]:indptr[row + 1]]
+            c = data[indptr[row]:indptr[row + 1]]
+            source_row = source[cols]
+            if self.cg_steps:
+                target[row] = self._conjugate_gradient(target[row], source_row, c, gram)
+            else:
+                a = gram + (source_row.T * c) @ source_row
+                b = source_row.T @ (1 + c)
+                target[row] = np.linalg.solve(a, b)
+
+    def _conjugate_gradient(self, x, source_row, c, gram):
+        x = x.copy()
+        # residual of the system, computed without forming Yᵀ(Cu − I)Y
+        r = source_row.T @ (1 + c - c * (source_row @ x)) - gram @ x
+        p = r.copy()
+        rs_old = r @ r
+        for _ in range(self.cg_steps):
+            if rs_old < 1e-20:
+                break
+            ap = gram @ p + source_row.T @ (c * (source_row @ p))
+            step = rs_old / (p @ ap)
+            x += step * p
+            r -= step * ap
+            rs_new = r @ r
+            p = r + (rs_new / rs_old) * p
+            rs_old = rs_new
+        return x
+
+    def predict_block(self, start, stop):
+        return self.X[start:stop] @ self.Y.T
 
     def predict(self, user, item):
-        return self.pred_mat[self._data.public_users[user], self._data.public_items[item]]
-
-    def get_user_recs(self, user, k=100):
-        user_items = self._data.train_dict[user].keys()
-        predictions = {i: self.predict(user, i) for i in self._data.items if i not in user_items}
-        indices, values = zip(*predictions.items())
-        indices = np.array(indices)
-        values = np.array(values)
-        partially_ordered_preds_indices = np.argpartition(values, -k)[-k:]
-        real_values = values[partially_ordered_preds_indices]
-        real_indices = indices[partially_ordered_preds_indices]
-        local_top_k = real_values.argsort()[::-1]
-        return [(real_indices[item], real_values[item]) for item in local_top_k]
+        return self.X[self._data.public_users[user]] @ self.Y[self._data.public_items[item]]
 
     def get_model_state(self):
         saving_dict = {}
-        saving_dict['pred_mat'] = self.pred_mat
         saving_dict['X'] = self.X
         saving_dict['Y'] = self.Y
         saving_dict['C'] = self.C
         return saving_dict
 
     def set_model_state(self, saving_dict):
-        self.pred_mat = saving_dict['pred_mat']
-        self.X = saving_dict['X']
-        self.Y = saving_dict['Y']
+        self.X = saving_dict['X'].toarray() if sp.issparse(saving_dict['X']) else saving_dict['X']
+        self.Y = saving_dict['Y'].toarray() if sp.issparse(saving_dict['Y']) else saving_dict['Y']
         self.C = saving_dict['C']
+        self.C_t = self.C.T.tocsr()
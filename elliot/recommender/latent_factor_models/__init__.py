@@ -7,19 +7,26 @@ __version__ = '0.1'
 __author__ = 'Vito Walter Anelli, Claudio Pomo'
 __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 
-from .BPRMF_batch import BPRMF_batch
-from .BPRMF import BPRMF
-from .WRMF import WRMF
-from .PureSVD import PureSVD
-from .MF import MF
-from .FunkSVD import FunkSVD
-from .PMF import PMF
-from .LogisticMF import LMF
-from .NonNegMF import NonNegMF
-from .FM import FM
-from .FFM import FFM
-from .BPRSlim import BPRSlim
-from .Slim import Slim
-from .CML import CML
-from .FISM import FISM
-from .SVDpp import SVDpp
\ No newline at end of file
+from elliot.utils.lazy_import import lazy_attributes
+
+# models are imported on first access
+_models = {
+    "BPRMF_batch": ".BPRMF_batch",
+    "BPRMF": ".BPRMF",
+    "WRMF": ".WRMF",
+    "PureSVD": ".PureSVD",
+    "MF": ".MF",
+    "FunkSVD": ".FunkSVD",
+    "PMF": ".PMF",
+    "LMF": ".LogisticMF",
+    "NonNegMF": ".NonNegMF",
+    "FM": ".FM",
+    "FFM": ".FFM",
+    "BPRSlim": ".BPRSlim",
+    "Slim": ".Slim",
+    "CML": ".CML",
+    "FISM": ".FISM",
+    "SVDpp": ".SVDpp"
+}
+
+__getattr__, __dir__ = lazy_attributes(__name__, _models)
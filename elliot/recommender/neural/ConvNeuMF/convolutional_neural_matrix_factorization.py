@@ -13,13 +13,12 @@ from ast import literal_eval as make_tuple
 import numpy as np
 from tqdm import tqdm
 
-from elliot.dataset.samplers import custom_sampler as cs
+from elliot.dataset.samplers import custom_csr_sampler as cs
 from elliot.recommender.base_recommender_model import BaseRecommenderModel
 from elliot.recommender.base_recommender_model import init_charger
 from elliot.recommender.neural.ConvNeuMF.convolutional_neural_matrix_factorization_model import \
     ConvNeuralMatrixFactorizationModel
 from elliot.recommender.recommender_utils_mixin import RecMixin
-from elliot.utils.write import store_recommendation
 
 np.random.seed(42)
 
@@ -62,7 +61,7 @@ class ConvNeuMF(RecMixin, BaseRecommenderModel):
     def __init__(self, data, config, params, *args, **kwargs):
         self._random = np.random
 
-        self._sampler = cs.Sampler(self._data.i_train_dict)
+        self._sampler = cs.Sampler(self._data.sp_i_train, prefetch=self._prefetch_batches)
 
         self._params_list = [
             ("_lr", "lr", "lr", 0.001, None, None),
@@ -128,28 +127,21 @@ class ConvNeuMF(RecMixin, BaseRecommenderModel):
                     if self._save_weights:
                         self._model.save_weights(self._saving_filepath)
                     if self._save_recs:
-                        store_recommendation(recs,
-                                             self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
+                        self.recommendation_writer.store(recs,
+                                                         self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
 
     def get_recommendations(self, k: int = 100):
-        predictions_top_k = {}
-
-        for index, offset in enumerate(range(0, self._num_users, 1)):
-            # print(f'****{index}/{self._num_users}')
-            offset_stop = min(offset + self._batch_size, 1)
-            predictions = self._model.get_recs(
-                (
-                    np.repeat(np.array(list(range(offset, offset_stop)))[:, None], repeats=self._num_items,
-                              axis=1),
-                    np.array([self._i_items_set for _ in range(offset, offset_stop)])
-                )
+        # the convolutional interaction map is built one user at a time
+        return self.get_top_k_recommendations(self.predict_block, k, 1)
+
+    def predict_block(self, start: int, stop: int):
+        return self._model.get_recs(
+            (
+                np.repeat(np.array(list(range(start, stop)))[:, None], repeats=self._num_items,
+                          axis=1),
+                np.array([self._i_items_set for _ in range(start, stop)])
             )
-            v, i = self._model.get_top_k(predictions, self.get_train_mask(offset, offset_stop), k=k)
-            items_ratings_pair = [list(zip(map(self._data.private_items.get, u_list[0]), u_list[1]))
-                                  for u_list in list(zip(i.numpy(), v.numpy()))]
-            predictions_top_k.update(dict(zip(map(self._data.private_users.get,
-                                                  range(offset, offset_stop)), items_ratings_pair)))
-        return predictions_top_k
+        )
 
     def restore_weights(self):
         try:
@@ -163,7 +155,7 @@ class ConvNeuMF(RecMixin, BaseRecommenderModel):
 
             print("******************************************")
             if self._save_recs:
-                store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
+                self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
             return True
 
         except Exception as ex:
@@ -17,7 +17,6 @@ from elliot.recommender import BaseRecommenderModel
 from elliot.recommender.base_recommender_model import init_charger
 from elliot.recommender.neural.NAIS.nais_model import NAIS_model
 from elliot.recommender.recommender_utils_mixin import RecMixin
-from elliot.utils.write import store_recommendation
 
 np.random.seed(42)
 
@@ -135,19 +134,10 @@ class NAIS(RecMixin, BaseRecommenderModel):
                     if self._save_weights:
                         self._model.save_weights(self._saving_filepath)
                     if self._save_recs:
-                        store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
+                        self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
 
     def get_recommendations(self, k: int = 100, auc_compute: bool = False):
-        predictions_top_k = {}
-        for index, offset in enumerate(range(0, self._num_users, self._batch_size)):
-            offset_stop = min(offset + self._batch_size, self._num_users)
-            predictions = self._model.batch_predict(offset, offset_stop)
-            mask = self.get_train_mask(offset, offset_stop)
-            v, i = self._model.get_top_k(predictions, mask, k=k)
-            items_ratings_pair = [list(zip(map(self._data.private_items.get, u_list[0]), u_list[1]))
-                                  for u_list in list(zip(i.numpy(), v.numpy()))]
-            predictions_top_k.update(dict(zip(range(offset, offset_stop), items_ratings_pair)))
-        return predictions_top_k
+        return self.get_top_k_recommendations(self._model.batch_predict, k, self._batch_size)
 
     # def restore_weights(self):
     #     try:
@@ -161,7 +151,7 @@ class NAIS(RecMixin, BaseRecommenderModel):
     #
     #         print("******************************************")
     #         if self._save_recs:
-    #             store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
+    #             self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
     #         return True
     #
     #     except Exception as ex:
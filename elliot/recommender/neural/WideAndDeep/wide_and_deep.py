@@ -20,7 +20,6 @@ from elliot.recommender.base_recommender_model import BaseRecommenderModel
 from elliot.recommender.base_recommender_model import init_charger
 from elliot.recommender.neural.WideAndDeep.wide_and_deep_model import WideAndDeepModel
 from elliot.recommender.recommender_utils_mixin import RecMixin
-from elliot.utils.write import store_recommendation
 
 np.random.seed(42)
 
@@ -85,8 +84,10 @@ class WideAndDeep(RecMixin, BaseRecommenderModel):
         self._random = np.random
 
         self._data.sp_i_features, self._data.user_encoder, self._data.item_encoder = build_sparse_features(self._data)
+        # the wide input is fed as sparse rows, built from the wide columns of every item
+        self._data.sp_i_wide = pwwds.wide_item_rows(self._num_users, self._num_items, self._data.sp_i_features)
 
-        self._sampler = pwwds.Sampler(self._data)
+        self._sampler = pwwds.Sampler(self._data, sparse=True)
 
         self._params_list = [
             ("_lr", "lr", "lr", 0.001, None, None),
@@ -147,15 +148,9 @@ class WideAndDeep(RecMixin, BaseRecommenderModel):
                     if self._save_weights:
                         self._model.save_weights(self._saving_filepath)
                     if self._save_recs:
-                        store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
+                        self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
 
     def get_recommendations(self, k: int = 100):
-        predictions_top_k = {}
-        for index, offset in enumerate(range(0, self._num_users, 1)):
-            offset_stop = min(offset + 1, self._num_users)
-            predictions = self._model.predict(offset)
-            v, i = self._model.get_top_k(predictions, self.get_train_mask(offset, offset_stop), k=k)
-            items_ratings_pair = [list(zip(map(self._data.private_items.get, u_list[0]), u_list[1]))
-                                  for u_list in list(zip(i.numpy(), v.numpy()))]
-            predictions_top_k.update(dict(zip(range(offset, offset_stop), items_ratings_pair)))
-        return predictions_top_k
\ No newline at end of file
+        # the model scores one user at a time
+        return self.get_top_k_recommendations(
+            lambda start, stop: np.reshape(self._model.predict(start), (1, -1)), k, 1)
\ No newline at end of file
@@ -10,6 +10,7 @@ __email__ = 'felice.merra@poliba.it, vitowalter.anelli@poliba.it, claudio.pomo@p
 import os
 
 import numpy as np
+import scipy.sparse as sp
 import tensorflow as tf
 from tensorflow import keras
 
@@ -63,6 +64,10 @@ class WideAndDeepModel(tf.keras.Model):
                                          kernel_initializer=self.initializer, kernel_regularizer=self.regularizer,
                                          bias_regularizer=self.bias_regularizer))
 
+        # kernels are created upfront, since sparse inputs are multiplied by them directly
+        self.wide.build((None, self._len_sparse_dimension))
+        self.deep.build((None, self._len_sparse_dimension))
+
         self.predict_layer = keras.layers.Dense(1, use_bias=True, activation='sigmoid',
                                                 kernel_regularizer=self.regularizer,
                                                 bias_regularizer=self.bias_regularizer)
@@ -75,11 +80,18 @@ class WideAndDeepModel(tf.keras.Model):
     def call(self, inputs, training=False, **kwargs):
         _, _, s = inputs
 
-        # Wide
-        wide_part = self.wide(s)
+        if isinstance(s, tf.SparseTensor):
+            # the layers reading the wide input only gather the kernel rows of its active columns
+            wide_part = self._sparse_dense(self.wide, s)
+            deep_part = self._sparse_dense(self.deep.layers[0], s)
+            for layer in self.deep.layers[1:]:
+                deep_part = layer(deep_part)
+        else:
+            # Wide
+            wide_part = self.wide(s)
 
-        # Deep
-        deep_part = self.deep(s)
+            # Deep
+            deep_part = self.deep(s)
 
         concat = tf.concat([wide_part, deep_part], axis=1)
 
@@ -90,6 +102,8 @@ class WideAndDeepModel(tf.keras.Model):
     # @tf.function
     def train_step(self, batch):
         u, i, s, label = batch
+        if sp.issparse(s):
+            s = self._to_sparse_tensor(s)
         with tf.GradientTape() as tape:
             # # Clean Inference
             predict = self(inputs=(u, i, s), training=True)
@@ -101,8 +115,28 @@ class WideAndDeepModel(tf.keras.Model):
 
         return loss
 
+    @staticmethod
+    def _to_sparse_tensor(matrix):
+        matrix = sp.coo_matrix(matrix)
+        return tf.SparseTensor(np.stack([matrix.row, matrix.col], axis=1).astype(np.int64),
+                               matrix.data.astype(np.float32), matrix.shape)
+
+    @staticmethod
+    def _sparse_dense(layer, s):
+        outputs = tf.sparse.sparse_dense_matmul(s, layer.kernel)
+        if layer.use_bias:
+            outputs = tf.nn.bias_add(outputs, layer.bias)
+        return layer.activation(outputs)
+
     # @tf.function
     def predict(self, user, **kwargs):
+        if getattr(self._data, "sp_i_wide", None) is not None:
+            # wide input of every item for the given user, without any dense (items x wide size) matrix
+            users = sp.csr_matrix((np.ones(self._num_items, dtype=np.float32),
+                                   np.full(self._num_items, user), np.arange(self._num_items + 1)),
+                                  shape=self._data.sp_i_wide.shape)
+            return self(inputs=(None, None, self._to_sparse_tensor(users + self._data.sp_i_wide)))
+
         u_enc = self._data.user_encoder.transform([[user]])
 
         if self._all_item_enc is None:
@@ -1,12 +1,19 @@
-from .NeuMF import NeuMF
-from .NFM import NFM
-from .DeepFM import DeepFM
-from .DMF import DMF
-from .GeneralizedMF import GMF
-from .NAIS import NAIS
-from .UserAutoRec import UserAutoRec
-from .ItemAutoRec import ItemAutoRec
-from .ConvNeuMF import ConvNeuMF
-from .WideAndDeep import WideAndDeep
-from .ConvMF import ConvMF
-from .NPR import NPR
+from elliot.utils.lazy_import import lazy_attributes
+
+# models are imported on first access
+_models = {
+    "NeuMF": ".NeuMF",
+    "NFM": ".NFM",
+    "DeepFM": ".DeepFM",
+    "DMF": ".DMF",
+    "GMF": ".GeneralizedMF",
+    "NAIS": ".NAIS",
+    "UserAutoRec": ".UserAutoRec",
+    "ItemAutoRec": ".ItemAutoRec",
+    "ConvNeuMF": ".ConvNeuMF",
+    "WideAndDeep": ".WideAndDeep",
+    "ConvMF": ".ConvMF",
+    "NPR": ".NPR"
+}
+
+__getattr__, __dir__ = lazy_attributes(__name__, _models)
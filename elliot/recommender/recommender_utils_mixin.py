@@ -1,7 +1,7 @@
 import numpy as np
 from tqdm import tqdm
 
-from elliot.utils.write import store_recommendation
+from elliot.recommender.top_k import TopKRecommendations, blocked_sparse_top_k, blocked_top_k
 
 
 class RecMixin(object):
@@ -35,19 +35,46 @@ class RecMixin(object):
                     if self._save_weights:
                         self._model.save_weights(self._saving_filepath)
                     if self._save_recs:
-                        store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
+                        self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
 
     def get_recommendations(self, k: int = 100):
-        predictions_top_k = {}
-        for index, offset in enumerate(range(0, self._num_users, self._batch_size)):
-            offset_stop = min(offset + self._batch_size, self._num_users)
-            predictions = self._model.predict(self._data.sp_i_train[offset:offset_stop].toarray())
-            v, i = self._model.get_top_k(predictions, self.get_train_mask(offset, offset_stop), k=k)
-            items_ratings_pair = [list(zip(map(self._data.private_items.get, u_list[0]), u_list[1]))
-                                  for u_list in list(zip(i.numpy(), v.numpy()))]
-            predictions_top_k.update(dict(zip(map(self._data.private_users.get,
-                                                  range(offset, offset_stop)), items_ratings_pair)))
-        return predictions_top_k
+        return self.get_top_k_recommendations(
+            lambda start, stop: self._model.predict(self._data.sp_i_train[start:stop].toarray()), k)
+
+    def get_top_k_recommendations(self, predict_block, k: int = 100, block_size: int = None):
+        """
+        Top-k lists of all the users, computed by the shared blocked engine (see elliot.recommender.top_k)
+        :param predict_block: function returning the dense scores of the users [start, stop)
+        :param k: length of the lists
+        :param block_size: number of users scored at a time (the batch size by default, if any)
+        """
+        rank_items = self.evaluator.get_ranked_items()
+        if rank_items is not None:
+            # the full-catalog ranks replace the full length lists
+            k = min(k, self.evaluator.get_needed_ranked_recommendations())
+        user_idx, item_idx, scores, ranks = blocked_top_k(predict_block, self._data.sp_i_train, k,
+                                                          block_size or self._batch_size, rank_items)
+        return TopKRecommendations(user_idx, item_idx, scores, self._data.private_users, self._data.private_items,
+                                   ranks, self._data.public_items)
+
+    def get_sparse_top_k_recommendations(self, predict_block_sparse, k: int = 100, block_size: int = None,
+                                         predict_block=None):
+        """
+        Top-k lists of all the users, selected among the stored entries of sparse score blocks
+        :param predict_block_sparse: function returning the sparse scores of the users [start, stop)
+        :param k: length of the lists
+        :param block_size: number of users scored at a time (the batch size by default, if any)
+        :param predict_block: function returning the dense scores, used when the full-catalog ranks are needed
+            (the densified sparse scores by default)
+        """
+        if self.evaluator.get_ranked_items() is not None:
+            # the full-catalog ranks need the dense blocks
+            if predict_block is None:
+                predict_block = lambda start, stop: predict_block_sparse(start, stop).toarray()
+            return self.get_top_k_recommendations(predict_block, k, block_size)
+        user_idx, item_idx, scores = blocked_sparse_top_k(predict_block_sparse, self._data.sp_i_train, k,
+                                                          block_size or self._batch_size)
+        return TopKRecommendations(user_idx, item_idx, scores, self._data.private_users, self._data.private_items)
 
     def restore_weights(self):
         try:
@@ -60,7 +87,7 @@ class RecMixin(object):
 
             print("******************************************")
             if self._save_recs:
-                store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
+                self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
             return True
 
         except Exception as ex:
@@ -69,7 +96,7 @@ class RecMixin(object):
         return False
 
     def get_train_mask(self, start, stop):
-        return np.where((self._data.sp_i_train[range(start, stop)].toarray() == 0), True, False)
+        return self._data.sp_i_train[start:stop].toarray() == 0
 
     def get_loss(self):
         return -max([r[self._validation_k]["val_results"][self._validation_metric] for r in self._results])
@@ -0,0 +1,260 @@
+"""
+Module description:
+Shared blocked top-k engine used to generate the recommendation lists.
+
+Scores are produced one block of users at a time, the items seen in training are masked in place through the CSR
+indices of the block, and the k best items are selected with argpartition. Recommendations are kept as compact
+(user_idx, item_idx[k], score[k]) arrays and converted to public ids only when they are read, so that peak memory
+is bounded by the block size rather than by users x items.
+
+Models whose scores are sparse (e.g., the Aiolli-Ferrari kNN) can provide CSR score blocks instead: the top-k items
+are then selected among the stored entries only, so the items without any score are neither materialized nor
+recommended.
+
+When the evaluator asks for rank-based metrics (e.g., AUC), the full-catalog rank of every test positive is computed
+on the same score blocks, hence the lists can stay at top_k length.
+"""
+
+__version__ = '0.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
+import typing as t
+from collections.abc import Mapping
+
+import numpy as np
+import scipy.sparse as sp
+
+# number of scores computed at a time when the block size is not given
+_BLOCK_ELEMENTS = 2 ** 24
+
+
+def mask_seen(scores: np.ndarray, train_block, value=-np.inf) -> np.ndarray:
+    """
+    Overwrite in place the scores of the training items of a block of users
+    :param scores: (block_users x items) dense score matrix
+    :param train_block: (block_users x items) CSR slice of the training matrix
+    :param value: value assigned to the seen items
+    """
+    lengths = np.diff(train_block.indptr)
+    scores[np.repeat(np.arange(len(lengths)), lengths), train_block.indices] = value
+    return scores
+
+
+def block_top_k(scores: np.ndarray, k: int) -> t.Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k items of every row, sorted by decreasing score
+    :return: (item indices, scores), both (block_users x min(k, items)) arrays
+    """
+    k = min(k, scores.shape[1])
+    if k < scores.shape[1]:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(k), scores.shape)
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_scores, order, axis=1)
+
+
+def block_ranks(scores: np.ndarray, rank_block) -> np.ndarray:
+    """
+    Full-catalog rank of the given items, i.e., the number of items scored strictly higher
+    :param scores: (block_users x items) masked score matrix
+    :param rank_block: (block_users x items) CSR matrix whose pattern marks the items to rank
+    :return: ranks aligned with rank_block.indices, -1 for the masked items
+    """
+    n_rows, n_items = scores.shape
+    rows = np.repeat(np.arange(n_rows), np.diff(rank_block.indptr))
+    item_scores = scores[rows, rank_block.indices]
+    sorted_scores = np.sort(scores, axis=1)
+
+    # binary search of all the item scores at once, each in the sorted row of its user:
+    # low ends at the number of items scored lower than or equal to the item
+    low = np.zeros(len(rows), dtype=np.int64)
+    high = np.full(len(rows), n_items, dtype=np.int64)
+    for _ in range(n_items.bit_length()):
+        middle = (low + high) // 2
+        active = low < high
+        right = active & (sorted_scores[rows, np.minimum(middle, n_items - 1)] <= item_scores)
+        left = active & ~right
+        low[right] = middle[right] + 1
+        high[left] = middle[left]
+
+    ranks = n_items - low
+    ranks[np.isneginf(item_scores)] = -1
+    return ranks
+
+
+def sparse_block_top_k(scores, train_block, k: int) -> t.Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k items of every row of a sparse score block, among its stored entries
+    :param scores: (block_users x items) CSR score matrix
+    :param train_block: (block_users x items) CSR slice of the training matrix, whose items are discarded
+    :return: (item indices, scores), both (block_users x min(k, items)) arrays, padded with -inf scores
+    """
+    n_rows, n_items = scores.shape
+    k = min(k, n_items)
+    rows = np.repeat(np.arange(n_rows, dtype=np.int64), np.diff(scores.indptr))
+    cols, values = scores.indices.astype(np.int64), scores.data
+
+    # the training items are found through the sorted linearized (row, item) keys
+    train_keys = np.sort(np.repeat(np.arange(n_rows, dtype=np.int64), np.diff(train_block.indptr)) * n_items
+                         + train_block.indices)
+    keys = rows * n_items + cols
+    if len(train_keys):
+        positions = np.minimum(np.searchsorted(train_keys, keys), len(train_keys) - 1)
+        unseen = train_keys[positions] != keys
+        rows, cols, values = rows[unseen], cols[unseen], values[unseen]
+
+    # by row, then by decreasing score
+    order = np.lexsort((-values, rows))
+    rows, cols, values = rows[order], cols[order], values[order]
+    ranks = np.arange(len(rows)) - np.searchsorted(rows, rows)
+    kept = ranks < k
+
+    items = np.zeros((n_rows, k), dtype=np.int64)
+    top = np.full((n_rows, k), -np.inf)
+    items[rows[kept], ranks[kept]] = cols[kept]
+    top[rows[kept], ranks[kept]] = values[kept]
+    return items, top
+
+
+def _as_writable_array(scores) -> np.ndarray:
+    scores = scores.numpy() if hasattr(scores, "numpy") else np.asarray(scores)
+    if not scores.flags.writeable:
+        scores = scores.copy()
+    return scores
+
+
+def blocked_top_k(predict_block: t.Callable[[int, int], t.Any], sp_i_train, k: int, block_size: int,
+                  rank_items=None) -> t.Tuple[np.ndarray, np.ndarray, np.ndarray, t.Optional[sp.csr_matrix]]:
+    """
+    Generate the top-k lists block by block
+    :param predict_block: function returning the dense (stop - start x items) scores of the users [start, stop)
+    :param sp_i_train: (users x items) CSR training matrix, used to mask the seen items
+    :param k: length of the lists
+    :param block_size: number of users scored at a time (by default, the block holds about 2^24 scores)
+    :param rank_items: optional (users x items) CSR matrix of the items whose full-catalog rank is needed
+    :return: (user_idx, item_idx, score, ranks) with item_idx and score of shape (users x min(k, items)).
+        Users with less than k unseen items are padded with -inf scores. ranks is None when rank_items is not given,
+        otherwise a CSR matrix with the pattern of rank_items, whose values are the ranks (see block_ranks)
+    """
+    n_users = sp_i_train.shape[0]
+    users = np.arange(n_users)
+    block_size = int(block_size) if block_size and block_size > 0 else max(1, _BLOCK_ELEMENTS // sp_i_train.shape[1])
+    if rank_items is not None:
+        rank_items = sp.csr_matrix(rank_items)
+        rank_items.sort_indices()
+    items_blocks, scores_blocks, ranks_blocks = [], [], []
+    for start in range(0, n_users, block_size):
+        stop = min(start + block_size, n_users)
+        scores = mask_seen(_as_writable_array(predict_block(start, stop)), sp_i_train[start:stop])
+        if rank_items is not None:
+            ranks_blocks.append(block_ranks(scores, rank_items[start:stop]))
+        items, values = block_top_k(scores, k)
+        items_blocks.append(items)
+        scores_blocks.append(values)
+
+    ranks = None
+    if rank_items is not None:
+        # explicit zeros are kept, since rank 0 is a valid rank
+        ranks = sp.csr_matrix((np.concatenate(ranks_blocks + [np.empty(0, dtype=np.int64)]), rank_items.indices,
+                               rank_items.indptr), shape=rank_items.shape)
+    if not items_blocks:
+        width = min(k, sp_i_train.shape[1])
+        return users, np.empty((0, width), dtype=np.int64), np.empty((0, width)), ranks
+    return users, np.concatenate(items_blocks), np.concatenate(scores_blocks), ranks
+
+
+def blocked_sparse_top_k(predict_block_sparse: t.Callable[[int, int], t.Any], sp_i_train, k: int,
+                         block_size: int) -> t.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Generate the top-k lists block by block from sparse scores (see sparse_block_top_k)
+    :param predict_block_sparse: function returning the sparse (stop - start x items) scores of the users [start, stop)
+    :param sp_i_train: (users x items) CSR training matrix, used to discard the seen items
+    :param k: length of the lists
+    :param block_size: number of users scored at a time (by default, the dense block would hold about 2^24 scores)
+    :return: (user_idx, item_idx, score) as in blocked_top_k
+    """
+    n_users = sp_i_train.shape[0]
+    block_size = int(block_size) if block_size and block_size > 0 else max(1, _BLOCK_ELEMENTS // sp_i_train.shape[1])
+    items_blocks, scores_blocks = [], []
+    for start in range(0, n_users, block_size):
+        stop = min(start + block_size, n_users)
+        items, values = sparse_block_top_k(sp.csr_matrix(predict_block_sparse(start, stop)), sp_i_train[start:stop], k)
+        items_blocks.append(items)
+        scores_blocks.append(values)
+
+    if not items_blocks:
+        width = min(k, sp_i_train.shape[1])
+        return np.arange(n_users), np.empty((0, width), dtype=np.int64), np.empty((0, width))
+    return np.arange(n_users), np.concatenate(items_blocks), np.concatenate(scores_blocks)
+
+
+def _take(private_ids, codes: np.ndarray) -> np.ndarray:
+    if hasattr(private_ids, "take"):
+        return private_ids.take(codes)
+    return np.asarray([private_ids[c] for c in codes.tolist()])
+
+
+class TopKRecommendations(Mapping):
+    """
+    Read-only {public user: [(public item, score), ...]} view of compact top-k arrays.
+    Padding entries (-inf scores) are dropped, and each list is built only when it is accessed.
+    The optional full-catalog ranks of the test positives are available through get_ranks
+    """
+
+    def __init__(self, user_idx: np.ndarray, item_idx: np.ndarray, scores: np.ndarray, private_users, private_items,
+                 ranks: t.Optional[sp.csr_matrix] = None, public_items=None):
+        self.user_idx = user_idx
+        self.item_idx = item_idx
+        self.scores = scores
+        self.ranks = ranks
+        self._private_users = private_users
+        self._private_items = private_items
+        self._public_items = public_items
+        self._rows = None
+
+    @property
+    def rows(self) -> t.Dict[t.Any, int]:
+        if self._rows is None:
+            self._rows = {self._private_users[u]: row for row, u in enumerate(self.user_idx.tolist())}
+        return self._rows
+
+    def __getitem__(self, user):
+        row = self.rows[user]
+        items, scores = self.item_idx[row], self.scores[row]
+        valid = scores > -np.inf
+        return list(zip(map(self._private_items.get, items[valid].tolist()), scores[valid].tolist()))
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.user_idx)
+
+    def __contains__(self, user):
+        return user in self.rows
+
+    def to_arrays(self) -> t.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Flat (public user, public item, score) arrays of all the lists, in list order and without the padding entries
+        """
+        valid = self.scores > -np.inf
+        rows = np.repeat(np.arange(len(self.user_idx)), valid.sum(axis=1))
+        return (_take(self._private_users, self.user_idx[rows]), _take(self._private_items, self.item_idx[valid]),
+                self.scores[valid])
+
+    def get_ranks(self, user, items) -> np.ndarray:
+        """
+        Full-catalog ranks (0 is the first position) of the given public items among the items unseen in training.
+        Items that have not been ranked (e.g., unknown or training items) are skipped
+        """
+        row = self.user_idx[self.rows[user]]
+        start, stop = self.ranks.indptr[row], self.ranks.indptr[row + 1]
+        columns = self.ranks.indices[start:stop]
+        codes = np.asarray([self._public_items[i] for i in items if i in self._public_items], dtype=np.int64)
+        positions = np.minimum(np.searchsorted(columns, codes), max(len(columns) - 1, 0))
+        found = columns[positions] == codes if len(columns) else np.zeros(len(codes), dtype=bool)
+        user_ranks = self.ranks.data[start:stop][positions[found]]
+        return user_ranks[user_ranks >= 0]
@@ -1,2 +1,9 @@
-from .random_recommender import Random
-from .most_popular import MostPop
\ No newline at end of file
+from elliot.utils.lazy_import import lazy_attributes
+
+# models are imported on first access
+_models = {
+    "Random": ".random_recommender",
+    "MostPop": ".most_popular"
+}
+
+__getattr__, __dir__ = lazy_attributes(__name__, _models)
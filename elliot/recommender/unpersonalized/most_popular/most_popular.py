@@ -11,7 +11,6 @@ import numpy as np
 from elliot.evaluation.evaluator import Evaluator
 from elliot.recommender.base_recommender_model import BaseRecommenderModel
 from elliot.recommender.recommender_utils_mixin import RecMixin
-from elliot.utils.write import store_recommendation
 from elliot.recommender.base_recommender_model import init_charger
 
 np.random.seed(0)
@@ -43,7 +42,7 @@ class MostPop(RecMixin, BaseRecommenderModel):
         self._results.append(result_dict)
 
         if self._save_recs:
-            store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
+            self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
 
     def get_recommendations(self, top_k):
         n_items = self._num_items
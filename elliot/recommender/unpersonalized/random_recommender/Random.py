@@ -8,7 +8,6 @@ import numpy as np
 
 from elliot.recommender.base_recommender_model import BaseRecommenderModel
 from elliot.recommender.recommender_utils_mixin import RecMixin
-from elliot.utils.write import store_recommendation
 from elliot.recommender.base_recommender_model import init_charger
 
 
@@ -41,7 +40,7 @@ class Random(RecMixin, BaseRecommenderModel):
         self._results.append(result_dict)
 
         if self._save_recs:
-            store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
+            self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
 
     def get_recommendations(self, top_k):
         r_int = np.random.randint
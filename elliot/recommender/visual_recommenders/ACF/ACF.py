@@ -18,7 +18,6 @@ import elliot.dataset.samplers.custom_sparse_sampler as css
 from elliot.recommender import BaseRecommenderModel
 from elliot.recommender.recommender_utils_mixin import RecMixin
 from elliot.recommender.visual_recommenders.ACF.ACF_model import ACF_model
-from elliot.utils.write import store_recommendation
 
 np.random.seed(0)
 tf.random.set_seed(0)
@@ -133,5 +132,5 @@ class ACF(RecMixin, BaseRecommenderModel):
                     if self._save_weights:
                         self._model.save_weights(self._saving_filepath)
                     if self._save_recs:
-                        store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
+                        self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
 
@@ -19,7 +19,6 @@ from elliot.recommender import BaseRecommenderModel
 from elliot.recommender.base_recommender_model import init_charger
 from elliot.recommender.recommender_utils_mixin import RecMixin
 from elliot.recommender.visual_recommenders.DVBPR.DVBPR_model import DVBPR_model
-from elliot.utils.write import store_recommendation
 
 np.random.seed(0)
 tf.random.set_seed(0)
@@ -135,14 +134,12 @@ class DVBPR(RecMixin, BaseRecommenderModel):
                             if self._save_weights:
                                 self._model.save_weights(self._saving_filepath)
                             if self._save_recs:
-                                store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
+                                self.recommendation_writer.store(recs, self._config.path_output_rec_result + f"{self.name}-it:{it + 1}.tsv")
                     it += 1
                     steps = 0
                     loss = 0
 
     def get_recommendations(self, k: int = 100):
-        predictions_top_k = {}
-
         # first, calculate all image features according to current model weights
         steps = 0
         visual_features = np.empty((self._num_items, self._factors))
@@ -152,12 +149,6 @@ class DVBPR(RecMixin, BaseRecommenderModel):
             visual_features[steps:steps + output.shape[0]] = output
             steps += output.shape[0]
 
-        for index, offset in enumerate(range(0, self._num_users, self._params.batch_size)):
-            offset_stop = min(offset + self._params.batch_size, self._num_users)
-            predictions = self._model.predict_batch(offset, offset_stop, tf.Variable(visual_features, dtype=tf.float32))
-            mask = self.get_train_mask(offset, offset_stop)
-            v, i = self._model.get_top_k(predictions, mask, k=k)
-            items_ratings_pair = [list(zip(map(self._data.private_items.get, u_list[0]), u_list[1]))
-                                  for u_list in list(zip(i.numpy(), v.numpy()))]
-            predictions_top_k.update(dict(zip(range(offset, offset_stop), items_ratings_pair)))
-        return predictions_top_k
+        visual_features = tf.Variable(visual_features, dtype=tf.float32)
+        return self.get_top_k_recommendations(
+            lambda start, stop: self._model.predict_batch(start, stop, visual_features), k, self._params.batch_size)
@@ -7,8 +7,15 @@ __version__ = '0.1'
 __author__ = 'Vito Walter Anelli, Claudio Pomo'
 __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 
-from .VBPR import VBPR
-from .DeepStyle import DeepStyle
-from .ACF import ACF
-from .DVBPR import DVBPR
-from .VNPR import VNPR
+from elliot.utils.lazy_import import lazy_attributes
+
+# models are imported on first access
+_models = {
+    "VBPR": ".VBPR",
+    "DeepStyle": ".DeepStyle",
+    "ACF": ".ACF",
+    "DVBPR": ".DVBPR",
+    "VNPR": ".VNPR"
+}
+
+__getattr__, __dir__ = lazy_attributes(__name__, _models)
@@ -56,13 +56,23 @@ def run_experiment(config_path: str = './config/config.yml'):
             if isinstance(model_base, tuple):
                 logger.info(f"Tuning begun for {model_class.__name__}\n")
                 trials = Trials()
-                best = fmin(model_placeholder.objective,
-                            space=model_base[1],
-                            algo=model_base[3],
-                            trials=trials,
-                            verbose=False,
-                            rstate=_rstate,
-                            max_evals=model_base[2])
+                hyper_workers = getattr(model_base[0].meta, "hyper_workers", 1)
+                if hyper_workers > 1:
+                    best = ho.parallel_fmin(model_placeholder.objective,
+                                            space=model_base[1],
+                                            algo=model_base[3],
+                                            max_evals=model_base[2],
+                                            trials=trials,
+                                            rstate=_rstate,
+                                            n_workers=hyper_workers)
+                else:
+                    best = fmin(model_placeholder.objective,
+                                space=model_base[1],
+                                algo=model_base[3],
+                                trials=trials,
+                                verbose=False,
+                                rstate=_rstate,
+                                max_evals=model_base[2])
 
                 # argmin relativo alla combinazione migliore di iperparametri
                 min_val = np.argmin([i["result"]["loss"] for i in trials._trials])
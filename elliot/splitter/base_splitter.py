@@ -1,12 +1,12 @@
 import typing as t
 import pandas as pd
 import numpy as np
-import math
 import shutil
 import os
 
 from types import SimpleNamespace
 
+from elliot.splitter.splitting_engine import SplittingEngine
 from elliot.utils.folder import create_folder_by_index
 
 """        
@@ -30,6 +30,7 @@ data_config:
 splitting:
     save_on_disk: True
     save_path: "path"
+    random_seed: 42
     test_splitting:
         strategy: fixed_timestamp|temporal_hold_out|random_subsampling|random_cross_validation
         timestamp: best|1609786061
@@ -66,6 +67,8 @@ class Splitter:
         self.splitting_ns = splitting_ns
         self.save_on_disk = False
         self.save_folder = None
+        # random subsampling draws a permutation of every user profile from this generator
+        self.random = np.random.default_rng(getattr(splitting_ns, "random_seed", 42))
 
     def process_splitting(self):
         data = self.data
@@ -197,118 +200,51 @@ class Splitter:
     def generic_split_function(self, data: pd.DataFrame, **kwargs) -> t.List[t.Tuple[pd.DataFrame, pd.DataFrame]]:
         pass
 
-    def fold_list_generator(self, length, folds=5):
-        def infinite_looper(folds=5):
-            while True:
-                for f in range(folds):
-                    yield f
-
-        looper = infinite_looper(folds)
-        return [next(looper) for _ in range(length)]
-
     def splitting_kfolds(self, data: pd.DataFrame, folds=5):
         tuple_list = []
-        user_groups = data.groupby(['userId'])
-        for name, group in user_groups:
-            data.loc[group.index, 'fold'] = self.fold_list_generator(len(group), folds)
-        data["fold"] = pd.to_numeric(data["fold"], downcast='integer')
+        engine = SplittingEngine(data)
+        # the rows of every user are assigned to the folds in turn
+        fold = engine.ranks() % folds
         for i in range(folds):
-            test = data[data["fold"] == i].drop(columns=["fold"]).reset_index(drop=True)
-            train = data[data["fold"] != i].drop(columns=["fold"]).reset_index(drop=True)
-            tuple_list.append((train, test))
+            tuple_list.append(engine.split(fold == i))
         return tuple_list
 
     def splitting_temporal_holdout(self, d: pd.DataFrame, ratio=0.2):
         tuple_list = []
-        data = d.copy()
-        user_size = data.groupby(['userId'], as_index=True).size()
-        user_threshold = user_size.apply(lambda x: math.floor(x * (1 - ratio)))
-        data['rank_first'] = data.groupby(['userId'])['timestamp'].rank(method='first', ascending=True, axis=1)
-        data["test_flag"] = data.apply(
-            lambda x: x["rank_first"] > user_threshold.loc[x["userId"]], axis=1)
-        test = data[data["test_flag"] == True].drop(columns=["rank_first", "test_flag"]).reset_index(drop=True)
-        train = data[data["test_flag"] == False].drop(columns=["rank_first", "test_flag"]).reset_index(drop=True)
-        tuple_list.append((train, test))
+        engine = SplittingEngine(d)
+        user_threshold = np.floor(engine.sizes() * (1 - ratio))
+        tuple_list.append(engine.split(engine.temporal_ranks(ascending=True) + 1 > user_threshold))
         return tuple_list
 
     def splitting_temporal_leavenout(self, d: pd.DataFrame, n=1):
         tuple_list = []
-        data = d.copy()
-        data['rank_first'] = data.groupby(['userId'])['timestamp'].rank(method='first', ascending=False, axis=1)
-        data["test_flag"] = data.apply(
-            lambda x: x["rank_first"] <= n, axis=1)
-        test = data[data["test_flag"] == True].drop(columns=["rank_first", "test_flag"]).reset_index(drop=True)
-        train = data[data["test_flag"] == False].drop(columns=["rank_first", "test_flag"]).reset_index(drop=True)
-        tuple_list.append((train, test))
+        engine = SplittingEngine(d)
+        tuple_list.append(engine.split(engine.temporal_ranks(ascending=False) + 1 <= n))
         return tuple_list
 
     def splitting_passed_timestamp(self, d: pd.DataFrame, timestamp=1):
         tuple_list = []
-        data = d.copy()
-        data["test_flag"] = data.apply(lambda x: x["timestamp"] >= timestamp, axis=1)
-        test = data[data["test_flag"] == True].drop(columns=["test_flag"]).reset_index(drop=True)
-        train = data[data["test_flag"] == False].drop(columns=["test_flag"]).reset_index(drop=True)
-        tuple_list.append((train, test))
+        test_flag = (d["timestamp"] >= timestamp).to_numpy()
+        tuple_list.append((d[~test_flag].reset_index(drop=True), d[test_flag].reset_index(drop=True)))
         return tuple_list
 
-    def subsampling_list_generator(self, length, ratio=0.2):
-        train = int(math.floor(length * (1 - ratio)))
-        test = length - train
-        list_ = [0] * train + [1] * test
-        np.random.shuffle(list_)
-        return list_
-
     def splitting_randomsubsampling_kfolds(self, d: pd.DataFrame, folds=5, ratio=0.2):
         tuple_list = []
-        data = d.copy()
-        user_groups = data.groupby(['userId'])
+        engine = SplittingEngine(d)
+        sizes = engine.sizes()
+        n_test = sizes - np.floor(sizes * (1 - ratio))
         for i in range(folds):
-            for name, group in user_groups:
-                data.loc[group.index, 'test_flag'] = self.subsampling_list_generator(len(group), ratio)
-            data["test_flag"] = pd.to_numeric(data["test_flag"], downcast='integer')
-            test = data[data["test_flag"] == 1].drop(columns=["test_flag"]).reset_index(drop=True)
-            train = data[data["test_flag"] == 0].drop(columns=["test_flag"]).reset_index(drop=True)
-            tuple_list.append((train, test))
+            tuple_list.append(engine.split(engine.random_ranks(self.random) < n_test))
         return tuple_list
 
-    def subsampling_leavenout_list_generator(self, length, n=1):
-        test = n
-        train = length - test
-        list_ = [0] * train + [1] * test
-        np.random.shuffle(list_)
-        return list_
-
     def splitting_randomsubsampling_kfolds_leavenout(self, d: pd.DataFrame, folds=5, n=1):
         tuple_list = []
-        data = d.copy()
-        user_groups = data.groupby(['userId'])
+        engine = SplittingEngine(d)
         for i in range(folds):
-            for name, group in user_groups:
-                data.loc[group.index, 'test_flag'] = self.subsampling_leavenout_list_generator(len(group), n)
-            data["test_flag"] = pd.to_numeric(data["test_flag"], downcast='integer')
-            test = data[data["test_flag"] == 1].drop(columns=["test_flag"]).reset_index(drop=True)
-            train = data[data["test_flag"] == 0].drop(columns=["test_flag"]).reset_index(drop=True)
-            tuple_list.append((train, test))
+            tuple_list.append(engine.split(engine.random_ranks(self.random) < n))
         return tuple_list
 
     def splitting_best_timestamp(self, d: pd.DataFrame, min_below=1, min_over=1):
-        data = d.copy()
-        unique_timestamps = data["timestamp"].unique()
-        user_groups = data.groupby(['userId'])
-        ts_dict = {}
-        nuniques = len(unique_timestamps)
-        i = 0
-        for ts in unique_timestamps:
-            print(nuniques - i)
-            i += 1
-            ts_dict[ts] = 0
-            for name, group in user_groups:
-                below = group[group["timestamp"] < ts]["timestamp"].count()
-                over = len(group) - below
-                if (below >= min_below) and (over >= min_over):
-                    ts_dict[ts] += 1
-        max_val = max(ts_dict.values())
-        best_tie = [ts for ts,v in ts_dict.items() if v == max_val]
-        max_ts = max(best_tie)
+        max_ts = SplittingEngine(d).best_timestamp(min_below, min_over)
         print(f"Best Timestamp: {max_ts}")
         return self.splitting_passed_timestamp(d, max_ts)
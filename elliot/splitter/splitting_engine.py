@@ -0,0 +1,85 @@
+"""
+Module description:
+Vectorized engine of the splitting strategies.
+
+The rows of a DataFrame are stably sorted by user code (and by a secondary key, e.g., the timestamp), so that the rank
+of every row within its user is its position in the sorted order minus the first position of the user, computed from
+cumulative counts. Splits are then plain boolean masks over the rows, and the best timestamp is found with a single
+sweep over the sorted unique timestamps.
+"""
+
+__version__ = '0.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
+import numpy as np
+import pandas as pd
+
+
+class SplittingEngine(object):
+    """
+    Per-user ranks and profile sizes of the rows of a (userId, itemId, rating[, timestamp]) DataFrame
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        self._data = data
+        self._users, user_ids = pd.factorize(data["userId"], sort=True)
+        self._sizes = np.bincount(self._users, minlength=len(user_ids))
+        self._starts = np.concatenate([[0], np.cumsum(self._sizes)[:-1]])
+
+    def sizes(self) -> np.ndarray:
+        """
+        Profile size of the user of every row
+        """
+        return self._sizes[self._users]
+
+    def ranks(self, key: np.ndarray = None) -> np.ndarray:
+        """
+        0-based rank of every row within its user, by increasing key. Ties (and a missing key) follow the row order
+        """
+        order = np.lexsort((key, self._users)) if key is not None else np.argsort(self._users, kind="stable")
+        ranks = np.empty(len(order), dtype=np.int64)
+        ranks[order] = np.arange(len(order)) - self._starts[self._users[order]]
+        return ranks
+
+    def temporal_ranks(self, ascending: bool = True) -> np.ndarray:
+        # timestamps are replaced by their order codes, which can be negated whatever their type
+        codes = pd.factorize(self._data["timestamp"], sort=True)[0]
+        return self.ranks(codes if ascending else -codes)
+
+    def random_ranks(self, random: np.random.Generator) -> np.ndarray:
+        """
+        Ranks of an independent random permutation of the rows of every user
+        """
+        return self.ranks(random.random(len(self._users)))
+
+    def split(self, test_mask: np.ndarray):
+        """
+        (train, test) DataFrames, in the original row order and with a new index
+        """
+        return (self._data[~test_mask].reset_index(drop=True), self._data[test_mask].reset_index(drop=True))
+
+    def best_timestamp(self, min_below: int = 1, min_over: int = 1):
+        """
+        Timestamp ts that maximizes the number of users with at least min_below rows before ts and at least min_over
+        rows at or after ts (the latest one in case of ties)
+        """
+        timestamps = self._data["timestamp"].to_numpy()
+        unique_timestamps = np.unique(timestamps)
+        sorted_timestamps = timestamps[np.lexsort((timestamps, self._users))]
+
+        # a user is counted for ts in (t[min_below - 1], t[size - min_over]] of its sorted timestamps t
+        valid = (self._sizes >= min_below) & (self._sizes >= min_over)
+        lower = np.zeros(len(self._sizes), dtype=np.int64)
+        upper = np.full(len(self._sizes), len(unique_timestamps), dtype=np.int64)
+        if min_below > 0:
+            lower[valid] = np.searchsorted(unique_timestamps,
+                                           sorted_timestamps[self._starts[valid] + min_below - 1], side="right")
+        if min_over > 0:
+            upper[valid] = np.searchsorted(unique_timestamps,
+                                           sorted_timestamps[self._starts[valid] + self._sizes[valid] - min_over],
+                                           side="right")
+        valid &= lower < upper
+        counts = np.cumsum(np.bincount(lower[valid], minlength=len(unique_timestamps) + 1)
+                           - np.bincount(upper[valid], minlength=len(unique_timestamps) + 1))[:-1]
+        return unique_timestamps[len(counts) - 1 - np.argmax(counts[::-1])]
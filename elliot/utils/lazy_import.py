@@ -0,0 +1,42 @@
+"""
+Module description:
+Lazy registries of the attributes of a package.
+
+A package maps each exposed name to the module that defines it, and the module is imported only when the name is
+first accessed (PEP 562 module __getattr__). Hence, resolving a model or a metric imports its own dependencies only,
+e.g., TensorFlow is never loaded by a configuration that only runs ItemKNN and MostPop.
+"""
+
+__version__ = '0.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
+import importlib
+import sys
+import types
+import typing as t
+
+
+def lazy_attributes(package: str, registry: t.Dict[str, str]) -> t.Tuple[t.Callable, t.Callable]:
+    """
+    Module-level __getattr__ and __dir__ of a package whose attributes are imported on first access
+    :param package: name of the package, i.e., its __name__
+    :param registry: {attribute name: path of the module that defines it, absolute or relative to the package}
+    """
+
+    def __getattr__(name):
+        if name not in registry:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        module = importlib.import_module(registry[name], package)
+        value = getattr(module, name)
+        if isinstance(value, types.ModuleType):
+            # a subpackage named as its class, imported (e.g., by a sibling) before its lazy parent bound the class
+            value = getattr(value, name)
+            setattr(module, name, value)
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[package])) | set(registry))
+
+    return __getattr__, __dir__
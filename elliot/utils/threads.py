@@ -0,0 +1,72 @@
+"""
+Module description:
+Thread caps for worker processes, to avoid oversubscribing the cores when several models run at the same time.
+
+"""
+
+__version__ = '0.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
+import multiprocessing as mp
+import os
+import sys
+
+_thread_variables = ["OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "VECLIB_MAXIMUM_THREADS",
+                     "NUMEXPR_NUM_THREADS"]
+
+
+def threads_per_worker(n_workers: int) -> int:
+    return max(1, (os.cpu_count() or 1) // max(1, n_workers))
+
+
+def can_fork_workers() -> bool:
+    """
+    Whether the current process may fork its own worker pool. Only the main process does: pool workers (e.g., the
+    trials of a parallel hyperparameter search) are not daemonic, but their nested pools would multiply the processes
+    beyond the thread budget they have been given. Neither does a process whose TensorFlow runtime is running
+    """
+    return "fork" in mp.get_all_start_methods() and mp.parent_process() is None and not tensorflow_initialized()
+
+
+def tensorflow_initialized() -> bool:
+    """
+    Whether the TensorFlow runtime of the current process has been started, i.e., its thread pools already exist and
+    a forked child could deadlock on their locks. The runtime rejects new thread settings once it is initialized
+    """
+    tf = sys.modules.get("tensorflow")
+    if tf is None:
+        return False
+    n_threads = tf.config.threading.get_inter_op_parallelism_threads()
+    try:
+        tf.config.threading.set_inter_op_parallelism_threads(n_threads + 1)
+    except RuntimeError:
+        return True
+    tf.config.threading.set_inter_op_parallelism_threads(n_threads)
+    return False
+
+
+def limit_threads(n_threads: int):
+    """
+    Limit BLAS/OpenMP and TensorFlow thread pools of the current process.
+    Environment variables cover libraries initialized later on, threadpoolctl (if installed) the already loaded
+    BLAS libraries, and TensorFlow is limited only if it has already been imported and not yet initialized
+    :param n_threads: maximum number of threads per pool
+    """
+    for variable in _thread_variables:
+        os.environ[variable] = str(n_threads)
+
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(limits=n_threads)
+    except ImportError:
+        pass
+
+    if "tensorflow" in sys.modules:
+        tf = sys.modules["tensorflow"]
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(n_threads)
+            tf.config.threading.set_inter_op_parallelism_threads(n_threads)
+        except RuntimeError:
+            # the TensorFlow runtime has already been initialized
+            pass
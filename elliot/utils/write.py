@@ -1,14 +1,27 @@
 """
 Module description:
+Storage utilities, including the writer of the recommendation lists.
 
+Recommendation lists are turned into flat (user, item, score) arrays and written in large chunks, either as
+tab-separated text, as a compressed .npz archive, or as a Parquet file. The writer can work in a background thread,
+so that training continues while the lists of the last improvement are written, and can keep only the best lists.
 """
 
 __version__ = '0.1'
 __author__ = 'Vito Walter Anelli, Claudio Pomo'
 __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 
-import numpy as np
+import concurrent.futures as c
+import importlib.util
+import os
 import pickle
+import typing as t
+
+import numpy as np
+import pandas as pd
+
+# number of (user, item, score) rows formatted at a time in text files
+_CHUNK_ROWS = 2 ** 20
 
 
 def save_obj(obj, name):
@@ -32,13 +45,109 @@ def save_np(npy, filename):
     np.save(filename, npy)
 
 
-def store_recommendation(recommendations, path=""):
+def recommendation_arrays(recommendations) -> t.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Flat (user, item, score) arrays of the recommendations. Scores keep their dtype (e.g., float32 scores are not
+    widened), so that they are written with the same digits as before
+    :param recommendations: recommendations in the form {user: [(item1,value1),...]}, or compact top-k lists
+    """
+    if hasattr(recommendations, "to_arrays"):
+        users, items, scores = recommendations.to_arrays()
+        return users, items, np.asarray(scores)
+    lists = list(recommendations.values())
+    users = np.repeat(np.asarray(list(recommendations.keys())), [len(recs) for recs in lists])
+    items = np.asarray([i for recs in lists for i, _ in recs])
+    scores = np.asarray([value for recs in lists for _, value in recs])
+    return users, items, scores
+
+
+def write_recommendation_arrays(users: np.ndarray, items: np.ndarray, scores: np.ndarray, path: str,
+                                output_format: str = "tsv"):
+    """
+    Store flat (user, item, score) arrays
+    :param output_format: tsv (one user \t item \t score line per pair), npz, or parquet
+    """
+    if output_format == "npz":
+        np.savez_compressed(path, users=users, items=items, scores=scores)
+    elif output_format == "parquet":
+        pd.DataFrame({"userId": users, "itemId": items, "score": scores}).to_parquet(path, index=False)
+    else:
+        with open(path, 'w', buffering=2 ** 20) as out:
+            for start in range(0, len(users), _CHUNK_ROWS):
+                stop = start + _CHUNK_ROWS
+                pd.DataFrame({"userId": users[start:stop], "itemId": items[start:stop],
+                              "score": scores[start:stop]}).to_csv(out, sep='\t', header=False, index=False,
+                                                                    na_rep="nan")
+
+
+def store_recommendation(recommendations, path="", output_format="tsv"):
     """
     Store recommendation list (top-k)
+    :param output_format: tsv, npz, or parquet
     :return:
     """
+    write_recommendation_arrays(*recommendation_arrays(recommendations), path, output_format)
+
+
+class RecommendationWriter(object):
+    """
+    Writer of the recommendation lists of a model.
+
+    The lists are converted to flat arrays when store is called, and written in submission order by a single
+    background thread (if enabled). Errors are raised by the next call to store or by close.
+    With keep_only_best, the file written before is removed as soon as the new one is complete, hence only the last
+    stored lists (i.e., the ones of the best validation) are kept.
+    """
+
+    extensions = {"tsv": ".tsv", "npz": ".npz", "parquet": ".parquet"}
+
+    def __init__(self, output_format="tsv", keep_only_best=False, background=True):
+        if output_format not in self.extensions:
+            raise Exception(f"Recommendation format {output_format} not recognized")
+        if output_format == "parquet" and not any(importlib.util.find_spec(engine)
+                                                  for engine in ["pyarrow", "fastparquet"]):
+            raise Exception("Parquet recommendation files require pyarrow or fastparquet")
+        self._format = output_format
+        self._keep_only_best = keep_only_best
+        self._background = background
+        self._executor = None
+        self._pending = []
+        self._last_path = None
+
+    def store(self, recommendations, path: str):
+        """
+        Store the recommendation lists. The extension of path is replaced according to the output format
+        """
+        path = os.path.splitext(path)[0] + self.extensions[self._format]
+        arrays = recommendation_arrays(recommendations)
+        if not self._background:
+            self._write(arrays, path)
+        else:
+            self._check_pending()
+            if self._executor is None:
+                self._executor = c.ThreadPoolExecutor(max_workers=1)
+            self._pending.append(self._executor.submit(self._write, arrays, path))
+
+    def _write(self, arrays, path):
+        write_recommendation_arrays(*arrays, path, self._format)
+        if self._keep_only_best and self._last_path not in (None, path) and os.path.exists(self._last_path):
+            os.remove(self._last_path)
+        self._last_path = path
+
+    def _check_pending(self):
+        for future in [f for f in self._pending if f.done()]:
+            self._pending.remove(future)
+            future.result()
 
-    with open(path, 'w') as out:
-        for u, recs in recommendations.items():
-            for i, value in recs:
-                out.write(str(u) + '\t' + str(i) + '\t' + str(value) + '\n')
+    def close(self):
+        """
+        Wait for the pending writes
+        """
+        if self._executor is not None:
+            try:
+                for future in self._pending:
+                    future.result()
+            finally:
+                self._pending = []
+                self._executor.shutdown()
+                self._executor = None